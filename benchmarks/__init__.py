@@ -0,0 +1,3 @@
+"""
+Benchmarks for Mutual Fund FAQ Assistant.
+"""
@@ -0,0 +1,313 @@
+"""
+Micro-benchmarks for faq_logic.
+
+Times detect_pii, detect_advice_request, fuzzy_match and query on the
+shipped faqs.json with sample_faqs/sample_faq.csv, and on synthetic corpora
+generated from the schemes in src/config.yml. Each operation reports
+p50/p95/p99 latency and queries/sec.
+
+Results can be saved as a baseline and later runs compared against it:
+
+    python benchmarks/bench_faq_logic.py --save benchmarks/baselines/local.json
+    python benchmarks/bench_faq_logic.py --compare benchmarks/baselines/local.json
+
+A comparison exits with status 1 if any p50 or p95 regressed by more than
+--tolerance.
+"""
+
+import argparse
+import csv
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from faq_logic import FAQAssistant
+from benchmarks.synthetic import generate_corpus
+
+
+SAMPLE_QUERIES_PATH = Path(__file__).parent.parent / 'sample_faqs' / 'sample_faq.csv'
+
+# Queries every suite includes besides corpus-derived ones
+EXTRA_QUERIES = [
+    "Should I invest in SBI Bluechip Fund?",
+    "Which fund is best for me?",
+    "My PAN is ABCDE1234F, what is my NAV?",
+    "My account number is 123456789012",
+    "What is the molecular weight of hydrogen peroxide?",
+    "How do I bake sourdough bread?",
+]
+
+# Operations timed per suite
+OPERATIONS = ('detect_pii', 'detect_advice_request', 'fuzzy_match', 'query')
+
+# Default synthetic corpus sizes, in question variants
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def load_sample_queries(path: Path = SAMPLE_QUERIES_PATH) -> List[str]:
+    """
+    Load the query column of sample_faq.csv.
+    
+    Args:
+        path: Path to the sample queries CSV
+    
+    Returns:
+        list: Sample queries
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [row['query'] for row in csv.DictReader(f) if row.get('query')]
+
+
+def build_queries(faqs: Dict, sample_queries: List[str], count: int, seed: int = 0) -> List[str]:
+    """
+    Build a benchmark query set for a corpus.
+    
+    Mixes the sample queries and EXTRA_QUERIES with question variants drawn
+    from the corpus, some shortened or reworded so they do not match exactly.
+    
+    Args:
+        faqs: Corpus the queries run against
+        sample_queries: Queries from sample_faq.csv
+        count: Number of queries to return
+        seed: Random seed
+    
+    Returns:
+        list: count queries
+    """
+    rng = random.Random(seed)
+    variants = [variant for entry in faqs.values() for variant in entry['question_variants']]
+    queries = list(sample_queries) + EXTRA_QUERIES
+    
+    while len(queries) < count:
+        variant = rng.choice(variants)
+        choice = rng.random()
+        if choice < 0.4:
+            queries.append(variant)
+        elif choice < 0.7:
+            queries.append(variant[:max(8, len(variant) * 2 // 3)])
+        else:
+            queries.append(variant.replace('What is', 'Tell me').replace('?', ''))
+    
+    rng.shuffle(queries)
+    return queries[:count]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def time_operation(func, queries: List[str], repeat: int, max_seconds: float = 30.0,
+                   min_samples: int = 20) -> Dict:
+    """
+    Time func on every query, repeat times.
+    
+    Stops early once max_seconds have been spent and at least min_samples
+    calls were timed, so slow operations on large corpora stay bounded.
+    Queries always run in the same order, so truncated runs stay comparable.
+    
+    Args:
+        func: Callable taking one query
+        queries: Queries to time
+        repeat: Passes over the queries
+        max_seconds: Time budget for the operation
+        min_samples: Calls timed before the budget applies
+        
+    Returns:
+        dict: n, p50, p95 and p99 in milliseconds, and qps
+    """
+    # Warm up lazily built state and caches outside the measurement
+    for query in queries[:5]:
+        func(query)
+    
+    latencies = []
+    total = 0.0
+    perf_counter = time.perf_counter
+    for query in queries * repeat:
+        start = perf_counter()
+        func(query)
+        elapsed = perf_counter() - start
+        latencies.append(elapsed)
+        total += elapsed
+        if total > max_seconds and len(latencies) >= min_samples:
+            break
+    
+    latencies.sort()
+    return {
+        'n': len(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'qps': len(latencies) / total if total else 0.0,
+    }
+
+
+def run_suite(assistant: FAQAssistant, queries: List[str], repeat: int,
+              max_seconds: float = 30.0) -> Dict:
+    """
+    Time every operation in OPERATIONS against one assistant.
+    
+    query() runs with the response cache disabled, so it measures the full
+    pipeline rather than cache hits.
+    
+    Args:
+        assistant: Assistant holding the corpus
+        queries: Queries to time
+        repeat: Passes over the queries
+    
+    Returns:
+        dict: operation -> timing results
+    """
+    normalized = [query.lower() for query in queries]
+    return {
+        'detect_pii': time_operation(assistant.detect_pii, queries, repeat),
+        'detect_advice_request': time_operation(assistant.detect_advice_request, normalized, repeat),
+        'fuzzy_match': time_operation(assistant.fuzzy_match, queries, repeat),
+        'query': time_operation(assistant.query, queries, repeat),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, engine: str = 'sequence', query_count: int = 200,
+                   repeat: int = 3, max_seconds: float = 30.0, log=print) -> Dict:
+    """
+    Run the shipped-corpus suite and one synthetic suite per size.
+    
+    Args:
+        sizes: Synthetic corpus sizes, in question variants
+        engine: Match engine to benchmark
+        query_count: Queries per synthetic suite
+        repeat: Passes over the queries per operation
+        max_seconds: Time budget per operation and suite
+        log: Progress callback
+    
+    Returns:
+        dict: Run metadata and suite -> operation -> timing results
+    """
+    sample_queries = load_sample_queries()
+    suites = {}
+    
+    assistant = FAQAssistant(engine=engine, cache_size=0)
+    log(f"shipped: {len(assistant.snapshot.variants)} variants, {len(sample_queries)} sample queries")
+    suites['shipped'] = run_suite(assistant, sample_queries + EXTRA_QUERIES, repeat, max_seconds)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            faqs = generate_corpus(size)
+            faqs_path = Path(tmp_dir) / f'faqs_{size}.json'
+            with open(faqs_path, 'w', encoding='utf-8') as f:
+                json.dump(faqs, f)
+            
+            start = time.perf_counter()
+            assistant = FAQAssistant(faqs_path=faqs_path, engine=engine, cache_size=0)
+            load_seconds = time.perf_counter() - start
+            log(f"synthetic-{size}: {len(faqs)} entries, loaded in {load_seconds:.2f}s")
+            
+            queries = build_queries(faqs, sample_queries, query_count)
+            suites[f'synthetic-{size}'] = run_suite(assistant, queries, repeat, max_seconds)
+            suites[f'synthetic-{size}']['load'] = {'seconds': load_seconds}
+    
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': engine,
+            'query_count': query_count,
+            'repeat': repeat,
+            'max_seconds': max_seconds,
+        },
+        'suites': suites,
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, tolerance: float = 0.25) -> List[str]:
+    """
+    Find operations that got slower than a baseline.
+    
+    Args:
+        current: Results of this run
+        baseline: Saved results to compare against
+        tolerance: Allowed relative slowdown of p50 and p95 (0.25 = 25%)
+    
+    Returns:
+        list: One message per regression; empty if none
+    """
+    regressions = []
+    for suite, operations in current['suites'].items():
+        for operation in OPERATIONS:
+            before = baseline.get('suites', {}).get(suite, {}).get(operation)
+            after = operations.get(operation)
+            if not before or not after:
+                continue
+            for stat in ('p50_ms', 'p95_ms'):
+                if after[stat] > before[stat] * (1 + tolerance):
+                    regressions.append(
+                        f"{suite} {operation} {stat}: {before[stat]:.3f} -> {after[stat]:.3f} "
+                        f"(+{(after[stat] / before[stat] - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def format_results(results: Dict) -> str:
+    """Format results as a fixed-width table."""
+    lines = [f"{'suite':<18} {'operation':<22} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>10}"]
+    for suite, operations in results['suites'].items():
+        for operation in OPERATIONS:
+            timing = operations[operation]
+            lines.append(
+                f"{suite:<18} {operation:<22} {timing['n']:>6} {timing['p50_ms']:>9.3f} {timing['p95_ms']:>9.3f} "
+                f"{timing['p99_ms']:>9.3f} {timing['qps']:>10.0f}"
+            )
+    return '\n'.join(lines)
+
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description='Benchmark faq_logic on shipped and synthetic corpora')
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(DEFAULT_SIZES),
+                        help='Synthetic corpus sizes in question variants (default: 1000 10000 100000)')
+    parser.add_argument('--engine', default='sequence', help='Match engine (default: sequence)')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per synthetic suite (default: 200)')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the queries (default: 3)')
+    parser.add_argument('--max-seconds', type=float, default=30.0,
+                        help='Time budget per operation and suite (default: 30)')
+    parser.add_argument('--save', type=Path, help='Write results as JSON to this path')
+    parser.add_argument('--compare', type=Path, help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed p50/p95 slowdown before flagging a regression (default: 0.25)')
+    args = parser.parse_args()
+    
+    results = run_benchmarks(args.sizes, args.engine, args.queries, args.repeat, args.max_seconds)
+    print()
+    print(format_results(results))
+    
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
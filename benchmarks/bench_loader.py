@@ -0,0 +1,119 @@
+"""
+Compare FAQ loaders on a large synthetic corpus.
+
+Times and measures the peak Python memory of building a snapshot three
+ways: the whole-document json.loads loader that FAQAssistant used before
+streaming, streaming faqs.json, and streaming a JSON Lines corpus.
+
+    python benchmarks/bench_loader.py --size 300000 --engine tfidf
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from faq_logic import FAQSnapshot, iter_faq_json, iter_faq_jsonl
+from benchmarks.synthetic import generate_corpus
+
+
+def load_whole_document(path: Path, engine: str) -> FAQSnapshot:
+    """Read and parse the whole file before compiling, as the old loader did."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    return FAQSnapshot(json.loads(content.decode('utf-8')), engine=engine)
+
+
+def load_streaming_json(path: Path, engine: str) -> FAQSnapshot:
+    """Compile entries as they are parsed from faqs.json."""
+    return FAQSnapshot(iter_faq_json(path), engine=engine)
+
+
+def load_streaming_jsonl(path: Path, engine: str) -> FAQSnapshot:
+    """Compile entries as they are parsed from a JSON Lines corpus."""
+    return FAQSnapshot(iter_faq_jsonl(path), engine=engine)
+
+
+def write_corpus(faqs: dict, directory: Path):
+    """
+    Write a corpus as faqs.json and as JSON Lines.
+    
+    Returns:
+        tuple: (json_path, jsonl_path)
+    """
+    json_path = directory / 'faqs.json'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(faqs, f, indent=2)
+    
+    jsonl_path = directory / 'faqs.jsonl'
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for q_key, entry in faqs.items():
+            f.write(json.dumps({'q_key': q_key, **entry}) + '\n')
+    
+    return json_path, jsonl_path
+
+
+def measure(loader, path: Path, engine: str, repeat: int = 3) -> dict:
+    """
+    Measure one loader.
+    
+    Load time is the best of repeat runs without tracing; peak and retained
+    memory come from one extra run under tracemalloc.
+    
+    Returns:
+        dict: seconds, peak_mb and retained_mb, where retained_mb is the
+        finished snapshot and peak_mb - retained_mb the loading overhead
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        snapshot = loader(path, engine)
+        best = min(best, time.perf_counter() - start)
+        del snapshot
+    
+    gc.collect()
+    tracemalloc.start()
+    snapshot = loader(path, engine)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del snapshot
+    
+    return {'seconds': best, 'peak_mb': peak / 2 ** 20, 'retained_mb': retained / 2 ** 20}
+
+
+def main():
+    """Main loader benchmark function"""
+    parser = argparse.ArgumentParser(description='Compare FAQ loaders on a synthetic corpus')
+    parser.add_argument('--size', type=int, default=100000,
+                        help='Question variants in the corpus (default: 100000)')
+    parser.add_argument('--engine', default='sequence', help='Match engine to build (default: sequence)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per loader (default: 3)')
+    args = parser.parse_args()
+    
+    loaders = [
+        ('json.loads (previous)', load_whole_document, 'json'),
+        ('streaming faqs.json', load_streaming_json, 'json'),
+        ('streaming JSON Lines', load_streaming_jsonl, 'jsonl'),
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = dict(zip(('json', 'jsonl'), write_corpus(generate_corpus(args.size), Path(tmp_dir))))
+        print(f"Corpus: {args.size} variants, faqs.json {paths['json'].stat().st_size / 2 ** 20:.1f} MB, "
+              f"JSON Lines {paths['jsonl'].stat().st_size / 2 ** 20:.1f} MB")
+        print(f"Engine: {args.engine}")
+        print(f"{'loader':<24} {'seconds':>8} {'peak MB':>9} {'retained MB':>12}")
+        for name, loader, kind in loaders:
+            result = measure(loader, paths[kind], args.engine, args.repeat)
+            print(f"{name:<24} {result['seconds']:>8.2f} {result['peak_mb']:>9.1f} {result['retained_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
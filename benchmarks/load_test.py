@@ -0,0 +1,357 @@
+"""
+HTTP load generator for the /api/query endpoint.
+
+Replays sample_faqs/sample_faq.csv, or a captured query log, against a
+running server. Requests go out over a pool of keep-alive connections, one
+per unit of concurrency, from a single asyncio event loop. A share of the
+requests is replaced with PII, advice and no-match queries, so every
+response path is exercised.
+
+    python benchmarks/load_test.py --url http://localhost:5000 \\
+        --concurrency 32 --duration 30 --rate 500 --pii 0.05 --advice 0.05
+
+With --rate, requests are sent on a fixed schedule and latency is measured
+from each request's scheduled start, so a slow server cannot hide queueing
+delay by slowing the client down. Without it, each connection sends its
+next request as soon as the previous response arrives.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_faq_logic import percentile
+
+
+SAMPLE_QUERIES_PATH = Path(__file__).parent.parent / 'sample_faqs' / 'sample_faq.csv'
+
+ADVICE_QUERIES = [
+    "Should I invest in SBI Bluechip Fund?",
+    "Which fund is best for retirement?",
+    "Is SBI Flexicap Fund a good investment?",
+    "Recommend a fund for tax saving",
+    "Should I buy or sell SBI Magnum Gilt Fund now?",
+]
+
+NO_MATCH_QUERIES = [
+    "What is the molecular weight of hydrogen peroxide?",
+    "How do I bake sourdough bread?",
+    "Who won the football world cup in 2010?",
+    "Translate good morning into French",
+]
+
+# Seconds to wait for a response before counting a timeout
+REQUEST_TIMEOUT = 10.0
+
+
+def load_queries(path: Path) -> List[str]:
+    """
+    Load queries to replay.
+    
+    Args:
+        path: A .csv file with a query column, a .jsonl file with one
+            {"query": ...} object per line, or a text file with one query
+            per line
+    
+    Returns:
+        list: Non-empty queries in file order
+    """
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == '.csv':
+            queries = [row.get('query', '') for row in csv.DictReader(f)]
+        elif path.suffix == '.jsonl':
+            queries = [json.loads(line).get('query', '') for line in f if line.strip()]
+        else:
+            queries = [line.rstrip('\n') for line in f]
+    return [query for query in queries if query and query.strip()]
+
+
+class QueryMix:
+    """
+    Yields replayed queries with PII, advice and no-match queries mixed in.
+    
+    Replayed queries are taken in order and wrap around; each draw is
+    replaced by a synthetic query of one of the other kinds with the given
+    probabilities.
+    """
+    
+    def __init__(self, queries: List[str], pii: float = 0.0, advice: float = 0.0,
+                 no_match: float = 0.0, seed: int = 0):
+        """
+        Args:
+            queries: Queries to replay
+            pii: Share of queries carrying a PAN, Aadhaar or account number
+            advice: Share of investment advice requests
+            no_match: Share of off-topic queries
+            seed: Random seed
+        """
+        if not queries:
+            raise ValueError("At least one query is required")
+        if pii + advice + no_match > 1.0:
+            raise ValueError("PII, advice and no-match shares must add up to at most 1")
+        
+        self.queries = queries
+        self.pii = pii
+        self.advice = advice
+        self.no_match = no_match
+        self._rng = random.Random(seed)
+        self._position = 0
+    
+    def next(self) -> str:
+        """Get the next query."""
+        draw = self._rng.random()
+        if draw < self.pii:
+            return self._pii_query()
+        if draw < self.pii + self.advice:
+            return self._rng.choice(ADVICE_QUERIES)
+        if draw < self.pii + self.advice + self.no_match:
+            return self._rng.choice(NO_MATCH_QUERIES)
+        
+        query = self.queries[self._position % len(self.queries)]
+        self._position += 1
+        return query
+    
+    def _pii_query(self) -> str:
+        """Build a query containing a random PAN, Aadhaar or account number."""
+        rng = self._rng
+        kind = rng.randrange(3)
+        if kind == 0:
+            letters = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(5))
+            pan = f"{letters}{rng.randrange(10000):04d}{rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}"
+            return f"My PAN is {pan}, what is my NAV?"
+        if kind == 1:
+            return f"My Aadhaar is {rng.randrange(2, 10)}{rng.randrange(10 ** 11):011d}"
+        return f"Check account {rng.randrange(10 ** 11, 10 ** 12)} balance"
+
+
+class LoadStats:
+    """Latencies and outcome counts collected during a run."""
+    
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.http_statuses: Counter = Counter()
+        self.response_statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+    
+    def report(self, elapsed: float) -> Dict:
+        """
+        Summarize the run.
+        
+        Args:
+            elapsed: Wall-clock duration of the run in seconds
+        
+        Returns:
+            dict: requests, throughput, error rate, latency percentiles in
+            milliseconds, and counts by HTTP status, response status and
+            transport error
+        """
+        latencies = sorted(self.latencies)
+        completed = len(latencies)
+        failed = sum(self.errors.values())
+        http_errors = sum(count for status, count in self.http_statuses.items() if status >= 400)
+        attempted = completed + failed
+        
+        latency_ms = {}
+        if latencies:
+            for name, fraction in (('p50', 0.50), ('p90', 0.90), ('p95', 0.95), ('p99', 0.99)):
+                latency_ms[name] = percentile(latencies, fraction) * 1000
+            latency_ms['max'] = latencies[-1] * 1000
+        
+        return {
+            'requests': attempted,
+            'completed': completed,
+            'seconds': elapsed,
+            'throughput_rps': completed / elapsed if elapsed else 0.0,
+            'error_rate': (failed + http_errors) / attempted if attempted else 0.0,
+            'latency_ms': latency_ms,
+            'http_status': {str(status): count for status, count in sorted(self.http_statuses.items())},
+            'response_status': dict(self.response_statuses),
+            'transport_errors': dict(self.errors),
+        }
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection, reopened after errors or Connection: close."""
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+    
+    async def post(self, path: str, body: bytes):
+        """
+        Send a POST request and read the response.
+        
+        Returns:
+            tuple: (HTTP status, response body)
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        
+        self._writer.write(
+            f'POST {path} HTTP/1.1\r\n'
+            f'Host: {self.host}:{self.port}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+        )
+        await self._writer.drain()
+        
+        head = await self._reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ', 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        if 'content-length' in headers:
+            payload = await self._reader.readexactly(int(headers['content-length']))
+        else:
+            # HTTP/1.0 style response delimited by connection close
+            payload = await self._reader.read()
+            headers['connection'] = 'close'
+        
+        if headers.get('connection', '').lower() == 'close' or lines[0].startswith('HTTP/1.0'):
+            self.close()
+        return status, payload
+    
+    def close(self):
+        """Close the connection; the next request reopens it."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+async def run_load(url: str, mix: QueryMix, concurrency: int = 16, duration: float = 10.0,
+                   rate: Optional[float] = None, timeout: float = REQUEST_TIMEOUT) -> Dict:
+    """
+    Send /api/query requests for duration seconds.
+    
+    Args:
+        url: Server base URL, e.g. http://localhost:5000
+        mix: Source of queries
+        concurrency: Keep-alive connections, each with one request in flight
+        duration: Seconds to send requests for
+        rate: Total requests/sec to schedule, or None to send as fast as
+            responses arrive
+        timeout: Seconds to wait for each response
+    
+    Returns:
+        dict: LoadStats.report() for the run
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or 'localhost'
+    port = parts.port or 80
+    path = (parts.path.rstrip('/') or '') + '/api/query'
+    
+    stats = LoadStats()
+    start = time.perf_counter()
+    deadline = start + duration
+    sequence = iter(range(sys.maxsize))
+    
+    async def worker():
+        connection = Connection(host, port)
+        try:
+            while True:
+                now = time.perf_counter()
+                if rate:
+                    # Open-loop schedule shared by all workers
+                    scheduled = start + next(sequence) / rate
+                    if scheduled >= deadline:
+                        return
+                    if scheduled > now:
+                        await asyncio.sleep(scheduled - now)
+                    sent_at = scheduled
+                else:
+                    if now >= deadline:
+                        return
+                    sent_at = now
+                
+                body = json.dumps({'query': mix.next()}).encode('utf-8')
+                try:
+                    status, payload = await asyncio.wait_for(connection.post(path, body), timeout)
+                except asyncio.TimeoutError:
+                    stats.errors['timeout'] += 1
+                    connection.close()
+                    continue
+                except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                    stats.errors[type(e).__name__] += 1
+                    connection.close()
+                    # Avoid spinning while the server is unreachable
+                    await asyncio.sleep(0.01)
+                    continue
+                
+                stats.latencies.append(time.perf_counter() - sent_at)
+                stats.http_statuses[status] += 1
+                try:
+                    stats.response_statuses[json.loads(payload).get('status', 'unknown')] += 1
+                except (ValueError, AttributeError):
+                    stats.response_statuses['unparseable'] += 1
+        finally:
+            connection.close()
+    
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats.report(time.perf_counter() - start)
+
+
+def format_report(report: Dict) -> str:
+    """Format a run report for the terminal."""
+    latency = report['latency_ms']
+    lines = [
+        f"Requests:    {report['requests']} in {report['seconds']:.1f}s "
+        f"({report['throughput_rps']:.0f} req/s)",
+        f"Error rate:  {report['error_rate']:.2%}",
+    ]
+    if latency:
+        lines.append("Latency ms:  " + '  '.join(f"{name} {value:.1f}" for name, value in latency.items()))
+    lines.append(f"HTTP status: {report['http_status']}")
+    lines.append(f"Responses:   {report['response_status']}")
+    if report['transport_errors']:
+        lines.append(f"Errors:      {report['transport_errors']}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Main load test function"""
+    parser = argparse.ArgumentParser(description='Replay queries against /api/query')
+    parser.add_argument('--url', default='http://localhost:5000', help='Server base URL')
+    parser.add_argument('--queries', type=Path, default=SAMPLE_QUERIES_PATH,
+                        help='Queries to replay: .csv, .jsonl or one query per line')
+    parser.add_argument('--concurrency', type=int, default=16, help='Keep-alive connections (default: 16)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+    parser.add_argument('--rate', type=float, help='Requests/sec to schedule (default: unthrottled)')
+    parser.add_argument('--pii', type=float, default=0.0, help='Share of PII queries (0-1)')
+    parser.add_argument('--advice', type=float, default=0.0, help='Share of advice queries (0-1)')
+    parser.add_argument('--no-match', type=float, default=0.0, help='Share of off-topic queries (0-1)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the query mix')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+    
+    try:
+        queries = load_queries(args.queries)
+        mix = QueryMix(queries, args.pii, args.advice, args.no_match, args.seed)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    report = asyncio.run(run_load(args.url, mix, args.concurrency, args.duration, args.rate))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    
+    if report['completed'] == 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Generate synthetic FAQ corpora for benchmarking.
+
+Entries follow the faqs.json schema and are built from the schemes in
+src/config.yml crossed with question templates per FAQ category, so a
+corpus of any size has realistic vocabulary overlap between entries.
+"""
+
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from faq_logic import DEFAULT_CONFIG_PATH, load_config
+
+
+# Question templates per category; {scheme} and {plan} are filled in
+TEMPLATES = {
+    'expense_ratio': [
+        "What is the expense ratio of {scheme} {plan}?",
+        "Expense ratio for {scheme} {plan}",
+        "{scheme} {plan} total expense ratio",
+        "What are the charges for {scheme} {plan}?",
+    ],
+    'exit_load': [
+        "What is the exit load for {scheme} {plan}?",
+        "Exit load on {scheme} {plan} redemption",
+        "Is there an exit load if I redeem {scheme} {plan} early?",
+    ],
+    'sip': [
+        "What is the minimum SIP amount for {scheme} {plan}?",
+        "Minimum SIP for {scheme} {plan}",
+        "How do I start a SIP in {scheme} {plan}?",
+    ],
+    'lockin': [
+        "What is the lock-in period for {scheme} {plan}?",
+        "Does {scheme} {plan} have a lock-in?",
+    ],
+    'riskometer': [
+        "What is the riskometer level of {scheme} {plan}?",
+        "How risky is {scheme} {plan} as per the riskometer?",
+    ],
+    'benchmark': [
+        "What is the benchmark index of {scheme} {plan}?",
+        "Which index does {scheme} {plan} track?",
+    ],
+    'statements': [
+        "How do I download the account statement for {scheme} {plan}?",
+        "Where can I get the capital gains statement for {scheme} {plan}?",
+    ],
+    'general': [
+        "Who is the fund manager of {scheme} {plan}?",
+        "What is the NAV of {scheme} {plan}?",
+        "What is the AUM of {scheme} {plan}?",
+    ],
+}
+
+# Plan and option qualifiers multiplying the distinct questions per scheme
+PLANS = [
+    f"{plan} plan {option} option{series}"
+    for series in ('', ' series 2', ' series 3', ' series 4')
+    for plan in ('direct', 'regular')
+    for option in ('growth', 'IDCW', 'IDCW reinvestment', 'bonus')
+]
+
+# Fallback when config.yml has no schemes
+DEFAULT_SCHEMES = ["SBI Bluechip Fund", "SBI Flexicap Fund", "SBI Long Term Equity Fund"]
+
+
+def load_schemes(config_path: Path = DEFAULT_CONFIG_PATH) -> List[str]:
+    """
+    Get scheme names from config.yml.
+    
+    Args:
+        config_path: Path to config.yml
+    
+    Returns:
+        list: Scheme names
+    """
+    schemes = [scheme['name'] for scheme in load_config(config_path).get('schemes', [])
+               if isinstance(scheme, dict) and scheme.get('name')]
+    return schemes or DEFAULT_SCHEMES
+
+
+def generate_corpus(n_variants: int, schemes: List[str] = None, seed: int = 0) -> Dict:
+    """
+    Generate a corpus with n_variants question variants in total.
+    
+    Args:
+        n_variants: Total number of question variants
+        schemes: Scheme names; loaded from config.yml if None
+        seed: Random seed, so a size always yields the same corpus
+    
+    Returns:
+        dict: FAQ entries keyed by q_key, in the faqs.json schema
+    """
+    rng = random.Random(seed)
+    schemes = schemes or load_schemes()
+    faqs = {}
+    remaining = n_variants
+    index = 0
+    
+    while remaining > 0:
+        scheme = schemes[index % len(schemes)]
+        category = list(TEMPLATES)[(index // len(schemes)) % len(TEMPLATES)]
+        # Past the distinct combinations, later entries repeat with a numbered plan
+        cycle = index // (len(schemes) * len(TEMPLATES))
+        plan = PLANS[cycle % len(PLANS)]
+        if cycle >= len(PLANS):
+            plan += f' tranche {cycle // len(PLANS)}'
+        
+        templates = TEMPLATES[category]
+        count = min(remaining, rng.randint(2, len(templates)))
+        variants = [template.format(scheme=scheme, plan=plan)
+                    for template in rng.sample(templates, count)]
+        
+        slug = scheme.lower().replace(' ', '_')
+        faqs[f'{slug}_{category}_{index}'] = {
+            'question_variants': variants,
+            'answer': f"{scheme} {plan}: see the scheme documents for the latest {category.replace('_', ' ')} details.",
+            'source': f"https://www.example.com/schemes/{slug}/{category}",
+            'last_updated': '2025-01-09',
+            'scheme_name': scheme,
+            'category': category,
+        }
+        remaining -= count
+        index += 1
+    
+    return faqs
@@ -0,0 +1,429 @@
+"""
+Asyncio API server for FAQ Assistant
+Serves the /health and /api/query contract of the Flask server from a single
+event loop, with HTTP/1.1 keep-alive and matching offloaded to a bounded
+thread pool
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+# Add parent directory to path to import faq_logic
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from faq_logic import FAQAssistant
+
+# Largest top_k accepted by /api/query
+MAX_TOP_K = 10
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+# Largest request line plus headers accepted, in bytes
+MAX_HEADER_SIZE = 16 * 1024
+
+# Seconds an idle keep-alive connection is held open
+KEEP_ALIVE_TIMEOUT = 15.0
+
+# Seconds browsers and CDNs may reuse a GET /api/query response before
+# revalidating it
+HTTP_MAX_AGE = int(os.environ.get('FAQ_HTTP_MAX_AGE', 300))
+
+
+class HTTPError(Exception):
+    """Malformed request that ends the connection after an error response."""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def validate_query_request(data) -> Tuple[Optional[Dict], int]:
+    """
+    Validate a /api/query request body.
+    
+    Args:
+        data: Decoded JSON body
+    
+    Returns:
+        tuple: (error_response, 400) if invalid, otherwise (None, 200)
+    """
+    if not isinstance(data, dict) or 'query' not in data:
+        return _invalid_request('Query is required'), 400
+    
+    query_text = data['query']
+    if not isinstance(query_text, str) or not query_text.strip():
+        return _invalid_request('Query must be a non-empty string'), 400
+    
+    top_k = data.get('top_k')
+    if top_k is not None and (
+        isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K
+    ):
+        return _invalid_request(f'top_k must be an integer between 1 and {MAX_TOP_K}'), 400
+    
+    return None, 200
+
+
+def query_string_data(query_string: str) -> Dict:
+    """
+    Read the query and top_k of a GET /api/query request.
+    
+    Args:
+        query_string: URL query string, without the leading '?'
+    
+    Returns:
+        dict: Request data in the shape of a POST body
+    """
+    params = parse_qs(query_string, keep_blank_values=True)
+    data = {}
+    if 'query' in params:
+        data['query'] = params['query'][0]
+    if 'top_k' in params:
+        top_k = params['top_k'][0]
+        data['top_k'] = int(top_k) if top_k.isascii() and top_k.isdigit() else top_k
+    return data
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an entity tag, using the weak
+    comparison RFC 9110 prescribes for it.
+    
+    Args:
+        if_none_match: Header value, a list of tags or '*'
+        etag: Current entity tag, unquoted
+    
+    Returns:
+        bool: True if the client already holds the current response
+    """
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag.strip('"') == etag:
+            return True
+    return False
+
+
+def _invalid_request(message: str) -> Dict:
+    """Error body for a request that fails validation"""
+    return {
+        'status': 'error',
+        'error_type': 'invalid_request',
+        'message': message
+    }
+
+
+class AsyncFAQServer:
+    """
+    HTTP/1.1 server for the FAQ query endpoint built on asyncio streams.
+    
+    Each connection is served by one coroutine that reads requests until the
+    client closes it, asks for Connection: close, or stays idle for
+    keep_alive_timeout seconds. Queries run in a thread pool of max_workers
+    threads; at most max_pending queries wait for a worker; once full,
+    further connections wait before submitting, so the backlog stays bounded.
+    """
+    
+    def __init__(self, assistant: FAQAssistant, max_workers: int = 4,
+                 max_pending: int = 256, keep_alive_timeout: float = KEEP_ALIVE_TIMEOUT):
+        """
+        Initialize the server.
+        
+        Args:
+            assistant: FAQ assistant answering the queries
+            max_workers: Threads running FAQAssistant.query
+            max_pending: Queries allowed in flight, running or queued
+            keep_alive_timeout: Seconds before an idle connection is closed
+        """
+        self.assistant = assistant
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_alive_timeout = keep_alive_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self, host: str = '0.0.0.0', port: int = 5000) -> int:
+        """
+        Start listening.
+        
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 for any free port
+        
+        Returns:
+            int: Bound port
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='faq-query')
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._server = await asyncio.start_server(self._serve_connection, host, port,
+                                                  limit=MAX_HEADER_SIZE)
+        return self._server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self):
+        """Serve until cancelled"""
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def close(self):
+        """Stop listening and shut down the worker threads"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+    
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve keep-alive requests on one connection"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader),
+                                                     self.keep_alive_timeout)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, _invalid_request(e.message), False, {})
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                
+                method, target, headers, body, keep_alive = request
+                path, _, query_string = target.partition('?')
+                start = time.perf_counter()
+                status, payload, extra_headers = await self._dispatch(method, path, query_string,
+                                                                      headers, body)
+                self._write_response(writer, status, payload, keep_alive, extra_headers)
+                if path.startswith('/api/query'):
+                    metrics = self.assistant.metrics
+                    metrics.observe_stage('request', time.perf_counter() - start)
+                    if status >= 400:
+                        metrics.count_status('error')
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """
+        Read one request from the connection.
+        
+        Returns:
+            tuple: (method, target, headers, body, keep_alive), or None
+            once the client has closed the connection
+        """
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, 'Request headers too large')
+        
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+        
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411, 'Chunked request bodies are not supported')
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length < 0 or length > MAX_BODY_SIZE:
+            raise HTTPError(413, 'Request body too large')
+        body = await reader.readexactly(length) if length else b''
+        
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
+        else:
+            keep_alive = connection == 'keep-alive'
+        
+        return method, target, headers, body, keep_alive
+    
+    async def _dispatch(self, method: str, path: str, query_string: str, headers: Dict[str, str],
+                        body: bytes) -> Tuple[int, Optional[Union[Dict, str, bytes]], Dict[str, str]]:
+        """Route a request to its handler"""
+        if path == '/health':
+            if method != 'GET':
+                return 405, {'status': 'error', 'error_type': 'method_not_allowed'}, {}
+            return 200, {'status': 'ok', 'version': self.assistant.data_version}, {}
+        
+        if path == '/metrics':
+            if method != 'GET':
+                return 405, {'status': 'error', 'error_type': 'method_not_allowed'}, {}
+            return 200, self.assistant.metrics_text(), {}
+        
+        if path == '/api/query':
+            if method == 'OPTIONS':
+                return 204, None, {}
+            if method == 'GET':
+                return await self._query(query_string_data(query_string),
+                                         headers.get('if-none-match', ''))
+            if method != 'POST':
+                return 405, {'status': 'error', 'error_type': 'method_not_allowed'}, {}
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                data = None
+            return await self._query(data)
+        
+        return 404, {'status': 'error', 'error_type': 'not_found'}, {}
+    
+    async def _query(self, data, if_none_match: Optional[str] = None
+                     ) -> Tuple[int, Optional[Union[Dict, bytes]], Dict[str, str]]:
+        """
+        Validate a query request and answer it on the thread pool with
+        pre-encoded JSON.
+        
+        Args:
+            data: Decoded request data
+            if_none_match: If-None-Match header of a GET request, '' if it
+                has none; None for POST requests, which are not cacheable
+        
+        Returns:
+            tuple: (status, payload, extra headers)
+        """
+        error, status = validate_query_request(data)
+        if error is not None:
+            return status, error, {}
+        
+        query_text, top_k = data['query'], data.get('top_k')
+        extra_headers = {}
+        if if_none_match is not None:
+            etag = self.assistant.query_etag(query_text, top_k)
+            if etag is None:
+                # Queries with PII must not be kept by browsers or CDNs
+                extra_headers['Cache-Control'] = 'no-store'
+            else:
+                extra_headers['ETag'] = f'"{etag}"'
+                extra_headers['Cache-Control'] = f'public, max-age={HTTP_MAX_AGE}'
+                if etag_matches(if_none_match, etag):
+                    self.assistant.metrics.count_status('not_modified')
+                    return 304, None, extra_headers
+        
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._executor, self.assistant.query_json, query_text, top_k
+                )
+        except Exception as e:
+            print(f"Error processing query: {e}", file=sys.stderr)
+            return 500, {
+                'status': 'error',
+                'error_type': 'server_error',
+                'message': 'An error occurred while processing your query'
+            }, {}
+        
+        return 200, result, extra_headers
+    
+    def _write_response(self, writer: asyncio.StreamWriter, status: int,
+                        payload: Optional[Union[Dict, str, bytes]], keep_alive: bool,
+                        extra_headers: Dict[str, str]):
+        """
+        Write a response with CORS headers: JSON for dict and (already
+        encoded) bytes payloads, plain text for str payloads
+        """
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4'
+        elif isinstance(payload, bytes):
+            body = payload
+            content_type = 'application/json'
+        else:
+            start = time.perf_counter()
+            body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            self.assistant.metrics.observe_stage('serialize', time.perf_counter() - start)
+            content_type = 'application/json'
+        headers = [
+            f'HTTP/1.1 {status} {HTTPStatus(status).phrase}',
+            f'Content-Type: {content_type}',
+            f'Content-Length: {len(body)}',
+            'Access-Control-Allow-Origin: *',
+            'Access-Control-Allow-Headers: Content-Type',
+            'Access-Control-Allow-Methods: GET, POST, OPTIONS',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        headers.extend(f'{name}: {value}' for name, value in extra_headers.items())
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+
+
+def create_assistant() -> FAQAssistant:
+    """Create the FAQ Assistant from the same environment settings as the Flask server"""
+    assistant = FAQAssistant(
+        engine=os.environ.get('FAQ_ENGINE', 'sequence'),
+        cache_size=int(os.environ.get('FAQ_CACHE_SIZE', 1024)),
+        cache_ttl=float(os.environ.get('FAQ_CACHE_TTL', 300)),
+        coalesce_timeout=float(os.environ.get('FAQ_COALESCE_TIMEOUT', 5))
+    )
+
+    # Reload faqs.json when it changes, polling every FAQ_WATCH_INTERVAL seconds
+    watch_interval = float(os.environ.get('FAQ_WATCH_INTERVAL', 0))
+    if watch_interval > 0:
+        assistant.start_watcher(interval=watch_interval)
+    return assistant
+
+
+async def serve(host: str, port: int, max_workers: int, max_pending: int):
+    """Run the asyncio server until interrupted"""
+    assistant = create_assistant()
+    server = AsyncFAQServer(assistant, max_workers=max_workers, max_pending=max_pending)
+    bound = await server.start(host, port)
+    print(f"Serving FAQ Assistant on http://{host}:{bound} (asyncio, {max_workers} workers)")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        assistant.stop_watcher()
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Asyncio FAQ Assistant API server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('FAQ_ASYNC_WORKERS', 4)),
+                        help='Threads running queries (default: 4)')
+    parser.add_argument('--max-pending', type=int, default=256,
+                        help='Queries in flight before new ones wait (default: 256)')
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Pre-fork launcher for the Flask API server
+Builds the FAQ corpus and match index once in a parent process, then forks
+worker processes that share it and accept connections on one socket
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+# Add parent directory to path to import faq_logic
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from werkzeug.serving import make_server
+
+# Seconds between checks for exited workers and signals
+SUPERVISE_INTERVAL = 0.5
+
+
+class PreforkServer:
+    """
+    Parent process supervising forked Flask workers.
+    
+    The parent builds the corpus and index, memory-maps the array index into
+    index_dir and freezes the garbage collector, so workers share the compiled
+    corpus copy-on-write and the index through the page cache. All workers
+    accept on the same listening socket, so the kernel spreads connections
+    across them.
+    
+    Exited workers are replaced. SIGHUP reloads faqs.json in the parent and
+    replaces every worker, so the new snapshot is shared as well; SIGTERM and
+    SIGINT stop the workers and exit.
+    """
+    
+    def __init__(self, app, assistant, host: str = '0.0.0.0', port: int = 5000,
+                 workers: int = 2, index_dir: str = None, watch_interval: float = 0.0):
+        """
+        Initialize the launcher.
+        
+        Args:
+            app: WSGI application served by each worker
+            assistant: FAQAssistant used by app
+            host: Interface to bind
+            port: Port to bind, 0 for any free port
+            workers: Number of worker processes
+            index_dir: Directory for the memory-mapped index; a temporary
+                directory if None
+            watch_interval: If above 0, each worker reloads faqs.json when it
+                changes, polling every watch_interval seconds. Reloaded
+                snapshots are private to the worker until the next SIGHUP.
+        """
+        self.app = app
+        self.assistant = assistant
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.index_dir = Path(index_dir or tempfile.mkdtemp(prefix='faq-index-'))
+        self.watch_interval = watch_interval
+        self.pids: Dict[int, int] = {}
+        self._socket = None
+        self._stopping = False
+        self._reload_requested = False
+    
+    def start(self) -> int:
+        """
+        Bind the listening socket, share the index and fork the workers.
+        
+        Returns:
+            int: Bound port
+        """
+        self._socket = socket.create_server((self.host, self.port), backlog=1024)
+        self._socket.set_inheritable(True)
+        self.port = self._socket.getsockname()[1]
+        self._share()
+        for slot in range(self.workers):
+            self._spawn(slot)
+        return self.port
+    
+    def _share(self):
+        """Map the index and freeze the heap before forking"""
+        shared_bytes = self.assistant.share_index(self.index_dir)
+        print(f"Shared {shared_bytes} bytes of index data from {self.index_dir}")
+        # Frozen objects are left out of collections, so workers do not
+        # write to (and copy) the pages holding the corpus
+        gc.collect()
+        gc.freeze()
+    
+    def _spawn(self, slot: int):
+        """Fork a worker for the given slot"""
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = slot
+            return
+        
+        # Worker process
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            if self.watch_interval > 0:
+                # The watcher thread, if any, did not survive the fork
+                self.assistant.stop_watcher()
+                self.assistant.start_watcher(interval=self.watch_interval)
+            worker = make_server(self.host, self.port, self.app, threaded=True,
+                                 fd=self._socket.fileno())
+            worker.serve_forever()
+        except Exception as e:
+            print(f"Worker {os.getpid()} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    
+    def supervise(self):
+        """Replace exited workers and handle signals until stopped"""
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        
+        while not self._stopping:
+            if self._reload_requested:
+                self._reload_requested = False
+                self.restart()
+            self.reap()
+            time.sleep(SUPERVISE_INTERVAL)
+        
+        self.stop()
+    
+    def reap(self):
+        """Collect exited workers and fork their replacements"""
+        while self.pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            slot = self.pids.pop(pid, None)
+            if slot is not None and not self._stopping:
+                print(f"Worker {pid} exited with status {status}; restarting",
+                      file=sys.stderr)
+                self._spawn(slot)
+    
+    def restart(self):
+        """Reload faqs.json, share the new snapshot and replace all workers"""
+        gc.unfreeze()
+        self.assistant.reload()
+        self._share()
+        old_pids = list(self.pids)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        self._terminate(old_pids)
+    
+    def stop(self):
+        """Stop all workers and close the listening socket"""
+        self._stopping = True
+        self._terminate(list(self.pids))
+        if self._socket is not None:
+            self._socket.close()
+    
+    def _terminate(self, pids):
+        """Send SIGTERM to workers and wait for them to exit"""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self.pids.pop(pid, None)
+    
+    def _request_stop(self, signum, frame):
+        """Signal handler for SIGTERM and SIGINT"""
+        self._stopping = True
+    
+    def _request_reload(self, signum, frame):
+        """Signal handler for SIGHUP"""
+        self._reload_requested = True
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Pre-fork FAQ Assistant API server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--index-dir', default=os.environ.get('FAQ_INDEX_DIR'),
+                        help='Directory for the memory-mapped index (default: a temporary directory)')
+    args = parser.parse_args()
+    
+    # Threads do not survive fork(), so the server module must not start a
+    # watcher in the parent; workers start their own after forking
+    watch_interval = float(os.environ.pop('FAQ_WATCH_INTERVAL', 0))
+    import server
+    
+    launcher = PreforkServer(server.app, server.assistant, host=args.host, port=args.port,
+                             workers=args.workers, index_dir=args.index_dir,
+                             watch_interval=watch_interval)
+    port = launcher.start()
+    print(f"Serving FAQ Assistant on http://{args.host}:{port} ({args.workers} workers)")
+    launcher.supervise()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,12 @@ Flask API server for FAQ Assistant
 Provides REST API endpoint for FAQ queries
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+import hmac
+import os
 import sys
+import time
 from pathlib import Path
 
 # Add parent directory to path to import faq_logic
@@ -17,20 +20,101 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for Next.js frontend
 
 # Initialize FAQ Assistant
-assistant = FAQAssistant()
+assistant = FAQAssistant(
+    engine=os.environ.get('FAQ_ENGINE', 'sequence'),
+    cache_size=int(os.environ.get('FAQ_CACHE_SIZE', 1024)),
+    cache_ttl=float(os.environ.get('FAQ_CACHE_TTL', 300)),
+    coalesce_timeout=float(os.environ.get('FAQ_COALESCE_TIMEOUT', 5))
+)
+
+# Reload faqs.json when it changes, polling every FAQ_WATCH_INTERVAL seconds
+watch_interval = float(os.environ.get('FAQ_WATCH_INTERVAL', 0))
+if watch_interval > 0:
+    assistant.start_watcher(interval=watch_interval)
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('FAQ_ADMIN_TOKEN', '')
+
+# Maximum number of queries accepted by the batch endpoint
+MAX_BATCH_SIZE = 1000
+
+# Largest top_k accepted by /api/query
+MAX_TOP_K = 10
+
+# Seconds browsers and CDNs may reuse a GET /api/query response before
+# revalidating it
+HTTP_MAX_AGE = int(os.environ.get('FAQ_HTTP_MAX_AGE', 300))
+
+
+def admin_authorized():
+    """Check the X-Admin-Token header against the configured admin token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+@app.before_request
+def start_timer():
+    """Record when the request started"""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Time query requests and count rejected ones as errors"""
+    if request.path.startswith('/api/query'):
+        assistant.metrics.observe_stage('request', time.perf_counter() - g.request_start)
+        if response.status_code >= 400:
+            assistant.metrics.count_status('error')
+    return response
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'ok'}), 200
+    return jsonify({'status': 'ok', 'version': assistant.data_version}), 200
+
 
+def query_request_data():
+    """Read a /api/query request from its JSON body, or for GET from its query string"""
+    if request.method != 'GET':
+        return request.get_json()
+    
+    data = {'query': request.args['query']} if 'query' in request.args else {}
+    if 'top_k' in request.args:
+        top_k = request.args['top_k']
+        data['top_k'] = int(top_k) if top_k.isascii() and top_k.isdigit() else top_k
+    return data
 
-@app.route('/api/query', methods=['POST'])
+
+def cacheable_query_response(query_text, top_k):
+    """
+    Answer a GET /api/query with an ETag and Cache-Control, or with 304 Not
+    Modified if the client already holds the current response
+    """
+    etag = assistant.query_etag(query_text, top_k)
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        assistant.metrics.count_status('not_modified')
+        response = Response(status=304)
+    else:
+        body = assistant.query_json(query_text, top_k=top_k)
+        start = time.perf_counter()
+        response = Response(body, mimetype='application/json')
+        assistant.metrics.observe_stage('serialize', time.perf_counter() - start)
+    
+    if etag is None:
+        # Queries with PII must not be kept by browsers or CDNs
+        response.headers['Cache-Control'] = 'no-store'
+    else:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={HTTP_MAX_AGE}'
+    return response
+
+
+@app.route('/api/query', methods=['GET', 'POST'])
 def query():
     """Query FAQ endpoint"""
     try:
-        data = request.get_json()
+        data = query_request_data()
         
         if not data or 'query' not in data:
             return jsonify({
@@ -48,10 +132,28 @@ def query():
                 'message': 'Query must be a non-empty string'
             }), 400
         
-        # Process query
-        result = assistant.query(query_text)
+        top_k = data.get('top_k')
         
-        return jsonify(result), 200
+        if top_k is not None and (
+            isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K
+        ):
+            return jsonify({
+                'status': 'error',
+                'error_type': 'invalid_request',
+                'message': f'top_k must be an integer between 1 and {MAX_TOP_K}'
+            }), 400
+        
+        if request.method == 'GET':
+            return cacheable_query_response(query_text, top_k)
+        
+        # Process query; the response comes back already encoded
+        body = assistant.query_json(query_text, top_k=top_k)
+        
+        start = time.perf_counter()
+        response = Response(body, mimetype='application/json')
+        assistant.metrics.observe_stage('serialize', time.perf_counter() - start)
+        
+        return response, 200
         
     except Exception as e:
         print(f"Error processing query: {e}", file=sys.stderr)
@@ -62,6 +164,96 @@ def query():
         }), 500
 
 
+@app.route('/api/query/batch', methods=['POST'])
+def query_batch():
+    """Query FAQ endpoint for several questions at once"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('queries'), list):
+            return jsonify({
+                'status': 'error',
+                'error_type': 'invalid_request',
+                'message': 'Queries must be a list of strings'
+            }), 400
+        
+        queries = data['queries']
+        
+        if len(queries) > MAX_BATCH_SIZE:
+            return jsonify({
+                'status': 'error',
+                'error_type': 'invalid_request',
+                'message': f'At most {MAX_BATCH_SIZE} queries are allowed per batch'
+            }), 400
+        
+        # Invalid items get the single-query error, valid ones are processed together
+        valid = [isinstance(q, str) and bool(q.strip()) for q in queries]
+        processed = iter(assistant.query_batch([q for q, ok in zip(queries, valid) if ok]))
+        results = [
+            next(processed) if ok else {
+                'status': 'error',
+                'error_type': 'invalid_request',
+                'message': 'Query must be a non-empty string'
+            }
+            for ok in valid
+        ]
+        assistant.metrics.count_status('error', valid.count(False))
+        
+        start = time.perf_counter()
+        response = jsonify({'status': 'success', 'results': results})
+        assistant.metrics.observe_stage('serialize', time.perf_counter() - start)
+        
+        return response, 200
+        
+    except Exception as e:
+        print(f"Error processing batch query: {e}", file=sys.stderr)
+        return jsonify({
+            'status': 'error',
+            'error_type': 'server_error',
+            'message': 'An error occurred while processing your queries'
+        }), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(assistant.metrics_text(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """Reload faqs.json and publish it as a new snapshot"""
+    if not admin_authorized():
+        return jsonify({
+            'status': 'error',
+            'error_type': 'forbidden',
+            'message': 'A valid admin token is required'
+        }), 403
+    
+    start = time.perf_counter()
+    reloaded = assistant.reload()
+    
+    return jsonify({
+        'status': 'success',
+        'reloaded': reloaded,
+        'reload_seconds': time.perf_counter() - start,
+        'snapshot': assistant.snapshot_info()
+    }), 200
+
+
+@app.route('/api/admin/snapshot', methods=['GET'])
+def admin_snapshot():
+    """Report the active FAQ snapshot"""
+    if not admin_authorized():
+        return jsonify({
+            'status': 'error',
+            'error_type': 'forbidden',
+            'message': 'A valid admin token is required'
+        }), 403
+    
+    return jsonify({'status': 'success', 'snapshot': assistant.snapshot_info()}), 200
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -9,19 +9,65 @@ This module provides functionality to:
 - Return formatted responses
 """
 
+import array
+import bisect
+import copy
+import functools
+import hashlib
+import heapq
+import itertools
 import json
+import math
+import os
 import re
 import sys
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, deque
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
 from difflib import get_close_matches, SequenceMatcher
 
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # Only needed by the 'tfidf' match engine
+    np = None
+    sparse = None
+
+try:
+    import yaml
+except ImportError:  # Only needed to read config.yml
+    yaml = None
+
 
 # PII patterns
 PAN_PATTERN = re.compile(r'[A-Z]{5}[0-9]{4}[A-Z]')
 AADHAAR_PATTERN = re.compile(r'\b\d{4}\s?\d{4}\s?\d{4}\b')
 ACCOUNT_PATTERN = re.compile(r'\b\d{9,18}\b')
 
+# All PII patterns as one scanner. Alternatives are tried in priority order
+# at each position, so a 12-digit number is reported as Aadhaar rather than
+# also as an account number. The lookahead skips positions that cannot start
+# any PII before trying the alternatives; like the patterns it uses \d, so
+# fullwidth and other Unicode digits are still scanned.
+PII_PATTERN = re.compile(
+    r'(?=[A-Z]|\d)(?:'
+    rf'(?P<aadhaar>{AADHAAR_PATTERN.pattern})'
+    rf'|(?P<pan>{PAN_PATTERN.pattern})'
+    rf'|(?P<account>{ACCOUNT_PATTERN.pattern}))'
+)
+# Scanner group names mapped to PII types, in the order types are reported
+PII_GROUP_TYPES = {'pan': 'PAN', 'aadhaar': 'Aadhaar', 'account': 'Account Number'}
+
+
+class PIISpan(NamedTuple):
+    """PII found in a query, as a half-open character range."""
+    pii_type: str
+    start: int
+    end: int
+
 # Advice/refusal trigger words
 ADVICE_TRIGGERS = [
     'buy', 'sell', 'should i', 'recommend', 'recommendation', 'advice',
@@ -29,180 +75,2842 @@ ADVICE_TRIGGERS = [
     'good investment', 'bad investment', 'should invest', 'must invest'
 ]
 
+# Default location of the AMC configuration
+DEFAULT_CONFIG_PATH = Path(__file__).parent / 'config.yml'
 
-class FAQAssistant:
-    """FAQ Assistant that matches user queries against FAQ database."""
+# Scoring engines available to FAQAssistant.fuzzy_match
+MATCH_ENGINES = ('sequence', 'tfidf')
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Upper bounds of the candidates-per-query histogram buckets
+CANDIDATE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Minimum similarity for query() to answer with an FAQ
+MATCH_THRESHOLD = 0.5
+
+# Minimum similarity for an FAQ to be offered as a "did you mean" alternative
+SUGGESTION_THRESHOLD = 0.4
+
+# Score a substring hit between query and variant is floored at, and the
+# fewest canonical tokens a query needs for it; a lone word such as "nifty"
+# occurs in too many variants to pick one
+SUBSTRING_FLOOR = 0.7
+SUBSTRING_MIN_TOKENS = 2
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Shard holding entries without a scheme_name or marked as General
+GENERAL_SHARD = 'General'
+
+# Lowest intent confidence at which matching is limited to the detected
+# categories; below it the whole corpus (or routed shards) is scanned
+INTENT_CONFIDENCE = 0.9
+
+# Words dropped from canonical queries; they carry no FAQ-specific meaning
+STOPWORDS = (
+    'a', 'an', 'the', 'is', 'are', 'am', 'was', 'were', 'be', 'been', 'do', 'does', 'did',
+    'of', 'to', 'in', 'on', 'at', 'by', 'for', 'from', 'with', 'into', 'about', 'as', 'and', 'or',
+    'i', 'me', 'my', 'we', 'our', 'you', 'your', 'it', 'its', 'this', 'that', 'these', 'those',
+    'there', 'what', 'whats', 'which', 'who', 'how', 'hows', 'when', 'where', 'why',
+    'can', 'could', 'would', 'will', 'shall', 'should', 'may', 'might',
+    'please', 'pls', 'plz', 'kindly', 'tell', 'know', 'hi', 'hello', 'hey',
+)
+
+# Words replaced in canonical queries, such as abbreviations by their
+# spelled-out form
+SYNONYMS = {
+    'amt': 'amount',
+    'min': 'minimum',
+    'max': 'maximum',
+    'info': 'information',
+    'yr': 'year',
+    'yrs': 'years',
+    'govt': 'government',
+}
+
+# Canonical forms memoized per FAQAssistant
+CANONICAL_MEMO_SIZE = 4096
+
+# Apostrophes are dropped so "what's" folds to "whats", not "what s"
+APOSTROPHE_PATTERN = re.compile(r"['\u2018\u2019`\u00b4]")
+# Punctuation, symbols and whitespace runs fold to a single space
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+
+class FAQEntry:
+    """Compiled FAQ entry with interned metadata strings."""
+    
+    __slots__ = ('q_key', 'question_variants', 'answer', 'source', 'last_updated',
+                 'scheme_name', 'category', 'response_prefix')
+    
+    def __init__(self, q_key: str, raw_entry: Dict):
+        """
+        Compile a raw faqs.json entry.
+        
+        Args:
+            q_key: Key of the FAQ entry
+            raw_entry: FAQ entry dictionary as loaded from JSON
+        """
+        self.q_key = sys.intern(q_key)
+        self.question_variants = tuple(raw_entry.get('question_variants', []))
+        self.answer = raw_entry.get('answer', '')
+        # Sources, dates, schemes and categories repeat across many entries
+        self.source = _intern_optional(raw_entry.get('source', ''))
+        self.last_updated = _intern_optional(raw_entry.get('last_updated', ''))
+        self.scheme_name = _intern_optional(raw_entry.get('scheme_name'))
+        self.category = _intern_optional(raw_entry.get('category'))
+        # Success response encoded up to its similarity, the last field
+        response = _success_response(self, 0.0)
+        del response['similarity']
+        self.response_prefix = _encode_json(response)[:-1] + b',"similarity":'
+    
+    def to_dict(self) -> Dict:
+        """Rebuild the faqs.json representation of this entry."""
+        entry = {
+            'question_variants': list(self.question_variants),
+            'answer': self.answer,
+            'source': self.source,
+            'last_updated': self.last_updated,
+        }
+        if self.scheme_name is not None:
+            entry['scheme_name'] = self.scheme_name
+        if self.category is not None:
+            entry['category'] = self.category
+        return entry
+
+
+class CanonicalQuery(NamedTuple):
+    """Query text in the forms the matching stages work on."""
+    # Unicode-normalized, casefolded text with punctuation folded to spaces
+    folded: str
+    # Folded words after synonym replacement and stopword removal
+    tokens: Tuple[str, ...]
+    # The tokens joined by single spaces; the form matched and cached
+    text: str
+
+
+class QueryCanonicalizer:
+    """
+    Reduces query text to a canonical form with a bounded memo table.
+    
+    Text is NFKC-normalized and casefolded, apostrophes are dropped and
+    any other run of punctuation, symbols or whitespace becomes one space.
+    Words are then replaced by their synonyms and stopwords removed, so
+    "What's the Expense  Ratio of SBI Bluechip Fund??" and "expense ratio
+    sbi bluechip fund" share one canonical form.
+    
+    Question variants go through the same steps when a snapshot is built,
+    so queries and variants are always compared in the same form.
+    """
+    
+    def __init__(self, stopwords: Iterable[str] = STOPWORDS, synonyms: Optional[Dict[str, str]] = None,
+                 memo_size: int = CANONICAL_MEMO_SIZE):
+        """
+        Args:
+            stopwords: Words removed from the canonical form
+            synonyms: Word -> replacement word or words. If None, uses SYNONYMS.
+            memo_size: Maximum number of memoized texts, 0 to disable
+        """
+        self.stopwords = frozenset(self.fold(word) for word in stopwords)
+        if synonyms is None:
+            synonyms = SYNONYMS
+        self.synonyms: Dict[str, Tuple[str, ...]] = {}
+        for word, replacement in synonyms.items():
+            word = self.fold(word)
+            if ' ' in word or not word:
+                print(f"Warning: Synonym '{word}' is not a single word, ignored", file=sys.stderr)
+                continue
+            self.synonyms[word] = tuple(self.fold(str(replacement)).split())
+        self.memo_size = memo_size
+        # lru_cache is thread-safe and keeps the table bounded
+        self._memo = functools.lru_cache(maxsize=memo_size)(self._canonicalize)
+    
+    @staticmethod
+    def fold(text: str) -> str:
+        """
+        Normalize Unicode, case, punctuation and whitespace.
+        
+        Args:
+            text: Raw text
+        
+        Returns:
+            str: Casefolded words separated by single spaces
+        """
+        text = unicodedata.normalize('NFKC', text).casefold()
+        return SEPARATOR_PATTERN.sub(' ', APOSTROPHE_PATTERN.sub('', text)).strip()
+    
+    @staticmethod
+    def fold_with_offsets(text: str) -> Tuple[str, List[int]]:
+        """
+        Fold a text like fold(), recording where each folded character came from.
+        
+        Text is folded in runs: a character joins the run before it if it
+        normalizes to a combining mark, as halfwidth sound marks do, or if
+        NFKC normalizes the extended run differently from the run and the
+        character apart, as with Hangul jamo. NFKC then sees the same compositions as in fold(),
+        and each folded character maps to the offset its run starts at.
+        
+        Args:
+            text: Raw text
+        
+        Returns:
+            tuple: (folded, offsets) where offsets[i] is the offset in text of
+            the character folded[i] came from
+        """
+        chars: List[str] = []
+        offsets: List[int] = []
+        start = 0
+        run = ''
+        for end in range(1, len(text) + 1):
+            run = unicodedata.normalize('NFKC', text[start:end])
+            if end < len(text):
+                following = unicodedata.normalize('NFKC', text[end])
+                if unicodedata.combining(following[0]):
+                    continue
+                if unicodedata.normalize('NFKC', text[start:end + 1]) != run + following:
+                    continue
+            piece = run.casefold()
+            for char in APOSTROPHE_PATTERN.sub('', piece):
+                if SEPARATOR_PATTERN.match(char):
+                    # Runs of separators fold to one space, none at the start
+                    if not chars or chars[-1] == ' ':
+                        continue
+                    char = ' '
+                chars.append(char)
+                offsets.append(start)
+            start = end
+        if chars and chars[-1] == ' ':
+            chars.pop()
+            offsets.pop()
+        return ''.join(chars), offsets
+    
+    def canonicalize(self, text: str, memoize: bool = True) -> CanonicalQuery:
+        """
+        Get the canonical form of a text.
+        
+        Args:
+            text: Raw query or question variant
+            memoize: Whether to use the memo table; corpus text is
+                canonicalized once and would only evict queries
+        
+        Returns:
+            CanonicalQuery: Folded text, canonical tokens and canonical text
+        """
+        if memoize and self.memo_size:
+            return self._memo(text)
+        return self._canonicalize(text)
+    
+    def _canonicalize(self, text: str) -> CanonicalQuery:
+        """Canonicalize a text without the memo table."""
+        folded = self.fold(text)
+        synonyms = self.synonyms
+        stopwords = self.stopwords
+        tokens = []
+        for word in folded.split():
+            for token in synonyms.get(word, (word,)):
+                if token not in stopwords:
+                    tokens.append(sys.intern(token))
+        tokens = tuple(tokens)
+        return CanonicalQuery(folded, tokens, ' '.join(tokens))
+    
+    def stats(self) -> Dict:
+        """
+        Get memo table counters.
+        
+        Returns:
+            dict: hits, misses, size and max_size
+        """
+        info = self._memo.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': self.memo_size}
+
+
+class QuestionVariant:
+    """Canonicalized question variant pointing back to its FAQ entry."""
+    
+    __slots__ = ('entry', 'text', 'terms', 'matcher')
+    
+    def __init__(self, entry: FAQEntry, variant: str, canonicalizer: QueryCanonicalizer):
+        """
+        Args:
+            entry: FAQ entry the variant belongs to
+            variant: Question variant as written in faqs.json
+            canonicalizer: Canonicalizer queries are reduced with
+        """
+        self.entry = entry
+        canonical = canonicalizer.canonicalize(variant, memoize=False)
+        self.text = canonical.text
+        self.terms = frozenset(canonical.tokens)
+        # Built by FAQSnapshot for the 'sequence' engine
+        self.matcher: Optional[SequenceMatcher] = None
+    
+    def build_matcher(self):
+        """
+        Prebuild a SequenceMatcher with this variant as its second sequence.
+        
+        SequenceMatcher caches its analysis of the second sequence, and
+        quick_ratio() its character counts (fullbcount). Both are computed
+        here once, so queries only pay for their own side. The matcher is
+        shared between threads and never used directly: queries work on a
+        shallow copy.
+        """
+        self.matcher = SequenceMatcher(None, '', self.text)
+        self.matcher.quick_ratio()
+
+
+def _intern_optional(value: Optional[str]) -> Optional[str]:
+    """Intern a string value, passing None through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int] = (3, 5)) -> Iterator[str]:
+    """
+    Generate character n-grams inside word boundaries.
+    
+    Each word is padded with a space on both sides so n-grams at the start
+    and end of a word differ from those in the middle. Words shorter than
+    the smallest n-gram are emitted whole.
+    
+    Args:
+        text: Lowercased text
+        ngram_range: Inclusive (min_n, max_n) n-gram lengths
+        
+    Yields:
+        Character n-grams
+    """
+    min_n, max_n = ngram_range
+    for word in WORD_PATTERN.findall(text):
+        padded = f' {word} '
+        if len(padded) < min_n:
+            yield padded
+            continue
+        for n in range(min_n, min(max_n, len(padded)) + 1):
+            for start in range(len(padded) - n + 1):
+                yield padded[start:start + n]
+
+
+class TfidfMatcher:
+    """
+    Character n-gram TF-IDF index over question variants.
+    
+    All variants are encoded once as rows of an L2-normalized sparse matrix,
+    so a query is scored against the whole corpus with one sparse
+    matrix-vector product. Scores are cosine similarities in the range 0-1.
+    """
+    
+    def __init__(self, texts: Sequence[str], ngram_range: Tuple[int, int] = (3, 5),
+                 max_df: float = 1.0):
+        """
+        Build the TF-IDF matrix.
+        
+        Args:
+            texts: Lowercased question variants, one row each
+            ngram_range: Inclusive (min_n, max_n) character n-gram lengths
+            max_df: Drop n-grams present in more than this fraction of the
+                variants. They carry little weight but dominate matching cost.
+        """
+        if np is None or sparse is None:
+            raise ImportError("The 'tfidf' match engine requires numpy and scipy")
+        
+        self.ngram_range = ngram_range
+        vocabulary: Dict[str, int] = {}
+        # Rows are built directly in CSR form in typed buffers; lists of
+        # Python ints and floats, and COO triplets, took several times the
+        # size of the finished matrix on large corpora
+        indptr, cols, term_freqs = array.array('q', [0]), array.array('i'), array.array('d')
+        
+        for text in texts:
+            for gram, count in Counter(char_ngrams(text, ngram_range)).items():
+                cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+                term_freqs.append(1.0 + math.log(count))
+            indptr.append(len(cols))
+        
+        n_rows = len(indptr) - 1
+        indptr = np.frombuffer(indptr, dtype=np.int64)
+        cols = np.frombuffer(cols, dtype=np.int32)
+        weights = np.frombuffer(term_freqs, dtype=np.float64)
+        doc_freqs = np.bincount(cols, minlength=len(vocabulary))
+        
+        # Dropped n-grams are left out of both the variant and query vectors,
+        # so scores stay cosine similarities over the kept n-grams
+        keep = doc_freqs <= max_df * n_rows
+        new_ids = np.cumsum(keep) - 1
+        self._vocabulary = {gram: int(new_ids[col]) if keep[col] else -1
+                            for gram, col in vocabulary.items()}
+        
+        # Smoothed idf; unseen query n-grams get the weight of df == 0
+        self._idf = np.log((1.0 + n_rows) / (1.0 + doc_freqs[keep])) + 1.0
+        self._unseen_idf = math.log(1.0 + n_rows) + 1.0
+        
+        if not keep.all():
+            kept = keep[cols]
+            indptr = np.concatenate(([0], np.cumsum(kept)))[indptr]
+            cols = new_ids[cols[kept]].astype(np.int32)
+            weights = weights[kept]
+        weights *= self._idf[cols]
+        
+        matrix = sparse.csr_matrix((weights, cols, indptr), shape=(n_rows, len(self._idf)), copy=False)
+        norms = np.sqrt(np.asarray(
+            sparse.csr_matrix((weights * weights, cols, indptr), shape=matrix.shape).sum(axis=1)
+        ).ravel())
+        norms[norms == 0.0] = 1.0
+        matrix.data /= np.repeat(norms, np.diff(indptr))
+        
+        # Stored n-gram major, so a query only touches its own n-gram rows
+        self._matrix_t = matrix.T.tocsr()
+        self.n_rows = n_rows
+    
+    def share(self, directory: Path) -> int:
+        """
+        Move the index arrays into read-only memory-mapped files.
+        
+        The arrays are written to directory as .npy files and replaced by
+        memory maps of them, so processes forked afterwards, or mapping the
+        same files, read one copy from the page cache instead of each
+        holding their own.
+        
+        Args:
+            directory: Directory to write the arrays to; created if missing
+            
+        Returns:
+            int: Bytes of index data now memory-mapped
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            'data': self._matrix_t.data,
+            'indices': self._matrix_t.indices,
+            'indptr': self._matrix_t.indptr,
+            'idf': self._idf,
+        }
+        
+        mapped = {}
+        for name, array in arrays.items():
+            path = directory / f'{name}.npy'
+            # Written under a temporary name so a reader never maps a partial file
+            tmp_path = directory / f'{name}.tmp.npy'
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+            mapped[name] = np.load(path, mmap_mode='r')
+        
+        self._matrix_t = sparse.csr_matrix(
+            (mapped['data'], mapped['indices'], mapped['indptr']),
+            shape=self._matrix_t.shape, copy=False
+        )
+        self._idf = mapped['idf']
+        return sum(array.nbytes for array in mapped.values())
+    
+    def _query_vector(self, text: str) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Encode a query as n-gram ids and L2-normalized weights.
+        
+        N-grams outside the vocabulary still count towards the norm, so
+        unfamiliar wording lowers the similarity instead of being ignored.
+        """
+        ids, weights = [], []
+        norm = 0.0
+        for gram, count in Counter(char_ngrams(text, self.ngram_range)).items():
+            col = self._vocabulary.get(gram)
+            if col == -1:
+                continue
+            idf = self._unseen_idf if col is None else self._idf[col]
+            weight = (1.0 + math.log(count)) * idf
+            norm += weight * weight
+            if col is not None:
+                ids.append(col)
+                weights.append(weight)
+        
+        weights = np.asarray(weights)
+        if norm > 0.0:
+            weights /= math.sqrt(norm)
+        return np.asarray(ids, dtype=np.int64), weights
+    
+    def _score_matrix(self, texts: Sequence[str]) -> 'sparse.csr_matrix':
+        """
+        Score queries against every variant in one sparse matrix product.
+        
+        Each output row is computed from its query row alone, so a query
+        scores bit-identically whether it is scored alone or in a batch.
+        
+        Returns:
+            CSR matrix with one row of non-zero similarities per query, in
+            variant order
+        """
+        indptr, cols, weights = [0], [], []
+        for text in texts:
+            ids, query_weights = self._query_vector(text)
+            cols.extend(ids)
+            weights.extend(query_weights)
+            indptr.append(len(cols))
+        
+        queries = sparse.csr_matrix(
+            (np.asarray(weights, dtype=np.float64), np.asarray(cols, dtype=np.int64),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), len(self._idf))
+        )
+        scores = (queries @ self._matrix_t).tocsr()
+        scores.sort_indices()
+        return scores
+    
+    @staticmethod
+    def _best_rows(scores: 'sparse.csr_matrix') -> List[Optional[Tuple[int, float]]]:
+        """Pick the best scoring variant of each row, the earliest one on ties."""
+        results = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            row_scores = scores.data[start:end]
+            position = int(np.argmax(row_scores)) if end > start else 0
+            # A query sharing no n-gram with any variant matches nothing
+            if end == start or row_scores[position] <= 0.0:
+                results.append(None)
+                continue
+            # Clamp rounding error so an exact match scores 1.0, not 1.0000000000000002
+            results.append((int(scores.indices[start + position]), min(float(row_scores[position]), 1.0)))
+        return results
+    
+    def scores(self, text: str) -> 'np.ndarray':
+        """
+        Score a query against every variant.
+        
+        Args:
+            text: Lowercased query
+            
+        Returns:
+            Array of cosine similarities, one per variant
+        """
+        row = self._score_matrix([text])
+        scores = np.zeros(self.n_rows)
+        scores[row.indices] = row.data
+        return scores
+    
+    def best(self, text: str) -> Optional[Tuple[int, float]]:
+        """
+        Find the best scoring variant for a query.
+        
+        Args:
+            text: Lowercased query
+            
+        Returns:
+            tuple: (variant_id, similarity_score), or None for an empty
+            corpus or a query sharing no n-gram with any variant
+        """
+        if self.n_rows == 0:
+            return None
+        return self._best_rows(self._score_matrix([text]))[0]
+    
+    def best_batch(self, texts: Sequence[str], chunk_size: int = 256) -> List[Optional[Tuple[int, float]]]:
+        """
+        Find the best scoring variant for several queries.
+        
+        Query vectors are stacked into one sparse matrix and multiplied with
+        the corpus matrix, chunk_size queries at a time to bound the size of
+        the score matrix. Results are identical to calling best() per query.
+        
+        Args:
+            texts: Lowercased queries
+            chunk_size: Number of queries scored per matrix product
+            
+        Returns:
+            list: (variant_id, similarity_score) per query, or None for an
+            empty corpus or a query sharing no n-gram with any variant
+        """
+        if self.n_rows == 0:
+            return [None] * len(texts)
+        
+        results = []
+        for chunk_start in range(0, len(texts), chunk_size):
+            results.extend(self._best_rows(self._score_matrix(texts[chunk_start:chunk_start + chunk_size])))
+        return results
+
+
+def load_config(config_path: Path) -> Dict:
+    """
+    Load the AMC configuration.
+    
+    Args:
+        config_path: Path to config.yml
+        
+    Returns:
+        dict: Parsed configuration, or an empty dict if it cannot be loaded
+    """
+    if yaml is None:
+        print("Warning: PyYAML is not installed, ignoring config.yml", file=sys.stderr)
+        return {}
+    
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    except yaml.YAMLError as e:
+        print(f"Error: Invalid YAML in config file: {e}", file=sys.stderr)
+        return {}
+
+
+def config_advice_triggers(config: Dict) -> List[str]:
+    """
+    Collect advice trigger phrases from configuration.
+    
+    The advice_triggers key may hold a flat list of phrases or a mapping
+    of language code to list of phrases.
+    
+    Args:
+        config: Parsed config.yml
+        
+    Returns:
+        list: Trigger phrases, in configuration order
+    """
+    configured = config.get('advice_triggers') or []
+    if isinstance(configured, dict):
+        return [phrase for phrases in configured.values() for phrase in (phrases or [])]
+    return list(configured)
+
+
+def config_scheme_aliases(config: Dict) -> Dict[str, str]:
+    """
+    Collect the names users may call each scheme by from configuration.
+    
+    Each entry under schemes may list aliases, such as short names or
+    alternative spellings. A scheme's full name is always one of them.
+    
+    Args:
+        config: Parsed config.yml
+    
+    Returns:
+        dict: Lowercased alias -> scheme name, in configuration order
+    """
+    aliases: Dict[str, str] = {}
+    for scheme in config.get('schemes') or []:
+        if not isinstance(scheme, dict) or not scheme.get('name'):
+            continue
+        name = scheme['name']
+        for alias in [name] + list(scheme.get('aliases') or []):
+            alias = str(alias).lower().strip()
+            if not alias:
+                continue
+            if aliases.setdefault(alias, name) != name:
+                print(f"Warning: Alias '{alias}' of '{name}' already names '{aliases[alias]}', ignored",
+                      file=sys.stderr)
+    return aliases
+
+
+def config_intent_keywords(config: Dict) -> Dict[str, List[str]]:
+    """
+    Collect intent keywords per FAQ category from configuration.
+    
+    Args:
+        config: Parsed config.yml
+    
+    Returns:
+        dict: Category -> keywords, from intents.categories
+    """
+    categories = (config.get('intents') or {}).get('categories') or {}
+    return {category: list(keywords or []) for category, keywords in categories.items()}
+
+
+def config_canonicalizer(config: Dict) -> QueryCanonicalizer:
+    """
+    Build the query canonicalizer from configuration.
+    
+    The canonicalization key may list stopwords and synonyms, which are
+    added to STOPWORDS and SYNONYMS, and set memo_size.
+    
+    Args:
+        config: Parsed config.yml
+    
+    Returns:
+        QueryCanonicalizer: Canonicalizer with the configured word lists
+    """
+    configured = config.get('canonicalization') or {}
+    stopwords = list(STOPWORDS) + list(configured.get('stopwords') or [])
+    synonyms = {**SYNONYMS, **(configured.get('synonyms') or {})}
+    return QueryCanonicalizer(stopwords, synonyms, int(configured.get('memo_size', CANONICAL_MEMO_SIZE)))
+
+
+# Bytes read at a time when hashing or streaming FAQ files
+READ_CHUNK_SIZE = 1 << 16
+
+
+def file_content_hash(path: Path) -> str:
+    """
+    Hash a file in chunks without holding it in memory.
+    
+    Args:
+        path: File to hash
+        
+    Returns:
+        str: First 16 hex digits of the file's SHA-256
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def iter_faq_file(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream FAQ entries from faqs.json or a JSON Lines corpus.
+    
+    Files ending in .jsonl hold one entry object per line with its key in a
+    q_key field; anything else is read as a faqs.json object keyed by q_key.
+    
+    Args:
+        path: FAQ file
+        chunk_size: Characters read at a time
+        
+    Yields:
+        tuple: (q_key, raw_entry) in file order
+        
+    Raises:
+        ValueError: If the file is not valid JSON or JSON Lines
+    """
+    if Path(path).suffix == '.jsonl':
+        return iter_faq_jsonl(path)
+    return iter_faq_json(path, chunk_size)
+
+
+def iter_faq_json(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream the entries of a faqs.json object one at a time.
+    
+    Only the entry being decoded and one read chunk are held in memory, so
+    peak memory does not grow with the file size.
+    
+    Args:
+        path: faqs.json file
+        chunk_size: Characters read at a time
+        
+    Yields:
+        tuple: (q_key, raw_entry) in file order
+        
+    Raises:
+        ValueError: If the file is not a valid JSON object
+    """
+    decoder = json.JSONDecoder()
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+        
+        def read_more() -> bool:
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            # Drop what has been consumed before growing the buffer
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+        
+        def next_char() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                    pos += 1
+                if pos < len(buffer) or not read_more():
+                    return buffer[pos] if pos < len(buffer) else ''
+        
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, pos = decoder.raw_decode(buffer, pos)
+                    return value
+                except json.JSONDecodeError:
+                    # The value may continue in the next chunk
+                    if not read_more():
+                        raise
+        
+        if next_char() != '{':
+            raise ValueError("FAQ file must contain a JSON object")
+        pos += 1
+        
+        if next_char() == '}':
+            pos += 1
+        else:
+            while True:
+                if next_char() != '"':
+                    raise ValueError("Expected a quoted FAQ key")
+                q_key = decode()
+                if next_char() != ':':
+                    raise ValueError(f"Expected ':' after FAQ key '{q_key}'")
+                pos += 1
+                next_char()
+                raw_entry = decode()
+                if not isinstance(raw_entry, dict):
+                    raise ValueError(f"FAQ entry '{q_key}' must be a JSON object")
+                yield q_key, raw_entry
+                
+                separator = next_char()
+                pos += 1
+                if separator == '}':
+                    break
+                if separator != ',':
+                    raise ValueError(f"Expected ',' or '}}' after FAQ entry '{q_key}'")
+        
+        if next_char():
+            raise ValueError("Unexpected data after the FAQ object")
+
+
+def iter_faq_jsonl(path: Path) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream entries from a JSON Lines corpus.
+    
+    Each non-blank line is one entry object in the faqs.json schema plus a
+    q_key field, e.g. {"q_key": "nav_1", "question_variants": [...], ...}.
+    
+    Args:
+        path: .jsonl file
+        
+    Yields:
+        tuple: (q_key, raw_entry) in file order
+        
+    Raises:
+        ValueError: If a line is not a JSON object with a string q_key
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                raw_entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {line_number}: {e}") from e
+            if not isinstance(raw_entry, dict) or not isinstance(raw_entry.get('q_key'), str):
+                raise ValueError(f"line {line_number}: expected an object with a string 'q_key'")
+            yield raw_entry.pop('q_key'), raw_entry
+
+
+class TriggerAutomaton:
+    """
+    Aho-Corasick automaton over a set of trigger phrases.
+    
+    The phrases are compiled into a deterministic automaton once, so finding
+    a phrase in a text is a single pass over its characters regardless of
+    how many phrases there are. Matching is case-insensitive and, like a
+    plain substring search, ignores word boundaries.
+    """
+    
+    def __init__(self, phrases: Sequence[str]):
+        """
+        Build the automaton.
+        
+        Args:
+            phrases: Phrases to detect
+        """
+        goto: List[Dict[str, int]] = [{}]
+        terminal: List[Optional[str]] = [None]
+        
+        # Trie of all phrases
+        for phrase in phrases:
+            phrase = phrase.lower()
+            if not phrase:
+                continue
+            state = 0
+            for char in phrase:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    terminal.append(None)
+                state = next_state
+            terminal[state] = phrase
+        
+        # Breadth-first pass adding failure transitions, so each state's
+        # transitions already include those of its longest proper suffix
+        self._delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        # Phrases ending at each state, longest first
+        self._outputs: List[Tuple[str, ...]] = [()] * len(goto)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = self._delta[fail[state]]
+            own = (terminal[state],) if terminal[state] is not None else ()
+            self._outputs[state] = own + self._outputs[fail[state]]
+            self._delta[state] = {**fallback, **goto[state]}
+            for char, next_state in goto[state].items():
+                fail[next_state] = fallback.get(char, 0)
+                queue.append(next_state)
+        
+        self.phrases = tuple(phrase for phrase in terminal if phrase is not None)
+    
+    def search(self, text: str) -> Optional[Tuple[str, int]]:
+        """
+        Find the first phrase in a text, stopping at the first hit.
+        
+        Args:
+            text: Text to search
+            
+        Returns:
+            tuple: (phrase, offset) of the phrase that ends first, preferring
+            the longest one among phrases ending at the same position, with
+            offset into the lowercased text; or None if no phrase occurs
+        """
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for index, char in enumerate(text.lower()):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                phrase = outputs[state][0]
+                return phrase, index - len(phrase) + 1
+        return None
+    
+    def find_all(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Find every occurrence of every phrase in a text.
+        
+        Args:
+            text: Text to search
+            
+        Returns:
+            list: (phrase, offset) pairs ordered by end position, with offsets
+            into the lowercased text
+        """
+        matches = []
+        state = 0
+        for index, char in enumerate(text.lower()):
+            state = self._delta[state].get(char, 0)
+            for phrase in self._outputs[state]:
+                matches.append((phrase, index - len(phrase) + 1))
+        return matches
+
+
+class IntentClassifier:
+    """
+    Keyword classifier mapping a query to the FAQ categories it asks about.
+    
+    Keywords are indexed by their first word, so a text is classified in
+    one pass over its words. Keywords are canonicalized like queries and
+    matched on whole words, so "lock-in", "lock in" and "Lock In" are the
+    same keyword.
+    
+    Each keyword's precision, the share of corpus question variants
+    containing it that belong to its category, is measured when the
+    classifier is built. Keywords the corpus never uses keep a precision
+    of 1.0, so abbreviations such as TER can be configured up front.
+    """
+    
+    def __init__(self, keywords: Dict[str, Sequence[str]], variants: Sequence[QuestionVariant] = (),
+                 canonicalizer: Optional[QueryCanonicalizer] = None):
+        """
+        Build the keyword index and measure keyword precision.
+        
+        Args:
+            keywords: Category -> keywords and phrases
+            variants: Compiled question variants to measure precision on
+            canonicalizer: Canonicalizer the variants were compiled with;
+                if None, keywords are only lowercased
+        """
+        self._index: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        for category, phrases in keywords.items():
+            for phrase in phrases or []:
+                if canonicalizer is not None:
+                    words = canonicalizer.canonicalize(str(phrase), memoize=False).tokens
+                else:
+                    words = tuple(WORD_PATTERN.findall(str(phrase).lower()))
+                if words and (words, category) not in self._index.get(words[0], []):
+                    self._index.setdefault(words[0], []).append((words, category))
+        
+        seen = Counter()
+        in_category = Counter()
+        if self._index:
+            for variant in variants:
+                for key in set(self._find(WORD_PATTERN.findall(variant.text))):
+                    seen[key] += 1
+                    if variant.entry.category == key[1]:
+                        in_category[key] += 1
+        self.precision: Dict[Tuple[Tuple[str, ...], str], float] = {
+            key: in_category[key] / seen[key] if seen[key] else 1.0
+            for keys in self._index.values() for key in keys
+        }
+    
+    def _find(self, words: List[str]) -> Iterator[Tuple[Tuple[str, ...], str]]:
+        """Yield (keyword words, category) for each keyword in a word list."""
+        index = self._index
+        for position, word in enumerate(words):
+            for key in index.get(word, ()):
+                phrase = key[0]
+                if len(phrase) == 1 or tuple(words[position:position + len(phrase)]) == phrase:
+                    yield key
+    
+    def classify(self, text: str) -> Tuple[List[str], float]:
+        """
+        Classify a text's intent.
+        
+        Args:
+            text: Text to classify
+        
+        Returns:
+            tuple: (categories, confidence) with the categories of every
+            keyword found, in order of first mention, and the precision of
+            the most precise one; ([], 0.0) if no keyword occurs
+        """
+        categories = []
+        confidence = 0.0
+        for key in self._find(WORD_PATTERN.findall(text.lower())):
+            if key[1] not in categories:
+                categories.append(key[1])
+            confidence = max(confidence, self.precision[key])
+        return categories, confidence
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of query responses with a per-entry TTL.
+    
+    Hit, miss, expiration and eviction counters are kept so the cache can be
+    sized from production traffic. A max_size of 0 disables caching.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0, clock=time.monotonic):
+        """
+        Args:
+            max_size: Maximum number of cached responses
+            ttl: Seconds a cached response stays valid
+            clock: Monotonic time source, overridable for tests
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+    
+    def get(self, key) -> Optional[Dict]:
+        """
+        Look up a cached response, refreshing its LRU position.
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            The cached response, or None on a miss
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            
+            expires_at, response = item
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+    
+    def put(self, key, response: Dict):
+        """
+        Cache a response, evicting the least recently used one when full.
+        
+        Args:
+            key: Cache key
+            response: Response to cache
+        """
+        if self.max_size <= 0:
+            return
+        
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all cached responses, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: hits, misses, expirations, evictions, size, max_size and ttl
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+            }
+
+
+class _Flight:
+    """One in-flight computation that concurrent callers wait on."""
+    
+    __slots__ = ('done', 'result', 'failed')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """
+    Thread-safe coalescing of concurrent calls that compute the same value.
+    
+    The first caller for a key runs the computation; callers arriving while
+    it is in flight wait for and share its result. Waits are bounded: a
+    caller whose leader takes longer than timeout, or fails, computes the
+    value itself, so a slow or failing leader never fails its followers.
+    Counters are kept so the coalescing rate can be read from production
+    traffic. A timeout of 0 disables coalescing.
+    """
+    
+    def __init__(self, timeout: float = 5.0):
+        """
+        Args:
+            timeout: Seconds a caller waits for an in-flight computation
+        """
+        self.timeout = timeout
+        self._flights: Dict = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+    
+    def do(self, key, compute):
+        """
+        Compute a value, or share the result of a concurrent computation of
+        the same key.
+        
+        Args:
+            key: Identity of the computation
+            compute: Callable without arguments producing the value
+        
+        Returns:
+            The computed or shared value
+        """
+        if self.timeout <= 0:
+            return compute()
+        
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        
+        if leader:
+            try:
+                flight.result = compute()
+                return flight.result
+            except BaseException:
+                flight.failed = True
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        
+        if flight.done.wait(self.timeout):
+            if not flight.failed:
+                return flight.result
+            with self._lock:
+                self.failures += 1
+        else:
+            with self._lock:
+                self.timeouts += 1
+        return compute()
+    
+    def stats(self) -> Dict:
+        """
+        Get coalescing counters.
+        
+        Returns:
+            dict: leaders, coalesced, timeouts, failures, in_flight and
+            timeout
+        """
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts,
+                'failures': self.failures,
+                'in_flight': len(self._flights),
+                'timeout': self.timeout,
+            }
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram in the Prometheus cumulative format.
+    
+    Not thread-safe on its own; QueryMetrics updates its histograms under
+    one lock.
+    """
+    
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Args:
+            buckets: Increasing bucket upper bounds; +Inf is added
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        """Record one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+    
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        Read the histogram.
+        
+        Returns:
+            tuple: (cumulative bucket counts including +Inf, sum, count)
+        """
+        cumulative = []
+        running = 0
+        for count in self.counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, self.sum, running
+
+
+class QueryMetrics:
+    """
+    Counters and histograms describing FAQAssistant.query traffic.
+    
+    Stages are timed separately (pii, canonicalize, advice, cache, match,
+    query, plus any the caller adds, such as serialize), responses are
+    counted by status, and the number of variants considered and fully
+    scored per match is kept. render() formats everything as Prometheus text.
+    
+    Each update takes one lock, and a query records all of its cache-path
+    stages in a single observe_stages() call, so instrumentation adds about
+    a microsecond per query.
+    """
+    
+    def __init__(self):
+        self._stages: Dict[str, Histogram] = {}
+        self._statuses: Counter = Counter()
+        self._lock = threading.Lock()
+        self.candidates = Histogram(CANDIDATE_BUCKETS)
+        self.scored = Histogram(CANDIDATE_BUCKETS)
+    
+    def observe_stages(self, timings: Sequence[Tuple[str, float]], status: Optional[str] = None):
+        """
+        Record the time spent in stages of a query, and optionally its status.
+        
+        Args:
+            timings: (stage, seconds) pairs; the stage is used as a label
+            status: Response status to count, if the query is complete
+        """
+        with self._lock:
+            for stage, seconds in timings:
+                histogram = self._stages.get(stage)
+                if histogram is None:
+                    histogram = self._stages[stage] = Histogram(LATENCY_BUCKETS)
+                histogram.observe(seconds)
+            if status is not None:
+                self._statuses[status] += 1
+    
+    def observe_stage(self, stage: str, seconds: float):
+        """
+        Record the time spent in one stage of a query.
+        
+        Args:
+            stage: Stage name, used as the stage label
+            seconds: Elapsed time
+        """
+        self.observe_stages(((stage, seconds),))
+    
+    def count_status(self, status: str, count: int = 1):
+        """
+        Count responses by status.
+        
+        Args:
+            status: Response status (success, no_match, refusal or error),
+                or not_modified for a conditional request answered with 304
+            count: Number of responses
+        """
+        if count:
+            with self._lock:
+                self._statuses[status] += count
+    
+    def observe_candidates(self, candidates: int, scored: int):
+        """
+        Record the work done matching one query.
+        
+        Args:
+            candidates: Variants returned by the index
+            scored: Variants that reached a full similarity computation
+        """
+        with self._lock:
+            self.candidates.observe(candidates)
+            self.scored.observe(scored)
+    
+    def status_counts(self) -> Dict[str, int]:
+        """
+        Get response counts by status.
+        
+        Returns:
+            dict: status -> count
+        """
+        with self._lock:
+            return dict(self._statuses)
+    
+    def render(self, cache_stats: Optional[Dict] = None, snapshot_info: Optional[Dict] = None,
+               coalescing_stats: Optional[Dict] = None) -> str:
+        """
+        Format the metrics as Prometheus text exposition.
+        
+        Args:
+            cache_stats: ResponseCache.stats() output to include
+            snapshot_info: FAQSnapshot.info() output to include
+            coalescing_stats: SingleFlight.stats() output to include
+            
+        Returns:
+            str: Metrics in Prometheus text format 0.0.4
+        """
+        lines = [
+            '# HELP faq_stage_seconds Time spent in each stage of a query.',
+            '# TYPE faq_stage_seconds histogram',
+        ]
+        with self._lock:
+            stages = [(stage, histogram.snapshot()) for stage, histogram in sorted(self._stages.items())]
+            candidates = self.candidates.snapshot()
+            scored = self.scored.snapshot()
+        for stage, histogram in stages:
+            lines.extend(_histogram_lines('faq_stage_seconds', LATENCY_BUCKETS, histogram,
+                                          f'stage="{stage}",'))
+        
+        lines.extend([
+            '# HELP faq_responses_total Query responses by status.',
+            '# TYPE faq_responses_total counter',
+        ])
+        for status, count in sorted(self.status_counts().items()):
+            lines.append(f'faq_responses_total{{status="{status}"}} {count}')
+        
+        lines.extend([
+            '# HELP faq_match_candidates Question variants returned by the index per match.',
+            '# TYPE faq_match_candidates histogram',
+        ])
+        lines.extend(_histogram_lines('faq_match_candidates', CANDIDATE_BUCKETS, candidates))
+        lines.extend([
+            '# HELP faq_match_scored Question variants fully scored per match.',
+            '# TYPE faq_match_scored histogram',
+        ])
+        lines.extend(_histogram_lines('faq_match_scored', CANDIDATE_BUCKETS, scored))
+        
+        if cache_stats is not None:
+            for name in ('hits', 'misses', 'expirations', 'evictions'):
+                lines.extend([
+                    f'# HELP faq_cache_{name}_total Response cache {name}.',
+                    f'# TYPE faq_cache_{name}_total counter',
+                    f'faq_cache_{name}_total {cache_stats[name]}',
+                ])
+            lines.extend([
+                '# HELP faq_cache_size Responses currently cached.',
+                '# TYPE faq_cache_size gauge',
+                f'faq_cache_size {cache_stats["size"]}',
+            ])
+        
+        if coalescing_stats is not None:
+            lines.extend([
+                '# HELP faq_coalesce_leaders_total Queries computed for themselves and any coalesced followers.',
+                '# TYPE faq_coalesce_leaders_total counter',
+                f'faq_coalesce_leaders_total {coalescing_stats["leaders"]}',
+                '# HELP faq_coalesced_total Queries that waited for an identical in-flight query.',
+                '# TYPE faq_coalesced_total counter',
+                f'faq_coalesced_total {coalescing_stats["coalesced"]}',
+                '# HELP faq_coalesce_timeouts_total Coalesced queries that stopped waiting and ran themselves.',
+                '# TYPE faq_coalesce_timeouts_total counter',
+                f'faq_coalesce_timeouts_total {coalescing_stats["timeouts"]}',
+                '# HELP faq_coalesce_failures_total Coalesced queries that ran themselves after their leader failed.',
+                '# TYPE faq_coalesce_failures_total counter',
+                f'faq_coalesce_failures_total {coalescing_stats["failures"]}',
+                '# HELP faq_coalesce_in_flight Distinct queries currently being matched.',
+                '# TYPE faq_coalesce_in_flight gauge',
+                f'faq_coalesce_in_flight {coalescing_stats["in_flight"]}',
+            ])
+        
+        if snapshot_info is not None:
+            lines.extend([
+                '# HELP faq_snapshot_variants Question variants in the active snapshot.',
+                '# TYPE faq_snapshot_variants gauge',
+                f'faq_snapshot_variants {snapshot_info["variants"]}',
+                '# HELP faq_snapshot_loaded_timestamp_seconds When the active snapshot was loaded.',
+                '# TYPE faq_snapshot_loaded_timestamp_seconds gauge',
+                f'faq_snapshot_loaded_timestamp_seconds {snapshot_info["loaded_at"]}',
+            ])
+        
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name: str, buckets: Sequence[float], histogram: Tuple[List[int], float, int],
+                     labels: str = '') -> List[str]:
+    """Prometheus sample lines for one Histogram.snapshot()."""
+    cumulative, total, count = histogram
+    bounds = [repr(float(bound)) for bound in buckets] + ['+Inf']
+    lines = [f'{name}_bucket{{{labels}le="{bound}"}} {value}' for bound, value in zip(bounds, cumulative)]
+    suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {total}')
+    lines.append(f'{name}_count{suffix} {count}')
+    return lines
+
+
+class FAQFacet:
+    """Question variants of one category within a shard, with their own token index."""
+    
+    __slots__ = ('category', 'variant_ids', 'postings', 'entry_indexes')
+    
+    def __init__(self, category: Optional[str]):
+        """
+        Args:
+            category: Category of the entries, None for uncategorized ones
+        """
+        self.category = category
+        self.variant_ids: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+        # Positions in FAQSnapshot.ranked_entries, built for the 'tfidf' engine
+        self.entry_indexes: Optional['np.ndarray'] = None
+
+
+class FAQShard:
+    """Question variants of one scheme, or of the general FAQs, split into category facets."""
+    
+    __slots__ = ('name', 'variant_ids', 'facets')
+    
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Scheme name, or GENERAL_SHARD
+        """
+        self.name = name
+        self.variant_ids: List[int] = []
+        self.facets: Dict[Optional[str], FAQFacet] = {}
+
+
+def shard_name(scheme_name: Optional[str]) -> str:
+    """Name of the shard holding entries of a scheme."""
+    return scheme_name if scheme_name and scheme_name != GENERAL_SHARD else GENERAL_SHARD
+
+
+class FAQSnapshot:
+    """
+    Compiled corpus and match indexes for one version of faqs.json.
+    
+    A snapshot is not modified once built. FAQAssistant publishes a new one
+    on reload by swapping a single reference, and each query keeps using
+    the snapshot it started with, so the read path needs no locks.
+    """
+    
+    def __init__(self, raw_faqs: Union[Dict, Iterable[Tuple[str, Dict]]], version: str = '',
+                 engine: str = 'sequence', intent_keywords: Optional[Dict[str, Sequence[str]]] = None,
+                 canonicalizer: Optional[QueryCanonicalizer] = None):
+        """
+        Compile the corpus and build the inverted token index over it.
+        
+        Each entry becomes an FAQEntry and each question variant a
+        QuestionVariant in a flat list in FAQ order. Every token then maps to
+        the ids of the variants containing it, so a query only needs to score
+        variants it shares at least one token with.
+        
+        Variants are also partitioned into shards by scheme_name and within
+        them into facets by category, each facet with its own token index,
+        so a query naming a scheme or asking about a category only looks up
+        the variants that can answer it.
+        
+        Entries are consumed one at a time, so a streamed corpus is never
+        held in raw form. A repeated q_key keeps its first entry.
+        
+        Args:
+            raw_faqs: FAQ entries as loaded from faqs.json, or an iterable of
+                (q_key, raw_entry) pairs such as iter_faq_file() yields
+            version: Content hash of the faqs.json the entries came from
+            engine: Match engine the indexes are built for
+            intent_keywords: Category -> intent keywords for the snapshot's
+                IntentClassifier
+            canonicalizer: Canonicalizer applied to every question variant
+                and intent keyword; queries must use the same one. If None,
+                uses a QueryCanonicalizer with the default word lists.
+        """
+        start = time.perf_counter()
+        if canonicalizer is None:
+            canonicalizer = QueryCanonicalizer(memo_size=0)
+        self.version = version
+        self.entries: List[FAQEntry] = []
+        self.variants: List[QuestionVariant] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.shards: Dict[str, FAQShard] = {}
+        
+        if isinstance(raw_faqs, dict):
+            raw_faqs = raw_faqs.items()
+        
+        seen_keys = set()
+        for q_key, raw_entry in raw_faqs:
+            if q_key in seen_keys:
+                print(f"Warning: Duplicate FAQ key '{q_key}' ignored", file=sys.stderr)
+                continue
+            seen_keys.add(q_key)
+            # Compile the whole entry before adding it, so a malformed one
+            # is skipped without leaving variants behind
+            try:
+                entry = FAQEntry(q_key, raw_entry)
+                compiled_variants = [QuestionVariant(entry, variant, canonicalizer)
+                                     for variant in entry.question_variants]
+                name = shard_name(entry.scheme_name)
+                hash((name, entry.category))
+            except (AttributeError, TypeError, ValueError) as e:
+                print(f"Warning: Invalid FAQ entry '{q_key}' skipped: {e}", file=sys.stderr)
+                continue
+            self.entries.append(entry)
+            shard = self.shards.get(name)
+            if shard is None:
+                shard = self.shards[name] = FAQShard(name)
+            facet = shard.facets.get(entry.category)
+            if facet is None:
+                facet = shard.facets[entry.category] = FAQFacet(entry.category)
+            for compiled in compiled_variants:
+                variant_id = len(self.variants)
+                if engine == 'sequence':
+                    compiled.build_matcher()
+                self.variants.append(compiled)
+                shard.variant_ids.append(variant_id)
+                facet.variant_ids.append(variant_id)
+                for term in compiled.terms:
+                    self.postings.setdefault(term, []).append(variant_id)
+                    facet.postings.setdefault(term, []).append(variant_id)
+        
+        self.intents = IntentClassifier(intent_keywords or {}, self.variants, canonicalizer)
+        
+        self.tfidf = None
+        if engine == 'tfidf':
+            self.tfidf = TfidfMatcher([variant.text for variant in self.variants])
+            # First variant id of each entry with variants, for per-entry maxima
+            self.ranked_entries = [entry for entry in self.entries if entry.question_variants]
+            self.entry_starts = np.cumsum(
+                [0] + [len(entry.question_variants) for entry in self.ranked_entries[:-1]]
+            ).astype(np.int64)
+            facet_entries: Dict[Tuple[str, Optional[str]], List[int]] = {}
+            for index, entry in enumerate(self.ranked_entries):
+                facet_entries.setdefault((shard_name(entry.scheme_name), entry.category), []).append(index)
+            for (name, category), indexes in facet_entries.items():
+                self.shards[name].facets[category].entry_indexes = np.asarray(indexes, dtype=np.int64)
+        
+        self.shared_path: Optional[Path] = None
+        self.shared_bytes = 0
+        
+        self.loaded_at = time.time()
+        # Build time only; FAQAssistant adds file reading and parsing
+        self.load_seconds = time.perf_counter() - start
+    
+    def candidate_ids(self, query_terms: set, max_candidates: Optional[int] = None,
+                      shards: Optional[Sequence[str]] = None,
+                      categories: Optional[Sequence[str]] = None) -> List[int]:
+        """
+        Get ids of the variants worth scoring for a query, in FAQ order.
+        
+        Args:
+            query_terms: Set of lowercased query tokens
+            max_candidates: Keep only this many variants with the most
+                shared tokens. None keeps all of them.
+            shards: Names of the shards to search. None searches them all.
+            categories: Categories to search, plus uncategorized entries.
+                None searches them all.
+            
+        Returns:
+            Sorted list of variant ids
+        """
+        if shards is None and categories is None:
+            facets = None
+            indexes = [self.postings]
+        else:
+            facets = self.select_facets(shards, categories)
+            indexes = [facet.postings for facet in facets]
+        
+        # A query without tokens cannot be pruned by the index
+        if not query_terms:
+            if facets is None:
+                return list(range(len(self.variants)))
+            return sorted(variant_id for facet in facets for variant_id in facet.variant_ids)
+        
+        overlap_counts = Counter()
+        for postings in indexes:
+            for term in query_terms:
+                overlap_counts.update(postings.get(term, ()))
+        
+        if max_candidates is not None and len(overlap_counts) > max_candidates:
+            best = heapq.nlargest(max_candidates, overlap_counts.items(), key=lambda item: item[1])
+            return sorted(variant_id for variant_id, _ in best)
+        
+        return sorted(overlap_counts)
+    
+    def select_facets(self, shards: Optional[Sequence[str]] = None,
+                      categories: Optional[Sequence[str]] = None) -> List[FAQFacet]:
+        """
+        Get the facets of some shards and categories.
+        
+        Args:
+            shards: Shard names; None selects every shard
+            categories: Categories; None selects every category. Facets of
+                uncategorized entries are always selected.
+        
+        Returns:
+            list: Matching facets
+        """
+        if shards is None:
+            selected = self.shards.values()
+        else:
+            selected = [self.shards[name] for name in shards if name in self.shards]
+        return [
+            facet
+            for shard in selected
+            for category, facet in shard.facets.items()
+            if categories is None or category is None or category in categories
+        ]
+    
+    def shard_entry_indexes(self, shards: Optional[Sequence[str]] = None,
+                            categories: Optional[Sequence[str]] = None) -> 'np.ndarray':
+        """
+        Get the positions in ranked_entries of the entries in some facets.
+        
+        Args:
+            shards: Shard names; None selects every shard
+            categories: Categories; None selects every category
+        
+        Returns:
+            Ascending array of positions, so FAQ order decides ties
+        """
+        parts = [facet.entry_indexes for facet in self.select_facets(shards, categories)
+                 if facet.entry_indexes is not None]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+    
+    def share(self, directory: Path) -> int:
+        """
+        Memory-map the snapshot's numeric index into directory.
+        
+        Only the 'tfidf' engine has an array index to map; the compiled
+        entries and the token index are Python objects, which forked
+        processes share copy-on-write instead.
+        
+        Args:
+            directory: Directory for the index files, one subdirectory per
+                snapshot version
+            
+        Returns:
+            int: Bytes of index data memory-mapped
+        """
+        if self.tfidf is not None and self.shared_path is None:
+            path = Path(directory) / f'tfidf-{self.version or "empty"}'
+            self.shared_bytes = self.tfidf.share(path)
+            self.shared_path = path
+        return self.shared_bytes
+    
+    def info(self) -> Dict:
+        """
+        Describe the snapshot for monitoring.
+        
+        Returns:
+            dict: version, loaded_at (Unix time), load_seconds, entries and
+            variants counts, variants per shard, and shared_path
+            (memory-mapped index directory or None)
+        """
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'entries': len(self.entries),
+            'variants': len(self.variants),
+            'shards': {name: len(shard.variant_ids) for name, shard in self.shards.items()},
+            'shared_path': str(self.shared_path) if self.shared_path else None,
+        }
+
+
+class FAQAssistant:
+    """FAQ Assistant that matches user queries against FAQ database."""
+    
+    def __init__(self, faqs_path: Optional[Path] = None, max_candidates: Optional[int] = None,
+                 engine: str = 'sequence', cache_size: int = 1024, cache_ttl: float = 300.0,
+                 config_path: Optional[Path] = None, advice_triggers: Optional[Sequence[str]] = None,
+                 scheme_aliases: Optional[Dict[str, str]] = None,
+                 intent_keywords: Optional[Dict[str, Sequence[str]]] = None,
+                 intent_confidence: Optional[float] = None,
+                 canonicalizer: Optional[QueryCanonicalizer] = None,
+                 coalesce_timeout: float = 5.0):
+        """
+        Initialize FAQ Assistant.
+        
+        Args:
+            faqs_path: Path to faqs.json file, or to a JSON Lines corpus if it
+                ends in .jsonl. If None, uses default path.
+            max_candidates: Cap on the number of question variants scored per
+                query, keeping those with the most shared tokens. None scores
+                every variant that shares at least one token with the query.
+            engine: Scoring engine, one of MATCH_ENGINES. 'sequence' combines
+                SequenceMatcher and word overlap per variant; 'tfidf' scores
+                the whole corpus at once with character n-gram TF-IDF cosine
+                similarity and requires numpy and scipy.
+            cache_size: Maximum number of cached query responses, 0 to disable
+            cache_ttl: Seconds a cached query response stays valid
+            config_path: Path to config.yml. If None, uses default path.
+            advice_triggers: Advice trigger phrases. If None, uses
+                ADVICE_TRIGGERS plus the advice_triggers listed in config.yml.
+            scheme_aliases: Mapping of lowercased alias to scheme name used
+                to route queries to scheme shards. If None, uses the schemes
+                and aliases listed in config.yml; empty disables routing.
+            intent_keywords: Category -> keywords used to limit matching to
+                the categories a query asks about. If None, uses
+                intents.categories in config.yml; empty disables the filter.
+            intent_confidence: Lowest intent confidence (0-1) at which the
+                category filter applies; less confident queries are matched
+                against every category. If None, uses intents.min_confidence
+                in config.yml, else INTENT_CONFIDENCE.
+            canonicalizer: Canonicalizer applied once to each query and to
+                the corpus. If None, uses STOPWORDS and SYNONYMS plus the
+                canonicalization settings in config.yml.
+            coalesce_timeout: Seconds a query waits for an identical query
+                already being matched before matching it itself, 0 to
+                disable coalescing
+        """
+        if engine not in MATCH_ENGINES:
+            raise ValueError(f"Unknown match engine '{engine}', expected one of: {', '.join(MATCH_ENGINES)}")
+        
+        if faqs_path is None:
+            # Default path: project_root/src/data/faqs.json
+            script_dir = Path(__file__).parent
+            faqs_path = script_dir / 'data' / 'faqs.json'
+        
+        self.faqs_path = faqs_path
+        self.config = load_config(config_path or DEFAULT_CONFIG_PATH)
+        if canonicalizer is None:
+            canonicalizer = config_canonicalizer(self.config)
+        self.canonicalizer = canonicalizer
+        if advice_triggers is None:
+            advice_triggers = ADVICE_TRIGGERS + config_advice_triggers(self.config)
+        # Triggers are phrases, so they are matched on folded text with the
+        # stopwords in "should i" or "invest in" still present
+        self._advice_automaton = TriggerAutomaton([canonicalizer.fold(phrase) for phrase in advice_triggers])
+        if scheme_aliases is None:
+            scheme_aliases = config_scheme_aliases(self.config)
+        self._scheme_aliases: Dict[str, str] = {}
+        for alias, name in scheme_aliases.items():
+            alias = canonicalizer.canonicalize(alias, memoize=False).text
+            if alias:
+                self._scheme_aliases.setdefault(alias, name)
+        self._scheme_automaton = TriggerAutomaton(list(self._scheme_aliases))
+        if intent_keywords is None:
+            intent_keywords = config_intent_keywords(self.config)
+        self.intent_keywords = intent_keywords
+        if intent_confidence is None:
+            intent_confidence = (self.config.get('intents') or {}).get('min_confidence', INTENT_CONFIDENCE)
+        self.intent_confidence = float(intent_confidence)
+        self.max_candidates = max_candidates
+        self.engine = engine
+        self._cache = ResponseCache(max_size=cache_size, ttl=cache_ttl)
+        self._flights = SingleFlight(timeout=coalesce_timeout)
+        self.metrics = QueryMetrics()
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_stop = threading.Event()
+        
+        start = time.perf_counter()
+        self._snapshot = self._load_snapshot(start) or FAQSnapshot({}, '', engine, intent_keywords,
+                                                                   canonicalizer)
+    
+    @property
+    def snapshot(self) -> FAQSnapshot:
+        """Currently published corpus snapshot."""
+        return self._snapshot
+    
+    @property
+    def entries(self) -> List[FAQEntry]:
+        """Compiled FAQ entries of the current snapshot, in FAQ order."""
+        return self._snapshot.entries
+    
+    @property
+    def data_version(self) -> str:
+        """Content hash of the faqs.json behind the current snapshot."""
+        return self._snapshot.version
+    
+    @property
+    def faqs(self) -> Dict[str, Dict]:
+        """
+        FAQ entries in their faqs.json form, keyed by q_key.
+        
+        The dicts are rebuilt from the compiled corpus on every access, so
+        this view is meant for inspection and validation, not the query path.
+        """
+        return {entry.q_key: entry.to_dict() for entry in self.entries}
+    
+    def _load_snapshot(self, start: float, current_version: Optional[str] = None) -> Optional[FAQSnapshot]:
+        """
+        Stream the FAQ file into a new snapshot.
+        
+        The file is hashed first, so an unchanged file is not parsed again.
+        Entries are then parsed one at a time and compiled as they arrive.
+        
+        Args:
+            start: perf_counter() value from before the file was read
+            current_version: Version of the published snapshot, if any
+            
+        Returns:
+            Snapshot with load_seconds covering reading, parsing and
+            indexing, or None if the file is unchanged, missing or invalid
+        """
+        try:
+            version = file_content_hash(self.faqs_path)
+            if version == current_version:
+                return None
+            snapshot = FAQSnapshot(iter_faq_file(self.faqs_path), version, self.engine,
+                                   self.intent_keywords, self.canonicalizer)
+        except FileNotFoundError:
+            print(f"Error: FAQ file not found at {self.faqs_path}", file=sys.stderr)
+            return None
+        except ValueError as e:
+            print(f"Error: Invalid JSON in FAQ file: {e}", file=sys.stderr)
+            return None
+        
+        snapshot.load_seconds = time.perf_counter() - start
+        return snapshot
+    
+    def reload(self) -> bool:
+        """
+        Reload faqs.json and publish it as a new snapshot.
+        
+        The new corpus and indexes are built while queries keep running on
+        the current snapshot, then published with a single reference swap.
+        The current snapshot stays in place if the file is unchanged, missing
+        or invalid.
+        
+        Returns:
+            True if a new snapshot was published, False otherwise
+        """
+        # Serializes concurrent reloads; queries never take this lock
+        with self._reload_lock:
+            snapshot = self._load_snapshot(time.perf_counter(), self._snapshot.version)
+            if snapshot is None:
+                return False
+            
+            self._snapshot = snapshot
+            # Cached responses refer to the previous snapshot
+            self._cache.clear()
+            return True
+    
+    def share_index(self, directory: Path) -> int:
+        """
+        Memory-map the current snapshot's index for sharing across processes.
+        
+        Call before forking worker processes. Snapshots published later by
+        reload() are not shared until this is called again.
+        
+        Args:
+            directory: Directory for the memory-mapped index files
+            
+        Returns:
+            int: Bytes of index data memory-mapped (0 for the 'sequence'
+            engine, which has no array index)
+        """
+        return self._snapshot.share(directory)
+    
+    def snapshot_info(self) -> Dict:
+        """
+        Describe the currently published snapshot.
+        
+        Returns:
+            dict: version, loaded_at (Unix time), load_seconds, entries and
+            variants counts, and shared_path (memory-mapped index directory
+            or None)
+        """
+        return self._snapshot.info()
+    
+    def start_watcher(self, interval: float = 2.0):
+        """
+        Reload automatically when faqs.json changes.
+        
+        A daemon thread polls the file's modification time and size every
+        interval seconds and calls reload() when either changes.
+        
+        Args:
+            interval: Seconds between polls
+        """
+        if self._watcher is not None:
+            return
+        
+        self._watcher_stop.clear()
+        # Taken before the thread starts so edits made right after are seen
+        signature = self._file_signature()
+        self._watcher = threading.Thread(target=self._watch, args=(interval, signature),
+                                         name='faq-watcher', daemon=True)
+        self._watcher.start()
+    
+    def stop_watcher(self):
+        """Stop the faqs.json watcher thread, if running."""
+        if self._watcher is None:
+            return
+        
+        self._watcher_stop.set()
+        self._watcher.join()
+        self._watcher = None
+    
+    def _watch(self, interval: float, last_signature: Optional[Tuple[int, int]]):
+        """Poll faqs.json until stop_watcher() is called."""
+        while not self._watcher_stop.wait(interval):
+            signature = self._file_signature()
+            if signature == last_signature:
+                continue
+            
+            last_signature = signature
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error reloading FAQs: {e}", file=sys.stderr)
+    
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        """Get (mtime_ns, size) of faqs.json, or None if it is missing."""
+        try:
+            stat = os.stat(self.faqs_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def detect_pii(self, query: str) -> Tuple[bool, List[str]]:
+        """
+        Detect PII in user query.
+        
+        Args:
+            query: User query string
+            
+        Returns:
+            tuple: (has_pii, detected_patterns)
+        """
+        found = {match.lastgroup for match in PII_PATTERN.finditer(query)}
+        if not found:
+            return False, []
+        
+        detected = [pii_type for group, pii_type in PII_GROUP_TYPES.items() if group in found]
+        return True, detected
+    
+    def contains_pii(self, query: str) -> bool:
+        """
+        Check whether a query contains any PII, stopping at the first hit.
+        
+        Args:
+            query: User query string
+            
+        Returns:
+            True if PII is present, False otherwise
+        """
+        return PII_PATTERN.search(query) is not None
+    
+    def scan_pii(self, query: str) -> List[PIISpan]:
+        """
+        Find all PII in a query in a single pass.
+        
+        Args:
+            query: User query string
+            
+        Returns:
+            list: Non-overlapping PIISpan records in order of position
+        """
+        return [
+            PIISpan(PII_GROUP_TYPES[match.lastgroup], match.start(), match.end())
+            for match in PII_PATTERN.finditer(query)
+        ]
+    
+    def redact_pii(self, query: str, spans: Optional[List[PIISpan]] = None) -> str:
+        """
+        Replace PII in a query with its type, e.g. "My PAN is [PAN]".
+        
+        Args:
+            query: User query string
+            spans: Spans from scan_pii() for this query, to avoid scanning
+                it again. If None, the query is scanned.
+            
+        Returns:
+            Query with each PII span replaced by its bracketed type
+        """
+        if spans is None:
+            spans = self.scan_pii(query)
+        
+        parts = []
+        position = 0
+        for span in spans:
+            parts.append(query[position:span.start])
+            parts.append(f'[{span.pii_type}]')
+            position = span.end
+        parts.append(query[position:])
+        return ''.join(parts)
+    
+    def canonicalize(self, query: str) -> CanonicalQuery:
+        """
+        Get the canonical form of a query, from the memo table if it was
+        seen recently.
+        
+        Args:
+            query: User query string
+        
+        Returns:
+            CanonicalQuery: Folded text, canonical tokens and canonical text
+        """
+        return self.canonicalizer.canonicalize(query)
+    
+    def detect_advice_request(self, query: str) -> bool:
+        """
+        Detect if query is requesting investment advice.
+        
+        Args:
+            query: User query string
+            
+        Returns:
+            True if advice is requested, False otherwise
+        """
+        return self._advice_automaton.search(self.canonicalize(query).folded) is not None
     
-    def __init__(self, faqs_path: Optional[Path] = None):
+    def find_advice_trigger(self, query: str) -> Optional[Tuple[str, int]]:
         """
-        Initialize FAQ Assistant.
+        Find the advice trigger phrase in a query.
+        
+        Triggers are matched on the folded query, as in query(), and the
+        offset is mapped back to the query as given.
         
         Args:
-            faqs_path: Path to faqs.json file. If None, uses default path.
+            query: User query string
+            
+        Returns:
+            tuple: (trigger, offset) of the first trigger, where offset is the
+            index in query of the character the trigger starts at; or None
+            if the query does not ask for advice
         """
-        if faqs_path is None:
-            # Default path: project_root/src/data/faqs.json
-            script_dir = Path(__file__).parent
-            faqs_path = script_dir / 'data' / 'faqs.json'
+        folded, offsets = self.canonicalizer.fold_with_offsets(query)
+        found = self._advice_automaton.search(folded)
+        if found is None:
+            return None
+        trigger, index = found
+        return trigger, offsets[index]
+    
+    def detect_schemes(self, query: str) -> List[str]:
+        """
+        Detect the schemes a query names.
         
-        self.faqs_path = faqs_path
-        self.faqs = self._load_faqs()
+        All scheme names and aliases are found in one pass over the query.
+        An alias only counts as whole words, so "gilt" does not match inside
+        "guilty".
+        
+        Args:
+            query: User query string
+        
+        Returns:
+            list: Scheme names in the order they are mentioned, empty if none
+        """
+        return self._detect_schemes(self.canonicalize(query))
     
-    def _load_faqs(self) -> Dict:
-        """Load FAQs from JSON file."""
-        try:
-            with open(self.faqs_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: FAQ file not found at {self.faqs_path}", file=sys.stderr)
-            return {}
-        except json.JSONDecodeError as e:
-            print(f"Error: Invalid JSON in FAQ file: {e}", file=sys.stderr)
-            return {}
+    def _detect_schemes(self, canonical: CanonicalQuery) -> List[str]:
+        """Detect the schemes a canonicalized query names."""
+        text = canonical.text
+        schemes = []
+        for alias, offset in self._scheme_automaton.find_all(text):
+            end = offset + len(alias)
+            if (offset > 0 and text[offset - 1].isalnum()) or (end < len(text) and text[end].isalnum()):
+                continue
+            scheme = self._scheme_aliases[alias]
+            if scheme not in schemes:
+                schemes.append(scheme)
+        return schemes
     
-    def detect_pii(self, query: str) -> Tuple[bool, List[str]]:
+    def _route(self, canonical: CanonicalQuery, snapshot: FAQSnapshot) -> Optional[List[str]]:
         """
-        Detect PII in user query.
+        Pick the shards to search for a query.
+        
+        Args:
+            canonical: Canonicalized query
+            snapshot: Corpus snapshot to search
+        
+        Returns:
+            list: Shards of the schemes the query names plus the general
+            shard, or None to search the whole corpus if it names none
+        """
+        schemes = self._detect_schemes(canonical)
+        if not schemes:
+            return None
+        return [scheme for scheme in schemes if scheme in snapshot.shards] + [GENERAL_SHARD]
+    
+    def classify_intent(self, query: str) -> Tuple[List[str], float]:
+        """
+        Classify the FAQ categories a query asks about.
+        
+        Args:
+            query: User query string
+        
+        Returns:
+            tuple: (categories, confidence) as IntentClassifier.classify
+            returns them, measured on the current snapshot
+        """
+        return self._snapshot.intents.classify(self.canonicalize(query).text)
+    
+    def _categories(self, canonical: CanonicalQuery, snapshot: FAQSnapshot,
+                    shards: Optional[List[str]]) -> Optional[List[str]]:
+        """
+        Pick the categories to search for a query.
+        
+        Args:
+            canonical: Canonicalized query
+            snapshot: Corpus snapshot to search
+            shards: Shards the query is routed to
+        
+        Returns:
+            list: Categories the query asks about, or None to search every
+            category when the intent is unclear or the routed shards hold
+            no entry of the detected categories
+        """
+        categories, confidence = snapshot.intents.classify(canonical.text)
+        if not categories or confidence < self.intent_confidence:
+            return None
+        if not any(facet.category is not None for facet in snapshot.select_facets(shards, categories)):
+            return None
+        return categories
+    
+    def fuzzy_match(self, query: str, threshold: float = 0.4) -> Optional[Tuple[str, Dict, float]]:
+        """
+        Find best matching FAQ using fuzzy matching.
         
         Args:
             query: User query string
+            threshold: Minimum similarity threshold (0-1)
             
         Returns:
-            tuple: (has_pii, detected_patterns)
+            tuple: (q_key, faq_entry, similarity_score) or None if no match
         """
-        detected = []
+        match = self._best_entry(self.canonicalize(query), threshold, self._snapshot)
+        if match is None:
+            return None
         
-        # Check for PAN
-        if PAN_PATTERN.search(query):
-            detected.append('PAN')
+        entry, score = match
+        return entry.q_key, entry.to_dict(), score
+    
+    def _best_entry(self, canonical: CanonicalQuery, threshold: float,
+                    snapshot: FAQSnapshot) -> Optional[Tuple[FAQEntry, float]]:
+        """
+        Score the query against a compiled corpus.
         
-        # Check for Aadhaar
-        if AADHAAR_PATTERN.search(query):
-            detected.append('Aadhaar')
+        A query naming a scheme is only scored against that scheme's shard
+        and the general shard, and a query with a clear intent only against
+        entries of the categories it asks about.
         
-        # Check for account numbers (9-18 digits)
-        if ACCOUNT_PATTERN.search(query):
-            detected.append('Account Number')
+        Args:
+            canonical: Canonicalized query
+            threshold: Minimum similarity threshold (0-1)
+            snapshot: Corpus snapshot to score against
+            
+        Returns:
+            tuple: (faq_entry, similarity_score) or None if no match
+        """
+        # Greetings and queries made only of stopwords ask nothing
+        if not canonical.tokens:
+            return None
         
-        return len(detected) > 0, detected
+        shards = self._route(canonical, snapshot)
+        categories = self._categories(canonical, snapshot, shards)
+        if snapshot.tfidf is None:
+            ranked = self._rank_entries_sequence(canonical, threshold, snapshot, 1, shards, categories)
+        elif shards is None and categories is None:
+            return self._best_entry_tfidf(canonical, threshold, snapshot)
+        else:
+            ranked = self._rank_entries_tfidf(canonical, threshold, snapshot, 1, shards, categories)
+        return ranked[0] if ranked else None
     
-    def detect_advice_request(self, query: str) -> bool:
+    def rank_matches(self, query: str, top_k: int = 3,
+                     threshold: float = SUGGESTION_THRESHOLD) -> Tuple[List[Tuple[str, Dict, float]], Optional[float]]:
         """
-        Detect if query is requesting investment advice.
+        Find the top_k best matching FAQs in a single scoring pass.
+        
+        Each FAQ appears at most once, scored by its best question variant.
         
         Args:
             query: User query string
+            top_k: Maximum number of FAQs to return
+            threshold: Minimum similarity threshold (0-1)
             
         Returns:
-            True if advice is requested, False otherwise
+            tuple: (matches, margin) where matches is a list of
+            (q_key, faq_entry, similarity_score) from best to worst, and
+            margin is the score gap between ranks 1 and 2 (a missing rank 2
+            counts as 0.0), or None if nothing matched
         """
-        query_lower = query.lower()
-        return any(trigger in query_lower for trigger in ADVICE_TRIGGERS)
+        ranked = self._rank_entries(self.canonicalize(query), threshold, self._snapshot, top_k)
+        matches = [(entry.q_key, entry.to_dict(), score) for entry, score in ranked]
+        return matches, _ranking_margin(ranked)
     
-    def fuzzy_match(self, query: str, threshold: float = 0.4) -> Optional[Tuple[str, Dict, float]]:
+    def _rank_entries(self, canonical: CanonicalQuery, threshold: float, snapshot: FAQSnapshot,
+                      top_k: int) -> List[Tuple[FAQEntry, float]]:
         """
-        Find best matching FAQ using fuzzy matching.
+        Rank the best top_k FAQ entries for a query.
         
         Args:
-            query: User query string
+            canonical: Canonicalized query
             threshold: Minimum similarity threshold (0-1)
+            snapshot: Corpus snapshot to score against
+            top_k: Maximum number of entries to return
             
         Returns:
-            tuple: (q_key, faq_entry, similarity_score) or None if no match
+            list: (faq_entry, similarity_score) from best to worst
+        """
+        if not canonical.tokens:
+            return []
+        
+        shards = self._route(canonical, snapshot)
+        categories = self._categories(canonical, snapshot, shards)
+        if snapshot.tfidf is not None:
+            return self._rank_entries_tfidf(canonical, threshold, snapshot, top_k, shards, categories)
+        return self._rank_entries_sequence(canonical, threshold, snapshot, top_k, shards, categories)
+    
+    def _rank_entries_sequence(self, canonical: CanonicalQuery, threshold: float, snapshot: FAQSnapshot, top_k: int,
+                               shards: Optional[List[str]] = None,
+                               categories: Optional[List[str]] = None) -> List[Tuple[FAQEntry, float]]:
+        """
+        Rank FAQ entries with the 'sequence' engine.
+        
+        Candidates arrive in FAQ order, so all variants of an entry are
+        scored back to back. Each entry's best score goes into a min-heap
+        holding the top_k entries seen so far; ties keep the earlier entry.
+        
+        Args:
+            canonical: Canonicalized query
+            threshold: Minimum similarity threshold (0-1)
+            snapshot: Corpus snapshot to score against
+            top_k: Maximum number of entries to return
+            shards: Shards to search; None searches the whole corpus
+            categories: Categories to search; None searches them all
+            
+        Returns:
+            list: (faq_entry, similarity_score) from best to worst
         """
-        query_lower = query.lower().strip()
-        best_match = None
-        best_score = 0.0
+        query_lower = canonical.text
+        substring_floor = len(canonical.tokens) >= SUBSTRING_MIN_TOKENS
+        # (score, -first_variant_id, entry), so the root is the entry to drop
+        top: List[Tuple[float, int, FAQEntry]] = []
+        entry = None
+        entry_score = 0.0
+        entry_order = 0
+        
+        def keep_entry():
+            # Entries must score above zero, like a plain best-match scan
+            if entry is None or entry_score <= 0.0 or entry_score < threshold:
+                return
+            item = (entry_score, -entry_order, entry)
+            if len(top) < top_k:
+                heapq.heappush(top, item)
+            elif item[:2] > top[0][:2]:
+                heapq.heapreplace(top, item)
         
         # Extract key terms from query
-        query_terms = set(query_lower.split())
+        query_terms = set(canonical.tokens)
+        query_length = len(query_lower)
+        query_counts = Counter(query_lower)
         
-        # Collect all question variants and calculate similarity
-        for q_key, faq_entry in self.faqs.items():
-            question_variants = faq_entry.get('question_variants', [])
-            for variant in question_variants:
-                variant_lower = variant.lower()
-                
-                # Calculate multiple similarity metrics
-                # 1. Sequence similarity
-                sequence_sim = SequenceMatcher(None, query_lower, variant_lower).ratio()
-                
-                # 2. Word overlap similarity
-                variant_terms = set(variant_lower.split())
-                if query_terms and variant_terms:
-                    overlap = len(query_terms & variant_terms) / len(query_terms | variant_terms)
-                else:
-                    overlap = 0.0
-                
-                # 3. Combined score (weighted average)
-                combined_score = (sequence_sim * 0.6) + (overlap * 0.4)
-                
-                # 4. Check for substring match (boost score)
-                if query_lower in variant_lower or variant_lower in query_lower:
-                    combined_score = max(combined_score, 0.7)
-                
-                if combined_score > best_score:
-                    best_score = combined_score
-                    best_match = (q_key, faq_entry, combined_score)
+        # Score only the variants sharing a token with the query. Variants
+        # outside the candidate set have zero word overlap, so the index only
+        # drops variants whose score comes from sequence similarity alone.
+        candidate_ids = snapshot.candidate_ids(query_terms, self.max_candidates, shards, categories)
+        scored = 0
+        for variant_id in candidate_ids:
+            variant = snapshot.variants[variant_id]
+            variant_lower = variant.text
+            variant_terms = variant.terms
+            
+            if variant.entry is not entry:
+                keep_entry()
+                entry = variant.entry
+                entry_score = 0.0
+                entry_order = variant_id
+            
+            # Score a variant has to beat to change the ranking
+            best_score = entry_score
+            if len(top) == top_k and top[0][0] > best_score:
+                best_score = top[0][0]
+            
+            # Calculate multiple similarity metrics, cheapest first. Each
+            # stage gives an upper bound on the combined score; a variant is
+            # dropped as soon as its bound cannot beat best_score or reach
+            # the threshold, which leaves the ranking unchanged.
+            # 1. Word overlap similarity
+            if query_terms and variant_terms:
+                shared = len(query_terms & variant_terms)
+                overlap = shared / (len(query_terms) + len(variant_terms) - shared)
+            else:
+                overlap = 0.0
+            
+            # 2. Substring match floors the score. It is checked on the
+            # canonical text only, like every other input to the ranking, as
+            # responses are cached and tagged per canonical text.
+            if substring_floor and (query_lower in variant_lower or variant_lower in query_lower):
+                floor = SUBSTRING_FLOOR
+            else:
+                floor = 0.0
+            
+            # 3. Length bound on sequence similarity (real_quick_ratio)
+            length = query_length + len(variant_lower)
+            bound = 2.0 * min(query_length, len(variant_lower)) / length if length else 1.0
+            combined_bound = max((bound * 0.6) + (overlap * 0.4), floor)
+            if combined_bound <= best_score or combined_bound < threshold:
+                continue
+            
+            # 4. Character multiset bound (quick_ratio), using the variant's
+            # precomputed character counts
+            variant_counts = variant.matcher.fullbcount
+            matches = sum(min(count, variant_counts.get(char, 0)) for char, count in query_counts.items())
+            bound = 2.0 * matches / length if length else 1.0
+            combined_bound = max((bound * 0.6) + (overlap * 0.4), floor)
+            if combined_bound <= best_score or combined_bound < threshold:
+                continue
+            
+            # 5. Sequence similarity, reusing the variant's cached analysis
+            scored += 1
+            matcher = copy.copy(variant.matcher)
+            matcher.set_seq1(query_lower)
+            sequence_sim = matcher.ratio()
+            
+            # 6. Combined score (weighted average)
+            combined_score = (sequence_sim * 0.6) + (overlap * 0.4)
+            combined_score = max(combined_score, floor)
+            
+            if combined_score > entry_score:
+                entry_score = combined_score
+        
+        keep_entry()
+        self.metrics.observe_candidates(len(candidate_ids), scored)
+        return [(entry, score) for score, _, entry in sorted(top, reverse=True)]
+    
+    def _rank_entries_tfidf(self, canonical: CanonicalQuery, threshold: float, snapshot: FAQSnapshot, top_k: int,
+                            shards: Optional[List[str]] = None,
+                            categories: Optional[List[str]] = None) -> List[Tuple[FAQEntry, float]]:
+        """
+        Rank FAQ entries with the 'tfidf' engine.
+        
+        Variant scores from one matrix-vector product are reduced to
+        per-entry maxima, and the top_k entries are selected with a partial
+        sort; ties keep the earlier entry.
+        
+        Args:
+            canonical: Canonicalized query
+            threshold: Minimum similarity threshold (0-1)
+            snapshot: Corpus snapshot to score against
+            top_k: Maximum number of entries to return
+            shards: Shards whose entries may be ranked; None ranks all
+            categories: Categories whose entries may be ranked; None ranks all
+            
+        Returns:
+            list: (faq_entry, similarity_score) from best to worst
+        """
+        if not snapshot.ranked_entries:
+            return []
+        
+        scores = snapshot.tfidf.scores(canonical.text)
+        # The matrix product scores every variant
+        self.metrics.observe_candidates(len(scores), len(scores))
+        entry_scores = np.minimum(np.maximum.reduceat(scores, snapshot.entry_starts), 1.0)
+        ranked_entries = snapshot.ranked_entries
+        if shards is not None or categories is not None:
+            positions = snapshot.shard_entry_indexes(shards, categories)
+            entry_scores = entry_scores[positions]
+            ranked_entries = [ranked_entries[position] for position in positions]
         
-        return best_match if best_score >= threshold else None
+        if top_k < len(entry_scores):
+            top = np.argpartition(-entry_scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(entry_scores))
+        # Highest score first, earlier entry first on ties
+        top = top[np.lexsort((top, -entry_scores[top]))]
+        
+        return [
+            (ranked_entries[index], float(entry_scores[index]))
+            for index in top
+            if entry_scores[index] > 0.0 and entry_scores[index] >= threshold
+        ]
+    
+    def _best_entry_tfidf(self, canonical: CanonicalQuery, threshold: float,
+                          snapshot: FAQSnapshot) -> Optional[Tuple[FAQEntry, float]]:
+        """
+        Score the query against a whole corpus with the TF-IDF engine.
+        
+        Args:
+            canonical: Canonicalized query
+            threshold: Minimum similarity threshold (0-1)
+            snapshot: Corpus snapshot to score against
+            
+        Returns:
+            tuple: (faq_entry, similarity_score) or None if no match
+        """
+        best = snapshot.tfidf.best(canonical.text)
+        self.metrics.observe_candidates(snapshot.tfidf.n_rows, snapshot.tfidf.n_rows)
+        if best is None:
+            return None
+        
+        variant_id, score = best
+        return (snapshot.variants[variant_id].entry, score) if score >= threshold else None
     
-    def query(self, user_query: str) -> Dict:
+    def query(self, user_query: str, top_k: Optional[int] = None) -> Dict:
         """
         Process user query and return response.
         
         Args:
             user_query: User's question
+            top_k: If set, success and no_match responses also carry up to
+                top_k ranked "did you mean" alternatives and the score
+                margin between the two best matches
             
         Returns:
             dict: Response with answer, source, last_updated, and status
         """
+        return _copy_response(self._respond(user_query, top_k).response)
+    
+    def query_json(self, user_query: str, top_k: Optional[int] = None) -> bytes:
+        """
+        Process user query and return the response as JSON.
+        
+        Static outcomes are encoded once at import and success bodies once
+        per entry at load, with the similarity appended per query, so the
+        body is never built from a dict on the hot path; cached responses
+        are returned as stored.
+        
+        Args:
+            user_query: User's question
+            top_k: Number of ranked alternatives to include, as for query()
+        
+        Returns:
+            bytes: Compact ASCII JSON of the response query() returns
+        """
+        return self._respond(user_query, top_k).body
+    
+    def query_etag(self, user_query: str, top_k: Optional[int] = None) -> Optional[str]:
+        """
+        Get an entity tag for the response to a query without matching it.
+        
+        The tag is derived from the snapshot version and the canonical
+        query, the same inputs the response cache is keyed on, so queries
+        sharing a canonical form share a tag and any change to faqs.json
+        rolls every tag. Advice requests share one tag, as their response
+        does not depend on the corpus.
+        
+        Args:
+            user_query: User's question
+            top_k: Number of ranked alternatives requested, as for query()
+        
+        Returns:
+            str: Strong entity tag, unquoted; or None if the query contains
+            PII, as its response must not be stored by any cache
+        """
+        if self.contains_pii(user_query):
+            return None
+        canonical = self.canonicalize(user_query)
+        if self._advice_automaton.search(canonical.folded) is not None:
+            key = 'refusal'
+        else:
+            key = f'{self._snapshot.version}\0{canonical.text}\0{top_k}'
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    
+    def _respond(self, user_query: str, top_k: Optional[int] = None) -> 'EncodedResponse':
+        """
+        Answer a query as a shared response and its encoding.
+        
+        The query is canonicalized once and every later stage works on that
+        form. PII detection runs on the raw query first, as it is
+        case-sensitive; advice detection runs on the folded query, as its
+        triggers contain stopwords. Matches are cached per canonical query
+        and snapshot version, so trivial rewordings share an entry, and
+        concurrent cache misses on the same key are coalesced into one match.
+        
+        Args:
+            user_query: User's question
+            top_k: Number of ranked alternatives to include, if any
+        
+        Returns:
+            EncodedResponse: Response and body; the response is shared and
+            must be copied before it is handed out
+        """
+        start = time.perf_counter()
+        
         # Check for PII
         has_pii, pii_types = self.detect_pii(user_query)
+        pii_end = time.perf_counter()
         if has_pii:
-            return {
-                'status': 'error',
-                'error_type': 'pii_detected',
-                'message': f'Personal information detected: {", ".join(pii_types)}. Please remove personal information from your query.',
-                'answer': None,
-                'source': None,
-                'last_updated': None
-            }
+            encoded = _encoded_pii(pii_types)
+            self.metrics.observe_stages((('pii', pii_end - start), ('query', pii_end - start)), 'error')
+            return encoded
+        
+        canonical = self.canonicalize(user_query)
+        canonical_end = time.perf_counter()
         
         # Check for advice request
-        if self.detect_advice_request(user_query):
-            return {
-                'status': 'refusal',
-                'error_type': 'advice_request',
-                'message': 'This assistant provides factual information only and does not offer investment advice, recommendations, or portfolio suggestions. For investment guidance, please consult a registered financial advisor or visit AMFI at https://www.amfiindia.com/',
-                'answer': None,
-                'source': 'https://www.amfiindia.com/',
-                'last_updated': None
-            }
+        is_advice = self._advice_automaton.search(canonical.folded) is not None
+        advice_end = time.perf_counter()
+        timings = [('pii', pii_end - start), ('canonicalize', canonical_end - pii_end),
+                   ('advice', advice_end - canonical_end)]
+        if is_advice:
+            timings.append(('query', advice_end - start))
+            self.metrics.observe_stages(timings, 'refusal')
+            return REFUSAL
+        
+        # Read the snapshot once so a concurrent reload cannot mix versions
+        snapshot = self._snapshot
+        cache_key = (snapshot.version, canonical.text, top_k)
+        encoded = self._cache.get(cache_key)
+        cache_end = time.perf_counter()
+        
+        if encoded is None:
+            encoded = self._flights.do(cache_key, lambda: self._answer_and_cache(cache_key, canonical,
+                                                                                snapshot, top_k))
+        
+        end = time.perf_counter()
+        timings += [('cache', cache_end - advice_end), ('query', end - start)]
+        self.metrics.observe_stages(timings, encoded.response['status'])
+        return encoded
+    
+    def _answer_and_cache(self, cache_key: Tuple, canonical: CanonicalQuery, snapshot: FAQSnapshot,
+                          top_k: Optional[int]) -> 'EncodedResponse':
+        """
+        Build a response and cache it before any coalesced query is released,
+        so queries arriving after the match hit the cache.
+        """
+        encoded = self._answer(canonical, snapshot, top_k)
+        self._cache.put(cache_key, encoded)
+        return encoded
+    
+    def _answer(self, canonical: CanonicalQuery, snapshot: FAQSnapshot,
+                top_k: Optional[int] = None) -> 'EncodedResponse':
+        """
+        Build the response for a query without PII or advice triggers.
+        
+        Args:
+            canonical: Canonicalized query
+            snapshot: Corpus snapshot to match against
+            top_k: Number of ranked alternatives to include, if any
+            
+        Returns:
+            EncodedResponse: Success or no_match response
+        """
+        start = time.perf_counter()
+        if top_k:
+            response = self._answer_ranked(canonical, snapshot, top_k)
+        else:
+            response = self._answer_best(canonical, snapshot)
+        
+        self.metrics.observe_stage('match', time.perf_counter() - start)
+        return response
+    
+    def _answer_best(self, canonical: CanonicalQuery, snapshot: FAQSnapshot) -> 'EncodedResponse':
+        """
+        Build a success or no_match response from the best match.
         
+        Args:
+            canonical: Canonicalized query
+            snapshot: Corpus snapshot to match against
+            
+        Returns:
+            EncodedResponse: Success or no_match response
+        """
         # Try to match query
-        match = self.fuzzy_match(user_query, threshold=0.5)
+        match = self._best_entry(canonical, MATCH_THRESHOLD, snapshot)
         
         if match:
-            q_key, faq_entry, similarity = match
-            return {
-                'status': 'success',
-                'answer': faq_entry.get('answer', ''),
-                'source': faq_entry.get('source', ''),
-                'last_updated': faq_entry.get('last_updated', ''),
-                'matched_q_key': q_key,
-                'similarity': similarity
-            }
+            faq_entry, similarity = match
+            return _encoded_success(faq_entry, similarity)
         else:
-            return {
-                'status': 'no_match',
-                'error_type': 'no_match',
-                'message': 'No matching FAQ found. Please try rephrasing your question or check the example questions below.',
-                'answer': None,
-                'source': None,
-                'last_updated': None
+            return NO_MATCH
+    
+    def _answer_ranked(self, canonical: CanonicalQuery, snapshot: FAQSnapshot,
+                       top_k: int) -> 'EncodedResponse':
+        """
+        Build a response with ranked alternatives from one scoring pass.
+        
+        The best match answers the query if it reaches MATCH_THRESHOLD. The
+        remaining matches down to SUGGESTION_THRESHOLD are listed as
+        alternatives, so a no_match response can still suggest questions.
+        
+        Args:
+            canonical: Canonicalized query
+            snapshot: Corpus snapshot to match against
+            top_k: Maximum number of FAQs to rank
+            
+        Returns:
+            EncodedResponse: Success or no_match response with alternatives
+            and margin
+        """
+        ranked = self._rank_entries(canonical, SUGGESTION_THRESHOLD, snapshot, top_k)
+        
+        if ranked and ranked[0][1] >= MATCH_THRESHOLD:
+            response = _success_response(*ranked[0])
+            alternatives = ranked[1:]
+        else:
+            response = _no_match_response()
+            alternatives = ranked
+        
+        response['alternatives'] = [
+            {
+                'matched_q_key': faq_entry.q_key,
+                'question': faq_entry.question_variants[0],
+                'similarity': similarity
             }
+            for faq_entry, similarity in alternatives
+        ]
+        response['margin'] = _ranking_margin(ranked)
+        return EncodedResponse(response, _encode_json(response))
+    
+    def query_batch(self, user_queries: List[str]) -> List[Dict]:
+        """
+        Process several user queries together.
+        
+        Repeated queries are processed once, PII and advice checks run over
+        all distinct queries before any matching, and the remaining queries
+        are scored jointly, once per canonical form (in a single matrix
+        product for the 'tfidf' engine). Queries share the response cache
+        with query().
+        
+        Args:
+            user_queries: User questions
+            
+        Returns:
+            list: One response per query, in input order, each identical in
+            shape to the response of query()
+        """
+        start = time.perf_counter()
+        snapshot = self._snapshot
+        
+        # Dedupe while keeping first-seen order
+        unique_queries = list(dict.fromkeys(user_queries))
+        responses: Dict[str, Dict] = {}
+        # Canonical text -> its queries, and the canonical form to match
+        to_match: Dict[str, List[str]] = {}
+        canonicals: Dict[str, CanonicalQuery] = {}
+        
+        for user_query in unique_queries:
+            has_pii, pii_types = self.detect_pii(user_query)
+            if has_pii:
+                responses[user_query] = _encoded_pii(pii_types).response
+                continue
+            
+            canonical = self.canonicalize(user_query)
+            if self._advice_automaton.search(canonical.folded) is not None:
+                responses[user_query] = REFUSAL.response
+                continue
+            cached = self._cache.get((snapshot.version, canonical.text, None))
+            if cached is not None:
+                responses[user_query] = cached.response
+            else:
+                canonicals.setdefault(canonical.text, canonical)
+                to_match.setdefault(canonical.text, []).append(user_query)
+        
+        matches = self._best_entries(list(canonicals.values()), MATCH_THRESHOLD, snapshot)
+        for canonical_text, match in zip(to_match, matches):
+            encoded = _encoded_success(*match) if match else NO_MATCH
+            self._cache.put((snapshot.version, canonical_text, None), encoded)
+            for user_query in to_match[canonical_text]:
+                responses[user_query] = encoded.response
+        
+        # Copy so callers can modify duplicate responses independently
+        results = [_copy_response(responses[user_query]) for user_query in user_queries]
+        
+        for status, count in Counter(response['status'] for response in results).items():
+            self.metrics.count_status(status, count)
+        self.metrics.observe_stage('batch', time.perf_counter() - start)
+        return results
+    
+    def cache_stats(self) -> Dict:
+        """
+        Get response cache counters.
+        
+        Returns:
+            dict: hits, misses, expirations, evictions, size, max_size and ttl
+        """
+        return self._cache.stats()
+    
+    def coalescing_stats(self) -> Dict:
+        """
+        Get counters of queries coalesced onto identical in-flight queries.
+        
+        Returns:
+            dict: leaders, coalesced, timeouts, failures, in_flight and
+            timeout
+        """
+        return self._flights.stats()
+    
+    def metrics_text(self) -> str:
+        """
+        Get query metrics, cache and coalescing counters and snapshot size as
+        Prometheus text.
+        
+        Returns:
+            str: Metrics in Prometheus text format 0.0.4
+        """
+        return self.metrics.render(self.cache_stats(), self.snapshot_info(), self.coalescing_stats())
+    
+    def _best_entries(self, queries: List[CanonicalQuery], threshold: float,
+                      snapshot: FAQSnapshot) -> List[Optional[Tuple[FAQEntry, float]]]:
+        """
+        Score several queries against a compiled corpus.
+        
+        Args:
+            queries: Canonicalized queries
+            threshold: Minimum similarity threshold (0-1)
+            snapshot: Corpus snapshot to score against
+            
+        Returns:
+            list: (faq_entry, similarity_score) or None per query
+        """
+        if snapshot.tfidf is None:
+            return [self._best_entry(query, threshold, snapshot) for query in queries]
+        
+        # Queries naming a scheme or with a clear intent are ranked within
+        # their facets; the rest share one matrix product
+        matches: List[Optional[Tuple[FAQEntry, float]]] = [None] * len(queries)
+        unrouted = []
+        for index, query in enumerate(queries):
+            if not query.tokens:
+                continue
+            shards = self._route(query, snapshot)
+            categories = self._categories(query, snapshot, shards)
+            if shards is None and categories is None:
+                unrouted.append(index)
+            else:
+                ranked = self._rank_entries_tfidf(query, threshold, snapshot, 1, shards, categories)
+                matches[index] = ranked[0] if ranked else None
+        
+        batch = snapshot.tfidf.best_batch([queries[index].text for index in unrouted])
+        for index, best in zip(unrouted, batch):
+            if best is not None and best[1] >= threshold:
+                variant_id, score = best
+                matches[index] = (snapshot.variants[variant_id].entry, score)
+        for _ in unrouted:
+            self.metrics.observe_candidates(snapshot.tfidf.n_rows, snapshot.tfidf.n_rows)
+        return matches
+
+
+def _ranking_margin(ranked: List[Tuple[FAQEntry, float]]) -> Optional[float]:
+    """Score gap between ranks 1 and 2, counting a missing rank 2 as 0.0."""
+    if not ranked:
+        return None
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    return ranked[0][1] - runner_up
+
+
+def _pii_response(pii_types: List[str]) -> Dict:
+    """Build the response for a query containing PII."""
+    return {
+        'status': 'error',
+        'error_type': 'pii_detected',
+        'message': f'Personal information detected: {", ".join(pii_types)}. Please remove personal information from your query.',
+        'answer': None,
+        'source': None,
+        'last_updated': None
+    }
+
+
+def _refusal_response() -> Dict:
+    """Build the response for an investment advice request."""
+    return {
+        'status': 'refusal',
+        'error_type': 'advice_request',
+        'message': 'This assistant provides factual information only and does not offer investment advice, recommendations, or portfolio suggestions. For investment guidance, please consult a registered financial advisor or visit AMFI at https://www.amfiindia.com/',
+        'answer': None,
+        'source': 'https://www.amfiindia.com/',
+        'last_updated': None
+    }
+
+
+def _success_response(faq_entry: FAQEntry, similarity: float) -> Dict:
+    """Build the response for a matched FAQ entry."""
+    return {
+        'status': 'success',
+        'answer': faq_entry.answer,
+        'source': faq_entry.source,
+        'last_updated': faq_entry.last_updated,
+        'matched_q_key': faq_entry.q_key,
+        'similarity': similarity
+    }
+
+
+def _no_match_response() -> Dict:
+    """Build the response for a query without a matching FAQ."""
+    return {
+        'status': 'no_match',
+        'error_type': 'no_match',
+        'message': 'No matching FAQ found. Please try rephrasing your question or check the example questions below.',
+        'answer': None,
+        'source': None,
+        'last_updated': None
+    }
+
+
+def _copy_response(response: Dict) -> Dict:
+    """Copy a shared response, including its ranked alternatives, for a caller to keep."""
+    response = dict(response)
+    if 'alternatives' in response:
+        response['alternatives'] = [dict(alternative) for alternative in response['alternatives']]
+    return response
+
+
+class EncodedResponse(NamedTuple):
+    """Query response together with its JSON encoding."""
+    response: Dict
+    body: bytes
+
+
+def _encode_json(payload) -> bytes:
+    """Encode a response payload as compact ASCII JSON."""
+    return json.dumps(payload, separators=(',', ':')).encode('ascii')
+
+
+def _encoded(response: Dict) -> EncodedResponse:
+    """Pair a response with its encoding."""
+    return EncodedResponse(response, _encode_json(response))
+
+
+def _encoded_success(faq_entry: FAQEntry, similarity: float) -> EncodedResponse:
+    """Build a success response, appending the similarity to the entry's encoded prefix."""
+    similarity = float(similarity)
+    return EncodedResponse(_success_response(faq_entry, similarity),
+                           faq_entry.response_prefix + repr(similarity).encode('ascii') + b'}')
+
+
+def _encoded_pii(pii_types: List[str]) -> EncodedResponse:
+    """Look up the response for a query containing the given PII types."""
+    encoded = PII_RESPONSES.get(tuple(pii_types))
+    return encoded if encoded is not None else _encoded(_pii_response(pii_types))
+
 
+# Responses that do not depend on the corpus, encoded once. They are shared,
+# so query() copies them before handing them out.
+REFUSAL = _encoded(_refusal_response())
+NO_MATCH = _encoded(_no_match_response())
+# PII responses for every combination of types, in reporting order
+PII_RESPONSES = {
+    pii_types: _encoded(_pii_response(list(pii_types)))
+    for size in range(1, len(PII_GROUP_TYPES) + 1)
+    for pii_types in itertools.combinations(PII_GROUP_TYPES.values(), size)
+}
 
 def main():
     """Main function for testing."""
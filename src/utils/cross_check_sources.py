@@ -0,0 +1,206 @@
+"""
+Cross-check faqs.json sources against the sources.csv registry.
+
+This script reports:
+- Orphaned FAQs: the source URL is missing from sources.csv
+- Unused sources: no FAQ cites the sources.csv row
+- Scheme mismatches: the FAQ's scheme_name differs from the scheme the
+  source is registered under
+- Unknown schemes: an FAQ scheme_name with no source registered at all
+
+sources.csv is loaded into hash indexes on URL and scheme, then faqs.json
+(or a JSON Lines corpus) is streamed against them, so the check is linear
+in the size of both files.
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+# Add parent directory to path to import faq_logic and the other validators
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from faq_logic import GENERAL_SHARD, iter_faq_file
+from utils.qa_validate import validate_url
+from utils.validate_sources import iter_url_records
+
+
+def source_key(url):
+    """
+    Normalize a source URL for lookups.
+    
+    Scheme and host are case-insensitive and fragments do not select a
+    different document, so both are normalized away.
+    
+    Args:
+        url: Source URL
+    
+    Returns:
+        str: Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ''))
+
+
+def load_source_index(csv_path):
+    """
+    Index the sources.csv registry by URL and by scheme.
+    
+    Args:
+        csv_path: Path to sources.csv, or a .jsonl registry with url and
+            scheme_name fields
+    
+    Returns:
+        tuple: (by_url, by_scheme) where by_url maps a normalized URL to the
+        list of (row_num, url, scheme_name) registering it, and by_scheme
+        maps a scheme_name to the set of normalized URLs registered for it
+    """
+    by_url = defaultdict(list)
+    by_scheme = defaultdict(set)
+    for row_num, url, scheme_name in iter_url_records(csv_path, fields=('scheme_name',)):
+        if url is None:
+            continue
+        key = source_key(url)
+        by_url[key].append((row_num, url, scheme_name))
+        by_scheme[scheme_name].add(key)
+    return by_url, by_scheme
+
+
+def cross_check_sources(json_path, csv_path):
+    """
+    Check every FAQ source against the sources.csv registry.
+    
+    A source registered under the General scheme may back an FAQ of any
+    scheme, as it covers rules shared by all of them.
+    
+    Args:
+        json_path: Path to faqs.json, or to a .jsonl corpus
+        csv_path: Path to sources.csv
+    
+    Returns:
+        dict: orphaned_faqs as (q_key, source), unused_sources as (row_num,
+        url), scheme_mismatches as (q_key, source, scheme_name, registered
+        schemes), unknown_schemes as (scheme_name, q_keys) and the number of
+        faqs checked; None if a file could not be read
+    """
+    try:
+        by_url, by_scheme = load_source_index(csv_path)
+    except FileNotFoundError:
+        print(f"Error: File not found: {csv_path}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Error reading CSV file: {e}", file=sys.stderr)
+        return None
+    
+    orphaned_faqs = []
+    scheme_mismatches = []
+    unknown_schemes = defaultdict(list)
+    used = set()
+    faqs = 0
+    
+    try:
+        for q_key, entry in iter_faq_file(json_path):
+            faqs += 1
+            source = entry.get('source')
+            if not isinstance(source, str) or not validate_url(source):
+                orphaned_faqs.append((q_key, source))
+                continue
+            
+            key = source_key(source)
+            registrations = by_url.get(key)
+            if not registrations:
+                orphaned_faqs.append((q_key, source))
+            else:
+                used.add(key)
+            
+            scheme_name = entry.get('scheme_name') or GENERAL_SHARD
+            if scheme_name not in by_scheme:
+                unknown_schemes[scheme_name].append(q_key)
+            elif registrations:
+                registered = {scheme for _, _, scheme in registrations}
+                if scheme_name not in registered and GENERAL_SHARD not in registered:
+                    scheme_mismatches.append((q_key, source, scheme_name, sorted(registered)))
+    except FileNotFoundError:
+        print(f"Error: File not found: {json_path}", file=sys.stderr)
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error: Invalid FAQ file: {e}", file=sys.stderr)
+        return None
+    
+    unused_sources = [(row_num, url) for key, registrations in by_url.items() if key not in used
+                      for row_num, url, _ in registrations]
+    unused_sources.sort()
+    
+    return {
+        'faqs': faqs,
+        'orphaned_faqs': orphaned_faqs,
+        'unused_sources': unused_sources,
+        'scheme_mismatches': scheme_mismatches,
+        'unknown_schemes': sorted(unknown_schemes.items()),
+    }
+
+
+def count_findings(report):
+    """
+    Count the problems in a cross-check report.
+    
+    Args:
+        report: Result of cross_check_sources
+    
+    Returns:
+        int: Orphaned FAQs, unused sources, scheme mismatches and unknown
+        schemes combined
+    """
+    return sum(len(report[name]) for name in ('orphaned_faqs', 'unused_sources', 'scheme_mismatches',
+                                              'unknown_schemes'))
+
+
+def main():
+    """Main function to run the cross-check."""
+    # Get the project root directory (parent of src/)
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent.parent
+    
+    parser = argparse.ArgumentParser(description='Cross-check faqs.json sources against sources.csv')
+    parser.add_argument('json_path', nargs='?', type=Path, default=project_root / 'src' / 'data' / 'faqs.json',
+                        help='FAQ file (default: src/data/faqs.json)')
+    parser.add_argument('csv_path', nargs='?', type=Path, default=project_root / 'src' / 'data' / 'sources.csv',
+                        help='Source registry (default: src/data/sources.csv)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+    
+    report = cross_check_sources(args.json_path, args.csv_path)
+    if report is None:
+        sys.exit(1)
+    findings = count_findings(report)
+    
+    if args.json:
+        print(json.dumps({'valid': findings == 0, **report}, indent=2))
+        sys.exit(0 if findings == 0 else 1)
+    
+    print(f"Cross-checking {args.json_path} against {args.csv_path}")
+    print("-" * 60)
+    
+    if findings == 0:
+        print(f"[OK] All {report['faqs']} FAQ sources are registered under their scheme, "
+              f"and every registered source is used.")
+        sys.exit(0)
+    
+    print(f"[ERROR] Found {findings} problem(s):\n")
+    for q_key, source in report['orphaned_faqs']:
+        print(f"  Orphaned FAQ {q_key}: source not in registry: {source}")
+    for row_num, url in report['unused_sources']:
+        print(f"  Unused source at row {row_num}: {url}")
+    for q_key, source, scheme_name, registered in report['scheme_mismatches']:
+        print(f"  Scheme mismatch for {q_key}: '{scheme_name}', but {source} is registered "
+              f"for {', '.join(registered)}")
+    for scheme_name, q_keys in report['unknown_schemes']:
+        print(f"  Unknown scheme '{scheme_name}' with no registered sources: {', '.join(q_keys)}")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
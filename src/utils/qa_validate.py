@@ -6,11 +6,20 @@ This script validates that all FAQ entries have:
 - answer (non-empty string)
 - source (valid URL format)
 - last_updated (valid ISO date format YYYY-MM-DD)
+
+Entries can be validated on a process pool, and with --cache the result of
+each entry is kept keyed on a hash of its text, so a re-run only decodes and
+re-checks the entries that changed. --json prints a machine-readable report.
 """
 
+import argparse
+import hashlib
 import json
+import os
 import sys
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
@@ -19,6 +28,19 @@ from urllib.parse import urlparse
 # ISO date format regex (YYYY-MM-DD)
 ISO_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
 
+# JSON whitespace between tokens
+WHITESPACE_PATTERN = re.compile(r'[ \t\n\r]*')
+
+# Bump whenever validate_faq_entry changes, so cached results are discarded
+CACHE_FORMAT_VERSION = 1
+
+# Fewest changed entries worth starting a process pool for
+PARALLEL_MIN_ENTRIES = 2000
+
+# Consecutive entries hashed together in the validation cache, so unchanged
+# stretches of a large file are recognised without visiting each entry
+ENTRIES_PER_BLOCK = 256
+
 
 def validate_url(url):
     """
@@ -108,45 +130,365 @@ def validate_faq_entry(q_key, entry):
     if 'category' not in entry:
         errors.append(f"Warning: Missing 'category' field (optional but recommended)")
     
-    return len([e for e in errors if not e.startswith('Warning')]) == 0, errors
+    return not any(not e.startswith('Warning') for e in errors), errors
 
 
-def validate_faqs_json(json_path):
+def count_issues(invalid_entries):
     """
-    Validate all FAQ entries in faqs.json.
+    Count the errors and warnings reported for a corpus.
     
     Args:
-        json_path: Path to faqs.json file
+        invalid_entries: List of (q_key, errors) as returned by validate_faqs_json
+    
+    Returns:
+        tuple: (error_count, warning_count)
+    """
+    warnings = sum(error.startswith('Warning') for _, errors in invalid_entries for error in errors)
+    total = sum(len(errors) for _, errors in invalid_entries)
+    return total - warnings, warnings
+
+
+def entry_digest(text):
+    """
+    Hash a piece of FAQ file text.
+    
+    Args:
+        text: Text as it appears in the file
+    
+    Returns:
+        str: 32 hex digit BLAKE2b digest
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _decode_json_member(decoder, text, pos):
+    """Decode the "q_key": {...} member of a faqs.json object starting at pos."""
+    skip = WHITESPACE_PATTERN.match
+    if text[pos:pos + 1] != '"':
+        raise ValueError("Expected a quoted FAQ key")
+    q_key, end = decoder.raw_decode(text, pos)
+    end = skip(text, end).end()
+    if text[end:end + 1] != ':':
+        raise ValueError(f"Expected ':' after FAQ key '{q_key}'")
+    raw_entry, end = decoder.raw_decode(text, skip(text, end + 1).end())
+    if not isinstance(raw_entry, dict):
+        raise ValueError(f"FAQ entry '{q_key}' must be a JSON object")
+    return q_key, end, raw_entry
+
+
+def _decode_jsonl_line(decoder, text, pos):
+    """Decode the JSON Lines entry on the line starting at pos."""
+    end = text.find('\n', pos)
+    if end < 0:
+        end = len(text)
+    line = text[pos:end].rstrip(' \t\r')
+    line_number = text.count('\n', 0, pos) + 1
+    try:
+        raw_entry = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"line {line_number}: {e}") from e
+    if not isinstance(raw_entry, dict) or not isinstance(raw_entry.get('q_key'), str):
+        raise ValueError(f"line {line_number}: expected an object with a string 'q_key'")
+    return raw_entry.pop('q_key'), pos + len(line), raw_entry
+
+
+def scan_faq_entries(text, jsonl=False, known_blocks=()):
+    """
+    Split the text of faqs.json or a JSON Lines corpus into its entries.
+    
+    Entries are grouped into blocks of up to ENTRIES_PER_BLOCK consecutive
+    entries, each with a digest of its text. Blocks and entries of a
+    previous scan (known_blocks) whose text is unchanged are taken over by
+    hash without decoding; anything else is decoded to find where it ends,
+    and the scan resynchronises on its key, so an edit, insertion or
+    deletion costs one decode and the hashing of one block.
+    
+    Args:
+        text: Contents of the FAQ file
+        jsonl: True for JSON Lines, one entry object with a q_key per line
+        known_blocks: Blocks returned by a previous scan
+    
+    Returns:
+        tuple: (blocks, decoded) where each block is [length, digest,
+        entries] with entries as [q_key, length, digest] in file order, and
+        decoded maps the digest of every decoded entry to (q_key, raw_entry)
+    
+    Raises:
+        ValueError: If the text is not valid JSON or JSON Lines
+    """
+    decode = _decode_jsonl_line if jsonl else _decode_json_member
+    decoder = json.JSONDecoder()
+    skip = WHITESPACE_PATTERN.match
+    block_at = {}
+    first_index = 0
+    for block_number, block in enumerate(known_blocks):
+        block_at[first_index] = block_number
+        first_index += len(block[2])
+    index = 0
+    known_entries = None
+    known_positions = None
+    
+    blocks = []
+    decoded = {}
+    run = []
+    
+    def flush_run():
+        # Group entries taken one by one into new blocks
+        for first in range(0, len(run), ENTRIES_PER_BLOCK):
+            chunk = run[first:first + ENTRIES_PER_BLOCK]
+            start, end = chunk[0][1], chunk[-1][1] + chunk[-1][2]
+            blocks.append([end - start, entry_digest(text[start:end]),
+                           [[q_key, length, digest] for q_key, _, length, digest in chunk]])
+        run.clear()
+    
+    pos = skip(text, 0).end()
+    if not jsonl:
+        if text[pos:pos + 1] != '{':
+            raise ValueError("FAQ file must contain a JSON object")
+        pos = skip(text, pos + 1).end()
+        if text[pos:pos + 1] == '}':
+            pos += 1
+    done = pos >= len(text) if jsonl else text[pos - 1:pos] == '}'
+    
+    while not done:
+        block_reused = False
+        block_number = block_at.get(index)
+        if block_number is not None:
+            length, digest, block_entries = known_blocks[block_number]
+            if entry_digest(text[pos:pos + length]) == digest:
+                flush_run()
+                blocks.append(known_blocks[block_number])
+                pos += length
+                index += len(block_entries)
+                block_reused = True
+        
+        if not block_reused:
+            if known_entries is None:
+                known_entries = [entry for block in known_blocks for entry in block[2]]
+            if index < len(known_entries) and \
+                    entry_digest(text[pos:pos + known_entries[index][1]]) == known_entries[index][2]:
+                q_key, length, digest = known_entries[index]
+                index += 1
+            else:
+                q_key, end, raw_entry = decode(decoder, text, pos)
+                length = end - pos
+                digest = entry_digest(text[pos:end])
+                decoded.setdefault(digest, (q_key, raw_entry))
+                # Continue after this key's previous position, which skips
+                # the entries of deleted ones
+                if known_positions is None:
+                    known_positions = {entry[0]: i for i, entry in enumerate(known_entries)}
+                position = known_positions.get(q_key)
+                if position is not None and position >= index:
+                    index = position + 1
+            run.append((q_key, pos, length, digest))
+            pos += length
         
+        pos = skip(text, pos).end()
+        if jsonl:
+            done = pos >= len(text)
+        else:
+            separator = text[pos:pos + 1]
+            pos = skip(text, pos + 1).end()
+            if separator == '}':
+                done = True
+            elif separator != ',':
+                raise ValueError(f"Expected ',' or '}}' after FAQ entry at offset {pos - 1}")
+    
+    flush_run()
+    if skip(text, pos).end() != len(text):
+        raise ValueError("Unexpected data after the FAQ object")
+    return blocks, decoded
+
+
+def load_validation_cache(cache_path):
+    """
+    Load the scan and results of a previous run.
+    
+    Args:
+        cache_path: Cache file
+    
     Returns:
-        tuple: (is_valid, invalid_entries) where invalid_entries is a list of (q_key, errors)
+        dict: file_digest, blocks and issues; empty values if the file is
+        missing, unreadable or written by another CACHE_FORMAT_VERSION
+    """
+    empty = {'file_digest': None, 'blocks': [], 'issues': {}}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable validation cache {cache_path}: {e}", file=sys.stderr)
+        return empty
+    
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_FORMAT_VERSION:
+        return empty
+    return cache
+
+
+def save_validation_cache(cache_path, file_digest, blocks, issues):
     """
-    invalid_entries = []
+    Write the scan and results of a run atomically, so an interrupted run
+    keeps the old cache.
     
+    Args:
+        cache_path: Cache file
+        file_digest: Digest of the whole FAQ file
+        blocks: Blocks returned by scan_faq_entries
+        issues: Entry digest -> errors, for entries with errors or warnings
+    """
+    cache_path = Path(cache_path)
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    cache = {'version': CACHE_FORMAT_VERSION, 'file_digest': file_digest, 'blocks': blocks, 'issues': issues}
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            faqs = json.load(f)
+        # json.dumps encodes in C, unlike the streaming json.dump
+        content = json.dumps(cache, separators=(',', ':'))
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write validation cache {cache_path}: {e}", file=sys.stderr)
+
+
+def _validate_item(item):
+    """Validate one (q_key, entry) pair in a worker process."""
+    q_key, entry = item
+    return validate_faq_entry(q_key, entry)[1]
+
+
+def validate_entries(items, workers=1):
+    """
+    Validate FAQ entries, on a process pool when there are enough of them.
+    
+    Args:
+        items: List of (q_key, entry)
+        workers: Worker processes; 1 validates in the calling process
+    
+    Returns:
+        list: Errors of each entry, in the order of items
+    """
+    if workers > 1 and len(items) >= PARALLEL_MIN_ENTRIES:
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_validate_item, items, chunksize=chunksize))
+    return [_validate_item(item) for item in items]
+
+
+def validate_faq_file(json_path, cache_path=None, workers=1):
+    """
+    Validate all FAQ entries in faqs.json or a JSON Lines corpus.
+    
+    With a cache_path, results are cached keyed on a hash of each entry's
+    text, and a re-run decodes and re-checks only entries whose text changed.
+    An unchanged file is not scanned at all.
+    
+    Args:
+        json_path: Path to faqs.json, or to a .jsonl corpus
+        cache_path: Validation cache file, None to validate every entry
+        workers: Worker processes for validating changed entries
+    
+    Returns:
+        tuple: (is_valid, invalid_entries, stats) where invalid_entries is a
+        list of (q_key, errors) and stats holds entries, revalidated, errors
+        and warnings; stats is empty if the file could not be read
+    """
+    if cache_path:
+        cache = load_validation_cache(cache_path)
+    else:
+        cache = {'file_digest': None, 'blocks': [], 'issues': {}}
+    
+    try:
+        with open(json_path, 'rb') as f:
+            content = f.read()
+        text = content.decode('utf-8')
     except FileNotFoundError:
         print(f"Error: File not found: {json_path}", file=sys.stderr)
-        return False, []
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON format: {e}", file=sys.stderr)
-        return False, []
+        return False, [], {}
     except Exception as e:
         print(f"Error reading JSON file: {e}", file=sys.stderr)
-        return False, []
+        return False, [], {}
+    
+    file_digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    if file_digest == cache['file_digest']:
+        blocks, pending = cache['blocks'], {}
+    else:
+        try:
+            blocks, decoded = scan_faq_entries(text, Path(json_path).suffix == '.jsonl', cache['blocks'])
+        except ValueError as e:
+            print(f"Error: Invalid JSON format: {e}", file=sys.stderr)
+            return False, [], {}
+        
+        # Entries decoded only because they moved were validated before
+        pending = decoded
+        if decoded and cache['blocks']:
+            validated = {entry[2] for block in cache['blocks'] for entry in block[2]}
+            pending = {digest: item for digest, item in decoded.items() if digest not in validated}
+    
+    issues = cache['issues']
+    for digest, errors in zip(pending, validate_entries(list(pending.values()), workers)):
+        if errors:
+            issues[digest] = errors
+    
+    invalid_entries = [(q_key, issues[digest]) for block in blocks for q_key, _, digest in block[2]
+                       if digest in issues]
+    if cache_path and file_digest != cache['file_digest']:
+        # Keep only the issues of entries still in the file
+        issues = {digest: issues[digest] for block in blocks for _, _, digest in block[2] if digest in issues}
+        save_validation_cache(cache_path, file_digest, blocks, issues)
+    
+    error_count, warning_count = count_issues(invalid_entries)
+    stats = {
+        'entries': sum(len(block[2]) for block in blocks),
+        'revalidated': len(pending),
+        'errors': error_count,
+        'warnings': warning_count,
+    }
+    return error_count == 0, invalid_entries, stats
+
+
+def validate_faqs_json(json_path):
+    """
+    Validate all FAQ entries in faqs.json.
+    
+    Args:
+        json_path: Path to faqs.json file
+        
+    Returns:
+        tuple: (is_valid, invalid_entries) where invalid_entries is a list of (q_key, errors)
+    """
+    is_valid, invalid_entries, _ = validate_faq_file(json_path)
+    return is_valid, invalid_entries
     
-    if not isinstance(faqs, dict):
-        print("Error: faqs.json must be a JSON object/dictionary", file=sys.stderr)
-        return False, []
     
-    # Validate each entry
-    for q_key, entry in faqs.items():
-        is_valid, errors = validate_faq_entry(q_key, entry)
-        if not is_valid or errors:  # Include warnings too
-            invalid_entries.append((q_key, errors))
+def json_report(json_path, is_valid, invalid_entries, stats, seconds):
+    """
+    Build the machine-readable result of a validation run.
+    
+    Args:
+        json_path: Validated file
+        is_valid: Whether no entry has errors
+        invalid_entries: List of (q_key, errors)
+        stats: Counters returned by validate_faq_file
+        seconds: Duration of the run
     
-    return len([e for q, errs in invalid_entries if any(not err.startswith('Warning') for err in errs)]) == 0, invalid_entries
+    Returns:
+        dict: Report with one item per entry that has errors or warnings
+    """
+    return {
+        'file': str(json_path),
+        'valid': is_valid,
+        **stats,
+        'seconds': round(seconds, 3),
+        'entries_with_issues': [
+            {
+                'q_key': q_key,
+                'errors': [error for error in errors if not error.startswith('Warning')],
+                'warnings': [error for error in errors if error.startswith('Warning')],
+            }
+            for q_key, errors in invalid_entries
+        ],
+    }
 
 
 def main():
@@ -154,24 +496,39 @@ def main():
     # Get the project root directory (parent of src/)
     script_dir = Path(__file__).parent
     project_root = script_dir.parent.parent
-    json_path = project_root / 'src' / 'data' / 'faqs.json'
     
-    # Allow custom JSON path via command line argument
-    if len(sys.argv) > 1:
-        json_path = Path(sys.argv[1])
+    parser = argparse.ArgumentParser(description='Validate faqs.json or a JSON Lines FAQ corpus')
+    parser.add_argument('json_path', nargs='?', type=Path, default=project_root / 'src' / 'data' / 'faqs.json',
+                        help='FAQ file (default: src/data/faqs.json)')
+    parser.add_argument('--cache', type=Path,
+                        help='Cache per-entry results here and re-check only changed entries')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes validating changed entries (default: one per CPU)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+    json_path = args.json_path
     
     if not json_path.exists():
         print(f"Error: faqs.json not found at {json_path}", file=sys.stderr)
         sys.exit(1)
     
+    start = time.perf_counter()
+    is_valid, invalid_entries, stats = validate_faq_file(json_path, args.cache, args.workers)
+    if not stats:
+        sys.exit(1)
+    
+    if args.json:
+        report = json_report(json_path, is_valid, invalid_entries, stats, time.perf_counter() - start)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if is_valid else 1)
+    
     print(f"Validating FAQs in: {json_path}")
     print("-" * 60)
+    print(f"Checked {stats['entries']} entries ({stats['revalidated']} re-validated) "
+          f"in {time.perf_counter() - start:.2f}s\n")
     
-    is_valid, invalid_entries = validate_faqs_json(json_path)
-    
-    if is_valid and len([e for _, errs in invalid_entries for err in errs if not err.startswith('Warning')]) == 0:
-        warnings = [e for _, errs in invalid_entries for err in errs if err.startswith('Warning')]
-        if warnings:
+    if is_valid:
+        if stats['warnings']:
             print("[WARNING] Found warnings (non-critical):")
             for q_key, errors in invalid_entries:
                 for error in errors:
@@ -181,7 +538,7 @@ def main():
         print("[OK] All FAQ entries are valid.")
         sys.exit(0)
     else:
-        print(f"[ERROR] Found {len([e for _, errs in invalid_entries for err in errs if not err.startswith('Warning')])} validation error(s):\n")
+        print(f"[ERROR] Found {stats['errors']} validation error(s):\n")
         for q_key, errors in invalid_entries:
             critical_errors = [e for e in errors if not e.startswith('Warning')]
             if critical_errors:
@@ -5,11 +5,21 @@ This script validates that all URLs in sources.csv are from trusted official dom
 - SBI Mutual Fund: sbmf.com, sbimf.com (and subdomains)
 - AMFI: amfiindia.com (and subdomains)
 - SEBI: sebi.gov.in (and subdomains)
+
+More domains can be whitelisted with --domains, and --bulk streams URLs
+from any number of CSV or JSON Lines files (e.g. crawled link dumps)
+through a process pool in constant memory.
 """
 
+import argparse
 import csv
+import itertools
+import json
+import os
 import sys
-from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
 from pathlib import Path
 
 
@@ -21,6 +31,82 @@ OFFICIAL_DOMAINS = [
     'sebi.gov.in'
 ]
 
+# URLs handed to a worker process at a time in bulk mode
+BULK_BATCH_SIZE = 5000
+
+# Batches in flight per worker in bulk mode; bounds memory use
+BATCHES_PER_WORKER = 2
+
+
+class DomainWhitelist:
+    """
+    Whitelisted domains and their subdomains, as a trie of reversed labels.
+    
+    A domain is checked by walking its labels from the top-level domain
+    down, so each check costs one dict lookup per label however many
+    domains are whitelisted.
+    """
+    
+    # Trie key marking a whitelisted domain; labels are always strings
+    _END = None
+    
+    def __init__(self, domains=()):
+        """
+        Args:
+            domains: Base domains to whitelist, with all their subdomains
+        """
+        self._root = {}
+        self.domains = []
+        for domain in domains:
+            self.add(domain)
+    
+    def add(self, domain):
+        """
+        Whitelist a domain and its subdomains.
+        
+        Args:
+            domain: Base domain, e.g. 'sbmf.com'
+        """
+        domain = domain.strip().lower().rstrip('.')
+        if not domain:
+            return
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        if self._END not in node:
+            node[self._END] = domain
+            self.domains.append(domain)
+    
+    def match(self, domain):
+        """
+        Find the whitelisted domain covering a domain.
+        
+        Args:
+            domain: Domain to check, e.g. 'www.sbmf.com'
+        
+        Returns:
+            str: Whitelisted base domain, or None if the domain is not covered
+        """
+        if not domain:
+            return None
+        node = self._root
+        for label in reversed(domain.lower().rstrip('.').split('.')):
+            node = node.get(label)
+            if node is None:
+                return None
+            if self._END in node:
+                return node[self._END]
+        return None
+    
+    def __contains__(self, domain):
+        return self.match(domain) is not None
+    
+    def __len__(self):
+        return len(self.domains)
+
+
+OFFICIAL_WHITELIST = DomainWhitelist(OFFICIAL_DOMAINS)
+
 
 def extract_domain(url):
     """
@@ -33,7 +119,7 @@ def extract_domain(url):
         Base domain string (e.g., 'sbmf.com' from 'https://www.sbmf.com/path')
     """
     try:
-        parsed = urlparse(url)
+        parsed = urlsplit(url)
         netloc = parsed.netloc.lower()
         
         # Remove port if present
@@ -50,62 +136,122 @@ def extract_domain(url):
         return None
 
 
-def is_valid_domain(domain):
+def is_valid_domain(domain, whitelist=None):
     """
     Check if a domain is in the whitelist or is a subdomain of a whitelisted domain.
     
     Args:
         domain: Domain string to validate
+        whitelist: DomainWhitelist to check against; OFFICIAL_WHITELIST if None
         
     Returns:
         True if domain is valid, False otherwise
     """
-    if not domain:
-        return False
+    if whitelist is None:
+        whitelist = OFFICIAL_WHITELIST
+    return whitelist.match(domain) is not None
+
+
+def load_domains(domains_path):
+    """
+    Read extra domains to whitelist, one per line; blank lines and lines
+    starting with # are ignored.
     
-    # Check exact match
-    if domain in OFFICIAL_DOMAINS:
-        return True
+    Args:
+        domains_path: Path to the domains file
+    
+    Returns:
+        list: Domains listed in the file
+    """
+    with open(domains_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def iter_url_records(path, fields=('domain',)):
+    """
+    Stream URLs from a CSV or JSON Lines file without holding it in memory.
+    
+    CSV files need a url column and may have a domain column; the location
+    is the row number, counting the header as row 1. In .jsonl files each
+    line is an object with a url and optionally a domain field; the location
+    is the line number. Records without a URL are skipped, and a line that
+    is not a JSON object is yielded with url None.
     
-    # Check if it's a subdomain of any whitelisted domain
-    for official_domain in OFFICIAL_DOMAINS:
-        if domain.endswith('.' + official_domain):
-            return True
+    Args:
+        path: CSV or .jsonl file
+        fields: Columns or fields to read besides the URL
     
-    return False
+    Yields:
+        tuple: (location, url, *values) with one value per field, '' if not
+        given; (location, url, domain) by default
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if Path(path).suffix == '.jsonl':
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    yield (line_number, None) + ('',) * len(fields)
+                    continue
+                url = str(record.get('url') or '').strip()
+                if url:
+                    yield (line_number, url) + tuple(str(record.get(field) or '').strip() for field in fields)
+        else:
+            reader = csv.DictReader(f)
+            for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
+                url = (row.get('url') or '').strip()
+                if url:
+                    yield (row_num, url) + tuple((row.get(field) or '').strip() for field in fields)
 
 
-def validate_sources_csv(csv_path):
+def check_url_records(records, whitelist=None):
+    """
+    Find the records whose URL is not on a whitelisted domain.
+    
+    Args:
+        records: Iterable of (location, url, domain); the domain is taken
+            from the URL when empty
+        whitelist: DomainWhitelist to check against; OFFICIAL_WHITELIST if None
+    
+    Returns:
+        list: (location, url, domain) of each invalid record; url and domain
+        are None for malformed records
+    """
+    if whitelist is None:
+        whitelist = OFFICIAL_WHITELIST
+    match = whitelist.match
+    invalid_entries = []
+    for location, url, domain in records:
+        if url is None:
+            invalid_entries.append((location, None, None))
+            continue
+        
+        # Extract domain from URL if not provided
+        if not domain:
+            domain = extract_domain(url)
+        
+        if match(domain) is None:
+            invalid_entries.append((location, url, domain))
+    return invalid_entries
+
+
+def validate_sources_csv(csv_path, whitelist=None):
     """
     Validate all URLs in sources.csv against the domain whitelist.
     
     Args:
         csv_path: Path to sources.csv file
+        whitelist: DomainWhitelist to check against; OFFICIAL_WHITELIST if None
         
     Returns:
         tuple: (is_valid, invalid_entries) where invalid_entries is a list of (row_num, url, domain)
     """
-    invalid_entries = []
-    
     try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-                url = row.get('url', '').strip()
-                domain = row.get('domain', '').strip()
-                
-                if not url:
-                    continue
-                
-                # Extract domain from URL if not provided in CSV
-                if not domain:
-                    domain = extract_domain(url)
-                
-                # Validate domain
-                if not is_valid_domain(domain):
-                    invalid_entries.append((row_num, url, domain))
-    
+        invalid_entries = check_url_records(iter_url_records(csv_path), whitelist)
     except FileNotFoundError:
         print(f"Error: File not found: {csv_path}", file=sys.stderr)
         return False, []
@@ -116,26 +262,158 @@ def validate_sources_csv(csv_path):
     return len(invalid_entries) == 0, invalid_entries
 
 
+# Whitelist of a bulk worker process, set once by _init_worker
+_worker_whitelist = None
+
+
+def _init_worker(domains):
+    """Build the whitelist once per bulk worker process."""
+    global _worker_whitelist
+    _worker_whitelist = DomainWhitelist(domains)
+
+
+def _check_batch(batch):
+    """Check one (path, records) batch in a bulk worker process."""
+    path, records = batch
+    return path, len(records), check_url_records(records, _worker_whitelist)
+
+
+def _iter_batches(paths, batch_size):
+    """Cut the records of several files into (path, records) batches."""
+    for path in paths:
+        records = iter_url_records(path)
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+            yield str(path), batch
+
+
+def validate_url_files(paths, whitelist=None, workers=1, batch_size=BULK_BATCH_SIZE, report=None):
+    """
+    Validate the URLs of any number of CSV or JSON Lines files.
+    
+    Files are streamed in batches of batch_size records, checked on a pool
+    of workers processes with at most BATCHES_PER_WORKER batches per worker
+    in flight, so memory use does not grow with the number of URLs. Invalid
+    records are reported in input order.
+    
+    Args:
+        paths: CSV or .jsonl files, read in order
+        whitelist: DomainWhitelist to check against; OFFICIAL_WHITELIST if None
+        workers: Worker processes; 1 checks in the calling process
+        batch_size: Records per batch
+        report: Callable receiving (path, location, url, domain) for each
+            invalid record
+    
+    Returns:
+        tuple: (checked, invalid) record counts
+    """
+    if whitelist is None:
+        whitelist = OFFICIAL_WHITELIST
+    checked = invalid = 0
+    
+    def collect(result):
+        nonlocal checked, invalid
+        path, count, invalid_entries = result
+        checked += count
+        invalid += len(invalid_entries)
+        if report is not None:
+            for location, url, domain in invalid_entries:
+                report(path, location, url, domain)
+    
+    batches = _iter_batches(paths, batch_size)
+    if workers <= 1:
+        for path, records in batches:
+            collect((path, len(records), check_url_records(records, whitelist)))
+        return checked, invalid
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(whitelist.domains,)) as executor:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(executor.submit(_check_batch, batch))
+            if len(in_flight) >= workers * BATCHES_PER_WORKER:
+                collect(in_flight.popleft().result())
+        while in_flight:
+            collect(in_flight.popleft().result())
+    return checked, invalid
+
+
+def report_invalid_url(path, location, url, domain):
+    """Print one invalid record found in bulk mode as a tab-separated line."""
+    if url is None:
+        print(f"{path}:{location}\tmalformed record")
+    else:
+        print(f"{path}:{location}\t{url}\t{domain}")
+
+
+def run_bulk(paths, whitelist, workers):
+    """
+    Validate URL files in bulk mode and exit with the result.
+    
+    Args:
+        paths: CSV or .jsonl files
+        whitelist: DomainWhitelist to check against
+        workers: Worker processes
+    """
+    for path in paths:
+        if not path.exists():
+            print(f"Error: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+    
+    try:
+        checked, invalid = validate_url_files(paths, whitelist, workers, report=report_invalid_url)
+    except Exception as e:
+        print(f"Error reading URL files: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    if invalid:
+        print(f"[ERROR] {invalid} of {checked} URL(s) are not from whitelisted domains.", file=sys.stderr)
+        sys.exit(1)
+    print(f"[OK] All {checked} URLs are from whitelisted domains.", file=sys.stderr)
+    sys.exit(0)
+
+
 def main():
     """Main function to run domain validation."""
     # Get the project root directory (parent of src/)
     script_dir = Path(__file__).parent
     project_root = script_dir.parent.parent
-    csv_path = project_root / 'src' / 'data' / 'sources.csv'
     
-    # Allow custom CSV path via command line argument
-    if len(sys.argv) > 1:
-        csv_path = Path(sys.argv[1])
+    parser = argparse.ArgumentParser(description='Validate source URLs against the official domain whitelist')
+    parser.add_argument('csv_path', nargs='?', type=Path, default=project_root / 'src' / 'data' / 'sources.csv',
+                        help='sources.csv to validate (default: src/data/sources.csv)')
+    parser.add_argument('--domains', type=Path,
+                        help='File of extra domains to whitelist, one per line')
+    parser.add_argument('--bulk', type=Path, nargs='+', metavar='FILE',
+                        help='Stream URLs from these CSV or .jsonl files and print each invalid one')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes checking URLs in bulk mode (default: one per CPU)')
+    args = parser.parse_args()
+    
+    whitelist = DomainWhitelist(OFFICIAL_DOMAINS)
+    if args.domains:
+        try:
+            for domain in load_domains(args.domains):
+                whitelist.add(domain)
+        except OSError as e:
+            print(f"Error reading domains file: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    if args.bulk:
+        run_bulk(args.bulk, whitelist, args.workers)
     
+    csv_path = args.csv_path
     if not csv_path.exists():
         print(f"Error: sources.csv not found at {csv_path}", file=sys.stderr)
         sys.exit(1)
     
     print(f"Validating sources in: {csv_path}")
-    print(f"Whitelisted domains: {', '.join(OFFICIAL_DOMAINS)}")
+    print(f"Whitelisted domains: {', '.join(whitelist.domains)}")
     print("-" * 60)
     
-    is_valid, invalid_entries = validate_sources_csv(csv_path)
+    is_valid, invalid_entries = validate_sources_csv(csv_path, whitelist)
     
     if is_valid:
         print("[OK] All URLs are from whitelisted official domains.")
@@ -0,0 +1,257 @@
+"""
+Test suite for the Flask API server.
+
+Tests the HTTP contract of:
+- Health check endpoint
+- Single query endpoint
+- Conditional GET of the single query endpoint
+- Batch query endpoint
+- Admin reload endpoints
+"""
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from src.api import server
+
+
+@pytest.fixture
+def client():
+    """Create Flask test client."""
+    server.app.config['TESTING'] = True
+    with server.app.test_client() as client:
+        yield client
+
+
+class TestHealthEndpoint:
+    """Test the health check endpoint."""
+    
+    def test_health_ok(self, client):
+        """Test that health check reports ok."""
+        response = client.get('/health')
+        
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'ok'
+
+
+class TestQueryEndpoint:
+    """Test the single query endpoint."""
+    
+    def test_successful_query(self, client):
+        """Test that a factual question is answered."""
+        response = client.post('/api/query', json={'query': 'What is the expense ratio of SBI Bluechip Fund?'})
+        
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'success'
+    
+    def test_body_is_preencoded(self, client):
+        """Test that the endpoint returns the assistant's encoded body as JSON."""
+        query = 'What is the expense ratio of SBI Bluechip Fund?'
+        response = client.post('/api/query', json={'query': query})
+        
+        assert response.mimetype == 'application/json'
+        assert response.get_data() == server.assistant.query_json(query)
+    
+    def test_missing_query_rejected(self, client):
+        """Test that a request without query is rejected."""
+        response = client.post('/api/query', json={})
+        
+        assert response.status_code == 400
+        assert response.get_json()['error_type'] == 'invalid_request'
+    
+    def test_blank_query_rejected(self, client):
+        """Test that a blank query is rejected."""
+        response = client.post('/api/query', json={'query': '   '})
+        
+        assert response.status_code == 400
+    
+    def test_top_k_alternatives(self, client):
+        """Test that top_k adds ranked alternatives and a margin."""
+        response = client.post('/api/query', json={'query': 'expense ratio', 'top_k': 3})
+        data = response.get_json()
+        
+        assert response.status_code == 200
+        assert len(data['alternatives']) <= 3
+        assert 'margin' in data
+    
+    def test_invalid_top_k_rejected(self, client):
+        """Test that top_k outside 1..MAX_TOP_K is rejected."""
+        for top_k in (0, server.MAX_TOP_K + 1, '3', True):
+            response = client.post('/api/query', json={'query': 'expense ratio', 'top_k': top_k})
+            
+            assert response.status_code == 400
+
+
+class TestConditionalQuery:
+    """Test cacheable GET requests to the single query endpoint."""
+    
+    QUERY = 'What is the expense ratio of SBI Bluechip Fund?'
+    
+    def test_get_matches_post(self, client):
+        """Test that GET answers with the POST body plus caching headers."""
+        response = client.get('/api/query', query_string={'query': self.QUERY})
+        
+        assert response.status_code == 200
+        assert response.get_data() == server.assistant.query_json(self.QUERY)
+        assert response.headers['ETag'] == f'"{server.assistant.query_etag(self.QUERY)}"'
+        assert response.headers['Cache-Control'] == f'public, max-age={server.HTTP_MAX_AGE}'
+    
+    def test_matching_etag_not_modified(self, client):
+        """Test that a request holding the current tag gets 304 without a body."""
+        etag = client.get('/api/query', query_string={'query': self.QUERY}).headers['ETag']
+        
+        for if_none_match in (etag, f'W/{etag}', f'"stale", {etag}', '*'):
+            response = client.get('/api/query', query_string={'query': self.QUERY},
+                                  headers={'If-None-Match': if_none_match})
+            
+            assert response.status_code == 304
+            assert response.get_data() == b''
+            assert response.headers['ETag'] == etag
+    
+    def test_shared_etag_means_shared_body(self, client):
+        """Test that queries sharing a tag are answered with the same body."""
+        first = client.get('/api/query', query_string={'query': 'ratio of sbi'})
+        response = client.get('/api/query', query_string={'query': 'ratio sbi'},
+                              headers={'If-None-Match': first.headers['ETag']})
+        
+        assert response.status_code == 304
+        server.assistant._cache.clear()
+        assert client.get('/api/query', query_string={'query': 'ratio sbi'}).get_data() == first.get_data()
+    
+    def test_stale_etag_gets_body(self, client):
+        """Test that a request holding an old tag gets the full response."""
+        response = client.get('/api/query', query_string={'query': self.QUERY},
+                              headers={'If-None-Match': '"stale"'})
+        
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'success'
+    
+    def test_pii_query_not_stored(self, client):
+        """Test that queries with PII are marked no-store and carry no tag."""
+        response = client.get('/api/query', query_string={'query': 'My PAN is ABCDE1234F'})
+        
+        assert response.get_json()['error_type'] == 'pii_detected'
+        assert response.headers['Cache-Control'] == 'no-store'
+        assert 'ETag' not in response.headers
+    
+    def test_post_not_cacheable(self, client):
+        """Test that POST responses carry no tag."""
+        response = client.post('/api/query', json={'query': self.QUERY})
+        
+        assert 'ETag' not in response.headers
+    
+    def test_get_validated_like_post(self, client):
+        """Test that GET parameters follow the POST validation rules."""
+        # Superscript and Arabic-Indic digits pass str.isdigit() but not int()
+        invalid_top_k = ('0', 'x', '\u00b2', '\u0663')
+        for params in ({}, {'query': '   '}, *({'query': 'nav', 'top_k': top_k} for top_k in invalid_top_k)):
+            response = client.get('/api/query', query_string=params)
+            
+            assert response.status_code == 400
+        
+        response = client.get('/api/query', query_string={'query': 'expense ratio', 'top_k': '3'})
+        assert len(response.get_json()['alternatives']) <= 3
+
+
+class TestBatchEndpoint:
+    """Test the batch query endpoint."""
+    
+    def test_results_in_input_order(self, client):
+        """Test that each query gets the single-query response, in order."""
+        queries = [
+            'What is the expense ratio of SBI Bluechip Fund?',
+            'Should I invest in SBI Bluechip Fund?',
+            'My PAN is ABCDE1234F',
+            'What is the square root of 16?',
+            'What is the expense ratio of SBI Bluechip Fund?',
+        ]
+        response = client.post('/api/query/batch', json={'queries': queries})
+        
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert [r['status'] for r in results] == ['success', 'refusal', 'error', 'no_match', 'success']
+        for query, result in zip(queries, results):
+            single = client.post('/api/query', json={'query': query}).get_json()
+            assert result == single
+    
+    def test_invalid_items_flagged_individually(self, client):
+        """Test that invalid items get an error without failing the batch."""
+        response = client.post('/api/query/batch', json={'queries': ['', 42, 'What is the minimum SIP?']})
+        
+        results = response.get_json()['results']
+        assert response.status_code == 200
+        assert results[0]['error_type'] == 'invalid_request'
+        assert results[1]['error_type'] == 'invalid_request'
+        assert results[2]['status'] in ['success', 'no_match']
+    
+    def test_queries_must_be_list(self, client):
+        """Test that a non-list queries field is rejected."""
+        response = client.post('/api/query/batch', json={'queries': 'What is the minimum SIP?'})
+        
+        assert response.status_code == 400
+    
+    def test_batch_size_limited(self, client):
+        """Test that oversized batches are rejected."""
+        queries = ['What is the minimum SIP?'] * (server.MAX_BATCH_SIZE + 1)
+        response = client.post('/api/query/batch', json={'queries': queries})
+        
+        assert response.status_code == 400
+
+
+class TestMetricsEndpoint:
+    """Test the Prometheus metrics endpoint."""
+    
+    def test_metrics_text(self, client):
+        """Test that metrics include stage timings and status counts."""
+        client.post('/api/query', json={'query': 'What is the expense ratio of SBI Bluechip Fund?'})
+        client.post('/api/query', json={})
+        
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert 'faq_stage_seconds_count{stage="serialize"}' in text
+        assert 'faq_stage_seconds_count{stage="request"}' in text
+        assert 'faq_responses_total{status="error"}' in text
+        assert 'faq_cache_hits_total' in text
+
+
+class TestAdminEndpoints:
+    """Test the snapshot reload admin endpoints."""
+    
+    @pytest.fixture
+    def admin_token(self, monkeypatch):
+        """Configure an admin token for the duration of a test."""
+        monkeypatch.setattr(server, 'ADMIN_TOKEN', 'secret')
+        return 'secret'
+    
+    def test_disabled_without_token(self, client):
+        """Test that admin endpoints are closed when no token is configured."""
+        response = client.post('/api/admin/reload', headers={'X-Admin-Token': ''})
+        
+        assert response.status_code == 403
+    
+    def test_wrong_token_rejected(self, client, admin_token):
+        """Test that a wrong admin token is rejected."""
+        response = client.post('/api/admin/reload', headers={'X-Admin-Token': 'guess'})
+        
+        assert response.status_code == 403
+    
+    def test_reload_reports_snapshot(self, client, admin_token):
+        """Test that reload reports its duration and the active snapshot."""
+        response = client.post('/api/admin/reload', headers={'X-Admin-Token': admin_token})
+        data = response.get_json()
+        
+        assert response.status_code == 200
+        assert data['reloaded'] is False
+        assert data['reload_seconds'] >= 0
+        assert data['snapshot']['version'] == server.assistant.data_version
+    
+    def test_snapshot_endpoint(self, client, admin_token):
+        """Test that the active snapshot version is reported."""
+        response = client.get('/api/admin/snapshot', headers={'X-Admin-Token': admin_token})
+        
+        assert response.status_code == 200
+        assert response.get_json()['snapshot']['version'] == client.get('/health').get_json()['version']
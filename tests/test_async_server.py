@@ -0,0 +1,253 @@
+"""
+Test suite for the asyncio API server.
+
+Tests the HTTP contract of:
+- Health check endpoint
+- Single query endpoint
+- Conditional GET of the single query endpoint
+- Keep-alive connection reuse
+- Malformed requests
+"""
+
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from urllib.parse import urlencode
+
+from src.api.async_server import AsyncFAQServer, HTTP_MAX_AGE, MAX_BODY_SIZE, create_assistant, etag_matches
+from src.faq_logic import FAQAssistant
+
+
+@pytest.fixture(scope='module')
+def server_port():
+    """Run the asyncio server on a background event loop."""
+    loop = asyncio.new_event_loop()
+    server = AsyncFAQServer(FAQAssistant(), max_workers=2, max_pending=4)
+    port = loop.run_until_complete(server.start('127.0.0.1', 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    
+    yield port
+    
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+@pytest.fixture
+def connection(server_port):
+    """Create a keep-alive HTTP connection to the server."""
+    conn = http.client.HTTPConnection('127.0.0.1', server_port, timeout=5)
+    yield conn
+    conn.close()
+
+
+def post_query(connection, payload):
+    """POST a JSON body to /api/query and decode the response."""
+    connection.request('POST', '/api/query', body=json.dumps(payload),
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response, json.loads(response.read())
+
+
+def get_query(connection, params, headers=None):
+    """GET /api/query with a query string and read the raw response body."""
+    connection.request('GET', f'/api/query?{urlencode(params)}', headers=headers or {})
+    response = connection.getresponse()
+    return response, response.read()
+
+
+class TestHealthEndpoint:
+    """Test the health check endpoint."""
+    
+    def test_health_ok(self, connection):
+        """Test that health check reports ok and the data version."""
+        connection.request('GET', '/health')
+        response = connection.getresponse()
+        data = json.loads(response.read())
+        
+        assert response.status == 200
+        assert data['status'] == 'ok'
+        assert data['version']
+
+
+class TestQueryEndpoint:
+    """Test the single query endpoint."""
+    
+    def test_same_response_as_assistant(self, connection):
+        """Test that answers match FAQAssistant.query."""
+        query = 'What is the expense ratio of SBI Bluechip Fund?'
+        response, data = post_query(connection, {'query': query})
+        
+        assert response.status == 200
+        assert data == FAQAssistant().query(query)
+        assert response.getheader('Access-Control-Allow-Origin') == '*'
+    
+    def test_top_k(self, connection):
+        """Test that top_k adds ranked alternatives."""
+        _, data = post_query(connection, {'query': 'expense ratio', 'top_k': 3})
+        
+        assert 'alternatives' in data
+        assert 'margin' in data
+    
+    def test_invalid_requests_rejected(self, connection):
+        """Test that the Flask server's validation rules apply."""
+        for payload in ({}, {'query': '   '}, {'query': 'nav', 'top_k': 0}):
+            response, data = post_query(connection, payload)
+            
+            assert response.status == 400
+            assert data['error_type'] == 'invalid_request'
+    
+    def test_unknown_path(self, connection):
+        """Test that unknown paths return 404."""
+        connection.request('GET', '/api/unknown')
+        response = connection.getresponse()
+        response.read()
+        
+        assert response.status == 404
+
+
+class TestConditionalQuery:
+    """Test cacheable GET requests to the single query endpoint."""
+    
+    QUERY = 'What is the expense ratio of SBI Bluechip Fund?'
+    
+    def test_get_matches_post(self, connection):
+        """Test that GET answers with the POST response plus caching headers."""
+        response, body = get_query(connection, {'query': self.QUERY})
+        
+        assert response.status == 200
+        assert json.loads(body) == FAQAssistant().query(self.QUERY)
+        assert response.getheader('ETag') == f'"{FAQAssistant().query_etag(self.QUERY)}"'
+        assert response.getheader('Cache-Control') == f'public, max-age={HTTP_MAX_AGE}'
+    
+    def test_matching_etag_not_modified(self, connection):
+        """Test that a request holding the current tag gets 304 without a body."""
+        response, _ = get_query(connection, {'query': self.QUERY})
+        etag = response.getheader('ETag')
+        
+        response, body = get_query(connection, {'query': self.QUERY}, {'If-None-Match': etag})
+        
+        assert response.status == 304
+        assert body == b''
+        assert response.getheader('ETag') == etag
+    
+    def test_pii_query_not_stored(self, connection):
+        """Test that queries with PII are marked no-store and carry no tag."""
+        response, body = get_query(connection, {'query': 'My PAN is ABCDE1234F'})
+        
+        assert json.loads(body)['error_type'] == 'pii_detected'
+        assert response.getheader('Cache-Control') == 'no-store'
+        assert response.getheader('ETag') is None
+    
+    def test_get_validated_like_post(self, connection):
+        """Test that GET parameters follow the POST validation rules."""
+        # Superscript and Arabic-Indic digits pass str.isdigit() but not int()
+        invalid_top_k = ('0', 'x', '\u00b2', '\u0663')
+        for params in ({}, {'query': '   '}, *({'query': 'nav', 'top_k': top_k} for top_k in invalid_top_k)):
+            response, body = get_query(connection, params)
+            
+            assert response.status == 400
+            assert json.loads(body)['error_type'] == 'invalid_request'
+    
+    def test_etag_matches(self):
+        """Test weak comparison of If-None-Match headers."""
+        assert etag_matches('"abc"', 'abc')
+        assert etag_matches('W/"abc"', 'abc')
+        assert etag_matches('"x", "abc"', 'abc')
+        assert etag_matches('*', 'abc')
+        assert not etag_matches('"abcd"', 'abc')
+        assert not etag_matches('', 'abc')
+
+
+class TestMetricsEndpoint:
+    """Test the Prometheus metrics endpoint."""
+    
+    def test_metrics_text(self, connection):
+        """Test that metrics are served as plain text."""
+        post_query(connection, {'query': 'What is NAV?'})
+        connection.request('GET', '/metrics')
+        response = connection.getresponse()
+        text = response.read().decode('utf-8')
+        
+        assert response.status == 200
+        assert response.getheader('Content-Type').startswith('text/plain')
+        assert 'faq_stage_seconds_count{stage="request"}' in text
+
+
+class TestConnectionHandling:
+    """Test keep-alive and malformed request handling."""
+    
+    def test_keep_alive_reuses_connection(self, connection):
+        """Test that several requests share one TCP connection."""
+        post_query(connection, {'query': 'What is NAV?'})
+        sock = connection.sock
+        
+        for _ in range(5):
+            response, _ = post_query(connection, {'query': 'What is NAV?'})
+            assert response.getheader('Connection') == 'keep-alive'
+        
+        assert connection.sock is sock
+    
+    def test_connection_close_honoured(self, connection):
+        """Test that Connection: close ends the connection."""
+        connection.request('GET', '/health', headers={'Connection': 'close'})
+        response = connection.getresponse()
+        response.read()
+        
+        assert response.getheader('Connection') == 'close'
+    
+    def test_oversized_body_rejected(self, connection):
+        """Test that bodies above MAX_BODY_SIZE get 413."""
+        response, _ = post_query(connection, {'query': 'x' * MAX_BODY_SIZE})
+        
+        assert response.status == 413
+    
+    def test_malformed_request_line(self, server_port):
+        """Test that a garbage request line gets 400."""
+        with socket.create_connection(('127.0.0.1', server_port), timeout=5) as sock:
+            sock.sendall(b'NONSENSE\r\n\r\n')
+            reply = sock.recv(4096)
+        
+        assert reply.startswith(b'HTTP/1.1 400')
+
+
+class TestConfiguration:
+    """Test that the asyncio server reads the Flask server's settings."""
+    
+    def test_engine_from_environment(self, monkeypatch):
+        """Test that FAQ_ENGINE selects the match engine."""
+        pytest.importorskip('scipy')
+        monkeypatch.setenv('FAQ_ENGINE', 'tfidf')
+        monkeypatch.setenv('FAQ_CACHE_SIZE', '8')
+        
+        assistant = create_assistant()
+        
+        assert assistant.engine == 'tfidf'
+        assert assistant.cache_stats()['max_size'] == 8
+    
+    def test_default_engine(self, monkeypatch):
+        """Test that the sequence engine is used when FAQ_ENGINE is unset."""
+        monkeypatch.delenv('FAQ_ENGINE', raising=False)
+        monkeypatch.delenv('FAQ_WATCH_INTERVAL', raising=False)
+        
+        assistant = create_assistant()
+        
+        assert assistant.engine == 'sequence'
+        assert assistant._watcher is None
+    
+    def test_watch_interval_from_environment(self, monkeypatch):
+        """Test that FAQ_WATCH_INTERVAL starts the faqs.json watcher."""
+        monkeypatch.setenv('FAQ_WATCH_INTERVAL', '0.05')
+        
+        assistant = create_assistant()
+        try:
+            assert assistant._watcher is not None and assistant._watcher.is_alive()
+        finally:
+            assistant.stop_watcher()
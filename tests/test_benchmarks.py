@@ -0,0 +1,152 @@
+"""
+Test suite for the benchmark helpers.
+
+Tests:
+- Synthetic corpus generation
+- Benchmark query sets
+- Regression detection against a baseline
+- HTTP load generation
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from benchmarks.bench_faq_logic import OPERATIONS, build_queries, compare_results, time_operation
+from benchmarks.load_test import QueryMix, load_queries, run_load
+from benchmarks.synthetic import generate_corpus, load_schemes
+from src.api.async_server import AsyncFAQServer
+from src.faq_logic import FAQAssistant
+from src.utils.qa_validate import validate_faq_entry
+
+
+class TestSyntheticCorpus:
+    """Test synthetic corpus generation."""
+    
+    @pytest.mark.parametrize('size', [1, 100, 2500])
+    def test_exact_variant_count(self, size):
+        """Test that the corpus has exactly the requested number of variants."""
+        faqs = generate_corpus(size)
+        
+        assert sum(len(entry['question_variants']) for entry in faqs.values()) == size
+    
+    def test_entries_pass_validation(self):
+        """Test that generated entries follow the faqs.json schema."""
+        for q_key, entry in generate_corpus(500).items():
+            assert validate_faq_entry(q_key, entry) == (True, [])
+    
+    def test_schemes_from_config(self):
+        """Test that every configured scheme appears in the corpus."""
+        schemes = load_schemes()
+        corpus_schemes = {entry['scheme_name'] for entry in generate_corpus(500).values()}
+        
+        assert corpus_schemes == set(schemes)
+    
+    def test_deterministic(self):
+        """Test that a size always yields the same corpus."""
+        assert generate_corpus(300) == generate_corpus(300)
+
+
+class TestBenchmarkHelpers:
+    """Test query sets, timing and baseline comparison."""
+    
+    def test_build_queries_count(self):
+        """Test that the query set has the requested size."""
+        queries = build_queries(generate_corpus(200), ['What is NAV?'], 50)
+        
+        assert len(queries) == 50
+        assert 'What is NAV?' in queries
+    
+    def test_time_operation_budget(self):
+        """Test that the time budget stops a slow operation early."""
+        timing = time_operation(lambda query: sum(range(20000)), ['q'] * 100, repeat=5,
+                                max_seconds=0.0, min_samples=10)
+        
+        assert timing['n'] == 10
+        assert timing['p50_ms'] <= timing['p95_ms'] <= timing['p99_ms']
+    
+    def test_compare_flags_regressions(self):
+        """Test that only slowdowns beyond the tolerance are flagged."""
+        def results(p50, p95):
+            timing = {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p95}
+            return {'suites': {'shipped': {operation: timing for operation in OPERATIONS}}}
+        
+        baseline = results(1.0, 2.0)
+        
+        assert compare_results(results(1.1, 2.2), baseline, tolerance=0.25) == []
+        regressions = compare_results(results(1.5, 2.0), baseline, tolerance=0.25)
+        assert len(regressions) == len(OPERATIONS)
+        assert all('p50_ms' in regression for regression in regressions)
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    """Run the asyncio server on a background event loop."""
+    loop = asyncio.new_event_loop()
+    server = AsyncFAQServer(FAQAssistant(), max_workers=2)
+    port = loop.run_until_complete(server.start('127.0.0.1', 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    
+    yield f'http://127.0.0.1:{port}'
+    
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+class TestLoadTest:
+    """Test query replay sources, the query mix and a short load run."""
+    
+    def test_load_query_formats(self, tmp_path):
+        """Test that CSV, JSON Lines and plain text logs load alike."""
+        csv_path = tmp_path / 'queries.csv'
+        csv_path.write_text('query,scheme_name\nWhat is NAV?,x\n,x\nExit load?,y\n', encoding='utf-8')
+        jsonl_path = tmp_path / 'queries.jsonl'
+        jsonl_path.write_text('{"query": "What is NAV?"}\n\n{"query": "Exit load?"}\n', encoding='utf-8')
+        text_path = tmp_path / 'queries.log'
+        text_path.write_text('What is NAV?\n   \nExit load?\n', encoding='utf-8')
+        
+        for path in (csv_path, jsonl_path, text_path):
+            assert load_queries(path) == ['What is NAV?', 'Exit load?']
+    
+    def test_mix_shares(self):
+        """Test that synthetic queries appear in roughly the requested shares."""
+        mix = QueryMix(['What is NAV?'], pii=0.2, advice=0.1, no_match=0.1, seed=1)
+        assistant = FAQAssistant()
+        
+        queries = [mix.next() for _ in range(2000)]
+        pii_share = sum(assistant.contains_pii(query) for query in queries) / len(queries)
+        replayed_share = queries.count('What is NAV?') / len(queries)
+        
+        assert 0.15 < pii_share < 0.25
+        assert 0.55 < replayed_share < 0.65
+    
+    def test_mix_rejects_invalid_shares(self):
+        """Test that shares above 1 in total are rejected."""
+        with pytest.raises(ValueError):
+            QueryMix(['q'], pii=0.6, advice=0.6)
+    
+    def test_run_reports_outcomes(self, server_url):
+        """Test that a short run reports throughput, latency and statuses."""
+        mix = QueryMix(['What is the expense ratio of SBI Bluechip Fund?'], pii=0.3, seed=2)
+        
+        report = asyncio.run(run_load(server_url, mix, concurrency=4, duration=0.5))
+        
+        assert report['completed'] > 0
+        assert report['error_rate'] == 0.0
+        assert report['http_status'] == {'200': report['completed']}
+        assert set(report['response_status']) == {'success', 'error'}
+        assert report['latency_ms']['p50'] <= report['latency_ms']['p99']
+        json.dumps(report)
+    
+    def test_unreachable_server_counted(self):
+        """Test that connection failures are reported, not raised."""
+        report = asyncio.run(run_load('http://127.0.0.1:9', QueryMix(['q']), concurrency=1, duration=0.2))
+        
+        assert report['completed'] == 0
+        assert report['transport_errors']
+        assert report['error_rate'] == 1.0
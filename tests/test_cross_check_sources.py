@@ -0,0 +1,154 @@
+"""
+Test suite for the FAQ source cross-check.
+
+Tests:
+- Orphaned FAQs, unused sources and scheme mismatches
+- URL normalization
+- Command line output
+"""
+
+import csv
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.utils import cross_check_sources as cross_check
+from src.utils.cross_check_sources import count_findings, cross_check_sources, source_key
+
+
+DATA_DIR = Path(__file__).parent.parent / 'src' / 'data'
+FAQS_PATH = DATA_DIR / 'faqs.json'
+SOURCES_PATH = DATA_DIR / 'sources.csv'
+
+
+@pytest.fixture
+def faqs():
+    """Load the shipped corpus."""
+    return json.loads(FAQS_PATH.read_text(encoding='utf-8'))
+
+
+@pytest.fixture
+def sources():
+    """Load the shipped sources.csv rows."""
+    with open(SOURCES_PATH, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def write_files(tmp_path, faqs, sources):
+    """Write a faqs.json and a sources.csv to cross-check."""
+    json_path = tmp_path / 'faqs.json'
+    json_path.write_text(json.dumps(faqs, indent=2), encoding='utf-8')
+    csv_path = tmp_path / 'sources.csv'
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(sources[0]))
+        writer.writeheader()
+        writer.writerows(sources)
+    return json_path, csv_path
+
+
+class TestCrossCheck:
+    """Test cross-checking FAQ sources against the registry."""
+    
+    def test_shipped_data_consistent(self):
+        """Test that the shipped faqs.json and sources.csv agree."""
+        report = cross_check_sources(FAQS_PATH, SOURCES_PATH)
+        
+        assert report['faqs'] > 0
+        assert count_findings(report) == 0
+    
+    def test_orphaned_faq(self, tmp_path, faqs, sources):
+        """Test that FAQs citing unregistered or invalid URLs are reported."""
+        faqs['bluechip_expense_ratio_1']['source'] = 'https://www.sbmf.com/schemes/unknown.pdf'
+        faqs['bluechip_exit_load_1']['source'] = 'not a url'
+        
+        report = cross_check_sources(*write_files(tmp_path, faqs, sources))
+        
+        assert report['orphaned_faqs'] == [
+            ('bluechip_expense_ratio_1', 'https://www.sbmf.com/schemes/unknown.pdf'),
+            ('bluechip_exit_load_1', 'not a url'),
+        ]
+    
+    def test_unused_source(self, tmp_path, faqs, sources):
+        """Test that registry rows no FAQ cites are reported with their row."""
+        sources.append({**sources[0], 'url': 'https://www.sbmf.com/schemes/bluechip/sid.pdf'})
+        
+        report = cross_check_sources(*write_files(tmp_path, faqs, sources))
+        
+        assert report['unused_sources'] == [(len(sources) + 1, 'https://www.sbmf.com/schemes/bluechip/sid.pdf')]
+        assert count_findings(report) == 1
+    
+    def test_scheme_mismatch(self, tmp_path, faqs, sources):
+        """Test that an FAQ citing another scheme's source is reported."""
+        other = next(row for row in sources if row['scheme_name'] not in ('SBI Bluechip Fund', 'General'))
+        faqs['bluechip_expense_ratio_1']['source'] = other['url']
+        
+        report = cross_check_sources(*write_files(tmp_path, faqs, sources))
+        
+        assert report['scheme_mismatches'] == [
+            ('bluechip_expense_ratio_1', other['url'], 'SBI Bluechip Fund', [other['scheme_name']])
+        ]
+    
+    def test_general_source_backs_any_scheme(self, tmp_path, faqs, sources):
+        """Test that a source registered as General may back any scheme."""
+        general = next(row for row in sources if row['scheme_name'] == 'General')
+        faqs['bluechip_expense_ratio_1']['source'] = general['url']
+        
+        report = cross_check_sources(*write_files(tmp_path, faqs, sources))
+        
+        assert report['scheme_mismatches'] == []
+    
+    def test_unknown_scheme(self, tmp_path, faqs, sources):
+        """Test that schemes with no registered sources are grouped by scheme."""
+        faqs['bluechip_expense_ratio_1']['scheme_name'] = 'SBI Unknown Fund'
+        
+        report = cross_check_sources(*write_files(tmp_path, faqs, sources))
+        
+        assert report['unknown_schemes'] == [('SBI Unknown Fund', ['bluechip_expense_ratio_1'])]
+        assert report['scheme_mismatches'] == []
+    
+    def test_jsonl_corpus(self, tmp_path, faqs, sources):
+        """Test that a JSON Lines corpus is streamed like faqs.json."""
+        _, csv_path = write_files(tmp_path, faqs, sources)
+        jsonl_path = tmp_path / 'faqs.jsonl'
+        jsonl_path.write_text('\n'.join(json.dumps({'q_key': q_key, **entry}) for q_key, entry in faqs.items()),
+                              encoding='utf-8')
+        
+        assert cross_check_sources(jsonl_path, csv_path) == cross_check_sources(FAQS_PATH, SOURCES_PATH)
+    
+    def test_missing_file(self, tmp_path, capsys):
+        """Test that a missing file is reported on stderr."""
+        assert cross_check_sources(tmp_path / 'missing.json', SOURCES_PATH) is None
+        assert 'File not found' in capsys.readouterr().err
+
+
+class TestSourceKey:
+    """Test URL normalization for index lookups."""
+    
+    def test_case_and_fragment_ignored(self):
+        """Test that scheme and host case, whitespace and fragments are ignored."""
+        assert source_key(' HTTPS://WWW.SBMF.com/a/B.pdf#page=2 ') == 'https://www.sbmf.com/a/B.pdf'
+    
+    def test_path_and_query_kept(self):
+        """Test that path case and query strings still tell URLs apart."""
+        assert source_key('https://sbmf.com/a.pdf') != source_key('https://sbmf.com/A.pdf')
+        assert source_key('https://sbmf.com/a?x=1') != source_key('https://sbmf.com/a?x=2')
+
+
+class TestCommandLine:
+    """Test the cross_check_sources command line."""
+    
+    def test_json_report(self, tmp_path, faqs, sources, monkeypatch, capsys):
+        """Test that --json prints the findings and exits with an error."""
+        faqs['bluechip_expense_ratio_1']['source'] = 'https://www.sbmf.com/schemes/unknown.pdf'
+        json_path, csv_path = write_files(tmp_path, faqs, sources)
+        monkeypatch.setattr(sys, 'argv', ['cross_check_sources.py', str(json_path), str(csv_path), '--json'])
+        
+        with pytest.raises(SystemExit) as exit_info:
+            cross_check.main()
+        report = json.loads(capsys.readouterr().out)
+        
+        assert exit_info.value.code == 1
+        assert report['valid'] is False
+        assert report['orphaned_faqs'] == [['bluechip_expense_ratio_1', 'https://www.sbmf.com/schemes/unknown.pdf']]
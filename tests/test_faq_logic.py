@@ -8,10 +8,15 @@ Tests the core FAQ matching functionality including:
 - Response structure validation
 """
 
+import copy
 import pytest
 import json
 from pathlib import Path
-from src.faq_logic import FAQAssistant
+from src.faq_logic import (
+    GENERAL_SHARD, PII_RESPONSES, REFUSAL, FAQAssistant, FAQSnapshot, Histogram, IntentClassifier,
+    QueryCanonicalizer, ResponseCache, SingleFlight, config_canonicalizer, config_intent_keywords,
+    config_scheme_aliases, iter_faq_json, iter_faq_jsonl
+)
 
 
 @pytest.fixture
@@ -243,3 +248,1212 @@ class TestSchemeSpecificQueries:
         for query in queries:
             result = faq_assistant.query(query)
             assert result['status'] in ['success', 'no_match']
+
+
+def exhaustive_match(faq_assistant, query, threshold=0.4):
+    """Reference scan scoring every variant of every entry."""
+    from difflib import SequenceMatcher
+    
+    canonicalize = faq_assistant.canonicalizer.canonicalize
+    canonical = canonicalize(query)
+    query_lower = canonical.text
+    query_terms = set(query_lower.split())
+    best_match = None
+    best_score = 0.0
+    if not query_terms:
+        return None
+    
+    for q_key, faq_entry in faq_assistant.faqs.items():
+        for variant in faq_entry['question_variants']:
+            variant_lower = canonicalize(variant).text
+            variant_terms = set(variant_lower.split())
+            sequence_sim = SequenceMatcher(None, query_lower, variant_lower).ratio()
+            overlap = len(query_terms & variant_terms) / len(query_terms | variant_terms)
+            combined_score = (sequence_sim * 0.6) + (overlap * 0.4)
+            if len(canonical.tokens) >= 2 and (query_lower in variant_lower or variant_lower in query_lower):
+                combined_score = max(combined_score, 0.7)
+            if combined_score > best_score:
+                best_score = combined_score
+                best_match = (q_key, faq_entry, combined_score)
+    
+    return best_match if best_score >= threshold else None
+
+
+class TestCandidateIndex:
+    """Test the inverted token index used to prune fuzzy matching."""
+    
+    QUERIES = [
+        "What is the expense ratio of SBI Bluechip Fund?",
+        "How much minimum SIP for SBI Flexicap?",
+        "SBI Long Term Equity Fund lock in time",
+        "What index does SBI Nifty Index Fund track?",
+        "Bluechip Fund exit load",
+        "What is the molecular weight of hydrogen peroxide?",
+    ]
+    
+    def test_every_variant_is_indexed(self, faq_assistant):
+        """Test that each question variant gets a posting for each of its tokens."""
+        total_variants = sum(len(e['question_variants']) for e in faq_assistant.faqs.values())
+        assert len(faq_assistant.snapshot.variants) == total_variants
+        
+        for variant_id, variant in enumerate(faq_assistant.snapshot.variants):
+            for term in variant.text.split():
+                assert variant_id in faq_assistant.snapshot.postings[term]
+    
+    def test_index_matches_exhaustive_scan(self):
+        """Test that pruning keeps the same best match as scoring every variant."""
+        # Routing and the intent filter narrow the search on purpose
+        assistant = FAQAssistant(scheme_aliases={}, intent_keywords={})
+        for query in self.QUERIES:
+            assert assistant.fuzzy_match(query) == exhaustive_match(assistant, query), query
+    
+    def test_candidates_share_a_token(self, faq_assistant):
+        """Test that only variants sharing a query token are scored."""
+        query_terms = {'gilt', 'benchmark'}
+        for variant_id in faq_assistant.snapshot.candidate_ids(query_terms):
+            assert query_terms & faq_assistant.snapshot.variants[variant_id].terms
+    
+    def test_max_candidates_caps_scored_variants(self):
+        """Test that max_candidates keeps only the best-overlapping variants."""
+        assistant = FAQAssistant(max_candidates=5)
+        candidates = assistant.snapshot.candidate_ids({'what', 'is', 'the', 'expense', 'ratio'}, assistant.max_candidates)
+        
+        assert len(candidates) == 5
+        assert candidates == sorted(candidates)
+        assert assistant.query("What is the expense ratio of SBI Bluechip Fund?")['status'] == 'success'
+
+
+class TestCompiledCorpus:
+    """Test the compiled in-memory FAQ representation."""
+    
+    def test_entries_round_trip_to_json_form(self, faq_assistant):
+        """Test that compiled entries rebuild the original faqs.json entries."""
+        with open(faq_assistant.faqs_path, 'r', encoding='utf-8') as f:
+            raw_faqs = json.load(f)
+        
+        assert faq_assistant.faqs == raw_faqs
+    
+    def test_shared_strings_are_interned(self, faq_assistant):
+        """Test that repeated sources and dates share one string object."""
+        seen = {}
+        for entry in faq_assistant.entries:
+            for value in (entry.source, entry.last_updated, entry.scheme_name):
+                assert seen.setdefault(value, value) is value
+    
+    def test_variants_are_prenormalized(self, faq_assistant):
+        """Test that variants are stored canonicalized with their token sets."""
+        canonicalize = faq_assistant.canonicalizer.canonicalize
+        for variant in faq_assistant.snapshot.variants:
+            assert variant.terms == frozenset(variant.text.split())
+            assert variant.text in (canonicalize(v).text for v in variant.entry.question_variants)
+    
+    def test_fuzzy_match_returns_entry_dict(self, faq_assistant):
+        """Test that fuzzy_match keeps returning faqs.json style entries."""
+        q_key, faq_entry, score = faq_assistant.fuzzy_match("SBI Bluechip Fund expense ratio")
+        
+        assert faq_entry == faq_assistant.faqs[q_key]
+        assert 0.0 < score <= 1.0
+
+
+class TestTfidfEngine:
+    """Test the vectorized character n-gram TF-IDF match engine."""
+    
+    @pytest.fixture
+    def tfidf_assistant(self):
+        """Create FAQ Assistant using the TF-IDF engine."""
+        pytest.importorskip('numpy')
+        pytest.importorskip('scipy')
+        return FAQAssistant(engine='tfidf')
+    
+    def test_unknown_engine_rejected(self):
+        """Test that an unknown engine name raises ValueError."""
+        with pytest.raises(ValueError):
+            FAQAssistant(engine='bm25')
+    
+    def test_exact_variant_scores_one(self, tfidf_assistant):
+        """Test that an exact question variant scores 1.0."""
+        q_key, _, score = tfidf_assistant.fuzzy_match("What is the expense ratio of SBI Bluechip Fund?")
+        
+        assert q_key == 'bluechip_expense_ratio_1'
+        assert score == pytest.approx(1.0)
+        assert score <= 1.0
+    
+    def test_scores_on_unit_scale(self, tfidf_assistant):
+        """Test that scores for every variant lie between 0 and 1."""
+        scores = tfidf_assistant.snapshot.tfidf.scores("sbi flexicap fund exit load")
+        
+        assert len(scores) == len(tfidf_assistant.snapshot.variants)
+        assert scores.min() >= 0.0
+        assert scores.max() <= 1.0 + 1e-9
+    
+    def test_query_contract_unchanged(self, tfidf_assistant):
+        """Test that query() statuses match the default engine for clear cases."""
+        assert tfidf_assistant.query("What is the expense ratio of SBI Bluechip Fund?")['status'] == 'success'
+        assert tfidf_assistant.query("What is the molecular weight of hydrogen peroxide?")['status'] == 'no_match'
+        assert tfidf_assistant.query("Should I invest in SBI Bluechip Fund?")['status'] == 'refusal'
+    
+    def test_batch_scores_bit_identical(self, tfidf_assistant):
+        """Test that batch and single scoring agree exactly, not just approximately."""
+        tfidf = tfidf_assistant.snapshot.tfidf
+        queries = [variant.text for variant in tfidf_assistant.snapshot.variants[:200]]
+        queries += [query[::-1] for query in queries[:50]] + ["exit load flexicap", "zzqx", ""]
+        
+        singles = [tfidf.best(query) for query in queries]
+        
+        assert tfidf.best_batch(queries, chunk_size=7) == singles
+        for query, single in zip(queries, singles):
+            if single is not None:
+                assert min(float(tfidf.scores(query)[single[0]]), 1.0) == single[1]
+    
+    def test_no_shared_terms_not_matched(self, tfidf_assistant):
+        """Test that a query sharing no n-gram with the corpus never matches."""
+        assert tfidf_assistant.snapshot.tfidf.best("zzqx") is None
+        assert tfidf_assistant.snapshot.tfidf.best_batch(["zzqx"]) == [None]
+        assert tfidf_assistant.fuzzy_match("zzqx", threshold=0) is None
+    
+    def test_shared_index_memory_mapped(self, tfidf_assistant, tmp_path):
+        """Test that share_index memory-maps the index without changing scores."""
+        import numpy as np
+        
+        query = "sbi flexicap fund exit load"
+        before = tfidf_assistant.snapshot.tfidf.scores(query)
+        
+        shared_bytes = tfidf_assistant.share_index(tmp_path)
+        matrix = tfidf_assistant.snapshot.tfidf._matrix_t
+        
+        def memory_mapped(array):
+            while array is not None:
+                if isinstance(array, np.memmap):
+                    return True
+                array = array.base
+            return False
+        
+        assert shared_bytes > 0
+        assert memory_mapped(matrix.data)
+        assert memory_mapped(matrix.indices)
+        assert tfidf_assistant.snapshot_info()['shared_path'].startswith(str(tmp_path))
+        assert np.array_equal(tfidf_assistant.snapshot.tfidf.scores(query), before)
+    
+    def test_sequence_engine_has_nothing_to_map(self, faq_assistant, tmp_path):
+        """Test that the sequence engine shares through fork alone."""
+        assert faq_assistant.share_index(tmp_path) == 0
+        assert faq_assistant.snapshot_info()['shared_path'] is None
+
+
+class TestResponseCache:
+    """Test the LRU/TTL response cache in front of query()."""
+    
+    class FakeClock:
+        """Manually advanced monotonic clock."""
+        
+        def __init__(self):
+            self.now = 0.0
+        
+        def __call__(self):
+            return self.now
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used response is evicted first."""
+        cache = ResponseCache(max_size=2)
+        cache.put('a', {'status': 'a'})
+        cache.put('b', {'status': 'b'})
+        cache.get('a')
+        cache.put('c', {'status': 'c'})
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == {'status': 'a'}
+        assert cache.stats()['evictions'] == 1
+    
+    def test_ttl_expiration(self):
+        """Test that responses expire after the TTL."""
+        clock = self.FakeClock()
+        cache = ResponseCache(max_size=2, ttl=10.0, clock=clock)
+        cache.put('a', {'status': 'a'})
+        
+        clock.now = 9.0
+        assert cache.get('a') is not None
+        clock.now = 10.0
+        assert cache.get('a') is None
+        assert cache.stats()['expirations'] == 1
+    
+    def test_normalized_repeats_hit(self, faq_assistant):
+        """Test that case and whitespace variants of a query share an entry."""
+        first = faq_assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        second = faq_assistant.query("  what is the EXPENSE ratio   of sbi bluechip fund? ")
+        
+        stats = faq_assistant.cache_stats()
+        assert second == first
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+    
+    def test_pii_checked_before_cache(self, faq_assistant):
+        """Test that a cached clean query does not hide case-sensitive PII."""
+        assert faq_assistant.query("my pan is abcde1234f")['status'] != 'error'
+        assert faq_assistant.query("my pan is ABCDE1234F")['status'] == 'error'
+    
+    def test_cached_response_is_a_copy(self, faq_assistant):
+        """Test that modifying a returned response leaves the cache intact."""
+        query = "What is the expense ratio of SBI Bluechip Fund?"
+        faq_assistant.query(query)['answer'] = 'changed'
+        
+        assert faq_assistant.query(query)['answer'] != 'changed'
+        
+        # Ranked alternatives are copied too, list and items
+        expected = copy.deepcopy(faq_assistant.query('exit load', top_k=3))
+        response = faq_assistant.query('exit load', top_k=3)
+        response['alternatives'].append('x')
+        response['alternatives'][0]['similarity'] = 0.0
+        
+        assert faq_assistant.query('exit load', top_k=3) == expected
+        assert faq_assistant.cache_stats()['hits'] == 3
+    
+    def test_cache_disabled(self):
+        """Test that a cache size of 0 disables caching."""
+        assistant = FAQAssistant(cache_size=0)
+        assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        
+        assert assistant.cache_stats()['hits'] == 0
+        assert assistant.cache_stats()['size'] == 0
+    
+    def test_concurrent_queries(self, faq_assistant):
+        """Test that concurrent queries keep the cache consistent."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        queries = ["What is the expense ratio of SBI Bluechip Fund?", "What is the minimum SIP?"] * 50
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(faq_assistant.query, queries))
+        
+        stats = faq_assistant.cache_stats()
+        assert results == [faq_assistant.query(q) for q in queries]
+        assert stats['hits'] + stats['misses'] == len(queries)
+
+
+class TestSingleFlight:
+    """Test coalescing of identical in-flight queries."""
+    
+    @staticmethod
+    def run_concurrently(flight, key, compute, callers):
+        """Call flight.do from several threads at once and collect the results."""
+        import threading
+        
+        results = [None] * callers
+        
+        def call(index):
+            results[index] = flight.do(key, compute)
+        
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        return results
+    
+    @staticmethod
+    def blocking_compute(release, value='value'):
+        """A computation that counts its calls and waits for release."""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return value
+        return compute, calls
+    
+    def test_concurrent_calls_share_result(self):
+        """Test that callers arriving during a computation wait for it."""
+        import threading
+        
+        flight = SingleFlight(timeout=5.0)
+        release = threading.Event()
+        compute, calls = self.blocking_compute(release)
+        threading.Timer(0.2, release.set).start()
+        
+        results = self.run_concurrently(flight, 'key', compute, 8)
+        
+        stats = flight.stats()
+        assert results == ['value'] * 8
+        assert len(calls) == 1
+        assert stats['leaders'] == 1
+        assert stats['coalesced'] == 7
+        assert stats['in_flight'] == 0
+    
+    def test_wait_is_bounded(self):
+        """Test that followers of a slow leader compute the value themselves."""
+        import threading
+        
+        flight = SingleFlight(timeout=0.05)
+        release = threading.Event()
+        compute, calls = self.blocking_compute(release)
+        threading.Timer(0.5, release.set).start()
+        
+        results = self.run_concurrently(flight, 'key', compute, 3)
+        
+        assert results == ['value'] * 3
+        assert len(calls) == 3
+        assert flight.stats()['timeouts'] == 2
+    
+    def test_leader_failure_not_shared(self):
+        """Test that followers recompute when their leader raises."""
+        import threading
+        import time
+        
+        flight = SingleFlight(timeout=5.0)
+        leader_started = threading.Event()
+        release = threading.Event()
+        
+        def failing():
+            leader_started.set()
+            release.wait(5)
+            raise RuntimeError('boom')
+        
+        errors = []
+        
+        def lead():
+            try:
+                flight.do('key', failing)
+            except RuntimeError as e:
+                errors.append(e)
+        
+        leader = threading.Thread(target=lead)
+        leader.start()
+        leader_started.wait(5)
+        follower_result = []
+        follower = threading.Thread(target=lambda: follower_result.append(flight.do('key', lambda: 'fresh')))
+        follower.start()
+        while flight.stats()['coalesced'] == 0:
+            time.sleep(0.001)
+        release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+        
+        assert len(errors) == 1
+        assert follower_result == ['fresh']
+        assert flight.stats()['failures'] == 1
+    
+    def test_disabled(self):
+        """Test that a timeout of 0 runs every call."""
+        flight = SingleFlight(timeout=0)
+        
+        assert flight.do('key', lambda: 1) == 1
+        assert flight.stats()['leaders'] == 0
+    
+    def test_concurrent_queries_coalesced(self, monkeypatch):
+        """Test that concurrent cache misses on one canonical query match once."""
+        import threading
+        
+        assistant = FAQAssistant()
+        release = threading.Event()
+        answer = assistant._answer
+        matches = []
+        
+        def slow_answer(*args):
+            matches.append(1)
+            release.wait(5)
+            return answer(*args)
+        
+        monkeypatch.setattr(assistant, '_answer', slow_answer)
+        threading.Timer(0.2, release.set).start()
+        queries = ["What is the expense ratio of SBI Bluechip Fund?",
+                   "what's the EXPENSE ratio of sbi bluechip fund"] * 4
+        results = [None] * len(queries)
+        
+        def ask(index):
+            results[index] = assistant.query(queries[index])
+        
+        threads = [threading.Thread(target=ask, args=(index,)) for index in range(len(queries))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        
+        assert len(matches) == 1
+        assert all(result == results[0] and result['status'] == 'success' for result in results)
+        assert assistant.coalescing_stats()['coalesced'] == len(queries) - 1
+        assert 'faq_coalesced_total 7' in assistant.metrics_text()
+
+
+class TestHotReload:
+    """Test reloading faqs.json into a new snapshot."""
+    
+    @pytest.fixture
+    def faqs_file(self, tmp_path):
+        """Copy the shipped faqs.json into a temporary file."""
+        source = Path(__file__).parent.parent / 'src' / 'data' / 'faqs.json'
+        path = tmp_path / 'faqs.json'
+        path.write_text(source.read_text(encoding='utf-8'), encoding='utf-8')
+        return path
+    
+    @staticmethod
+    def edit_answer(path, q_key, answer):
+        """Rewrite one answer in a faqs.json file."""
+        faqs = json.loads(path.read_text(encoding='utf-8'))
+        faqs[q_key]['answer'] = answer
+        path.write_text(json.dumps(faqs), encoding='utf-8')
+    
+    def test_reload_publishes_new_snapshot(self, faqs_file):
+        """Test that reload swaps in the edited corpus and clears the cache."""
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        query = "What is the expense ratio of SBI Bluechip Fund?"
+        old_snapshot = assistant.snapshot
+        assistant.query(query)
+        
+        self.edit_answer(faqs_file, 'bluechip_expense_ratio_1', 'Updated answer.')
+        
+        assert assistant.reload() is True
+        assert assistant.snapshot is not old_snapshot
+        assert assistant.data_version != old_snapshot.version
+        assert assistant.cache_stats()['size'] == 0
+        assert assistant.query(query)['answer'] == 'Updated answer.'
+    
+    def test_reload_with_null_fields(self, faqs_file, capsys):
+        """Test that null or non-string fields load and malformed entries are skipped."""
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        faqs = json.loads(faqs_file.read_text(encoding='utf-8'))
+        faqs['bluechip_expense_ratio_1']['source'] = None
+        faqs['bluechip_expense_ratio_1']['last_updated'] = None
+        faqs['elss_lockin_1']['question_variants'] = None
+        faqs['broken'] = {'question_variants': ['What is broken?', 3], 'answer': 'Broken.'}
+        faqs_file.write_text(json.dumps(faqs), encoding='utf-8')
+        
+        assert assistant.reload() is True
+        response = assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        
+        assert response['status'] == 'success'
+        assert response['source'] is None
+        assert json.loads(assistant.query_json("What is the expense ratio of SBI Bluechip Fund?")) == response
+        assert {entry.q_key for entry in assistant.entries} == set(faqs) - {'elss_lockin_1', 'broken'}
+        assert len(assistant.snapshot.variants) == sum(len(entry.question_variants) for entry in assistant.entries)
+        err = capsys.readouterr().err
+        assert "'elss_lockin_1' skipped" in err
+        assert "'broken' skipped" in err
+        
+        # A fresh assistant starts on the same file
+        assert len(FAQAssistant(faqs_path=faqs_file).entries) == len(assistant.entries)
+    
+    def test_reload_rolls_etags(self, faqs_file):
+        """Test that query entity tags change with the corpus."""
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        query = "What is the expense ratio of SBI Bluechip Fund?"
+        etag = assistant.query_etag(query)
+        
+        self.edit_answer(faqs_file, 'bluechip_expense_ratio_1', 'Updated answer.')
+        assistant.reload()
+        
+        assert assistant.query_etag(query) != etag
+    
+    def test_old_snapshot_left_intact(self, faqs_file):
+        """Test that queries holding the old snapshot still see old data."""
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        old_snapshot = assistant.snapshot
+        
+        self.edit_answer(faqs_file, 'bluechip_expense_ratio_1', 'Updated answer.')
+        assistant.reload()
+        
+        canonical = assistant.canonicalize("What is the expense ratio of SBI Bluechip Fund?")
+        match = assistant._best_entry(canonical, 0.5, old_snapshot)
+        assert match[0].answer != 'Updated answer.'
+    
+    def test_unchanged_file_not_reloaded(self, faqs_file):
+        """Test that reloading identical content keeps the snapshot."""
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        
+        assert assistant.reload() is False
+    
+    def test_invalid_file_keeps_snapshot(self, faqs_file):
+        """Test that a broken faqs.json does not replace a good snapshot."""
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        old_snapshot = assistant.snapshot
+        faqs_file.write_text('{"broken": ', encoding='utf-8')
+        
+        assert assistant.reload() is False
+        assert assistant.snapshot is old_snapshot
+    
+    def test_snapshot_info(self, faq_assistant):
+        """Test that snapshot info reports version and load duration."""
+        info = faq_assistant.snapshot_info()
+        
+        assert info['version'] == faq_assistant.data_version
+        assert info['load_seconds'] > 0
+        assert info['entries'] == len(faq_assistant.faqs)
+    
+    def test_watcher_reloads_on_change(self, faqs_file):
+        """Test that the file watcher picks up an edit."""
+        import time
+        
+        assistant = FAQAssistant(faqs_path=faqs_file)
+        old_version = assistant.data_version
+        assistant.start_watcher(interval=0.01)
+        try:
+            self.edit_answer(faqs_file, 'bluechip_expense_ratio_1', 'Updated answer.')
+            deadline = time.monotonic() + 5
+            while assistant.data_version == old_version and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            assistant.stop_watcher()
+        
+        assert assistant.data_version != old_version
+
+
+class TestStreamingLoader:
+    """Test streaming faqs.json and JSON Lines corpora into a snapshot."""
+    
+    SOURCE = Path(__file__).parent.parent / 'src' / 'data' / 'faqs.json'
+    
+    @pytest.fixture
+    def faqs(self):
+        """Shipped corpus parsed in one go."""
+        return json.loads(self.SOURCE.read_text(encoding='utf-8'))
+    
+    @pytest.fixture
+    def jsonl_file(self, tmp_path, faqs):
+        """Shipped corpus rewritten as JSON Lines."""
+        path = tmp_path / 'faqs.jsonl'
+        with open(path, 'w', encoding='utf-8') as f:
+            for q_key, entry in faqs.items():
+                f.write(json.dumps({'q_key': q_key, **entry}) + '\n')
+        return path
+    
+    @pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+    def test_stream_matches_json_load(self, faqs, chunk_size):
+        """Test that streamed entries equal json.load whatever the chunk size."""
+        streamed = list(iter_faq_json(self.SOURCE, chunk_size=chunk_size))
+        
+        assert streamed == list(faqs.items())
+    
+    def test_jsonl_matches_json(self, faqs, jsonl_file):
+        """Test that a JSON Lines corpus yields the same entries."""
+        assert list(iter_faq_jsonl(jsonl_file)) == list(faqs.items())
+    
+    def test_assistant_loads_jsonl(self, jsonl_file, faq_assistant):
+        """Test that FAQAssistant answers the same from a .jsonl corpus."""
+        assistant = FAQAssistant(faqs_path=jsonl_file)
+        query = "What is the expense ratio of SBI Bluechip Fund?"
+        
+        assert len(assistant.faqs) == len(faq_assistant.faqs)
+        assert assistant.query(query)['answer'] == faq_assistant.query(query)['answer']
+    
+    @pytest.mark.parametrize('content', [
+        '[]',
+        '{"a": 1}',
+        '{"a" {}}',
+        '{"a": {} "b": {}}',
+        '{"a": {}} trailing',
+        '{"a": {"question_variants": [',
+    ])
+    def test_malformed_json_rejected(self, tmp_path, content):
+        """Test that malformed files raise ValueError."""
+        path = tmp_path / 'faqs.json'
+        path.write_text(content, encoding='utf-8')
+        
+        with pytest.raises(ValueError):
+            list(iter_faq_json(path, chunk_size=3))
+    
+    def test_malformed_jsonl_reports_line(self, tmp_path):
+        """Test that a JSON Lines error names the offending line."""
+        path = tmp_path / 'faqs.jsonl'
+        path.write_text('{"q_key": "a", "answer": "x"}\n\n{"answer": "y"}\n', encoding='utf-8')
+        
+        with pytest.raises(ValueError, match='line 3'):
+            list(iter_faq_jsonl(path))
+    
+    def test_invalid_file_gives_empty_snapshot(self, tmp_path):
+        """Test that a broken corpus at startup leaves an empty snapshot."""
+        path = tmp_path / 'faqs.json'
+        path.write_text('{"a": {"answer": "x"}, oops}', encoding='utf-8')
+        
+        assistant = FAQAssistant(faqs_path=path)
+        
+        assert assistant.faqs == {}
+    
+    def test_duplicate_key_keeps_first(self, tmp_path, capsys):
+        """Test that a repeated key keeps the first entry and warns."""
+        path = tmp_path / 'faqs.json'
+        path.write_text('{"a": {"answer": "first"}, "a": {"answer": "second"}}', encoding='utf-8')
+        
+        snapshot = FAQSnapshot(iter_faq_json(path))
+        
+        assert [entry.answer for entry in snapshot.entries] == ['first']
+        assert "Duplicate FAQ key 'a'" in capsys.readouterr().err
+
+
+class TestCascadedScoring:
+    """Test that bound-based pruning keeps the exhaustive scan's result."""
+    
+    @staticmethod
+    def full_scan(faq_assistant, query, threshold):
+        """Score every candidate with the full SequenceMatcher ratio."""
+        from difflib import SequenceMatcher
+        
+        canonical = faq_assistant.canonicalize(query)
+        query_lower = canonical.text
+        query_terms = set(query_lower.split())
+        best_match = None
+        best_score = 0.0
+        if not query_terms:
+            return None
+        
+        for variant_id in faq_assistant.snapshot.candidate_ids(query_terms):
+            variant = faq_assistant.snapshot.variants[variant_id]
+            sequence_sim = SequenceMatcher(None, query_lower, variant.text).ratio()
+            if query_terms and variant.terms:
+                overlap = len(query_terms & variant.terms) / len(query_terms | variant.terms)
+            else:
+                overlap = 0.0
+            combined_score = (sequence_sim * 0.6) + (overlap * 0.4)
+            if len(canonical.tokens) >= 2 and (query_lower in variant.text or variant.text in query_lower):
+                combined_score = max(combined_score, 0.7)
+            if combined_score > best_score:
+                best_score = combined_score
+                best_match = (variant.entry.q_key, combined_score)
+        
+        return best_match if best_score >= threshold else None
+    
+    def queries(self):
+        """Sample queries plus truncated and reworded question variants."""
+        import csv
+        
+        sample_path = Path(__file__).parent.parent / 'sample_faqs' / 'sample_faq.csv'
+        with open(sample_path, 'r', encoding='utf-8') as f:
+            queries = [row['query'] for row in csv.DictReader(f)]
+        
+        variants = [variant for entry in FAQAssistant().entries for variant in entry.question_variants]
+        for variant in variants[::4]:
+            queries.append(variant[:len(variant) // 2])
+            queries.append(variant.replace('What is', 'Tell me'))
+        queries.extend(['', 'fund', 'What is the square root of 16?'])
+        return queries
+    
+    def test_same_result_as_full_scan(self, faq_assistant):
+        """Test that the cascade returns the exhaustive best match and score."""
+        for threshold in (0.0, 0.4, 0.5):
+            for query in self.queries():
+                match = faq_assistant.fuzzy_match(query, threshold)
+                expected = self.full_scan(faq_assistant, query, threshold)
+                if expected is None:
+                    assert match is None, query
+                else:
+                    assert (match[0], match[2]) == expected, query
+    
+    def test_matchers_prebuilt_for_sequence_engine(self, faq_assistant):
+        """Test that each variant carries a matcher with its text as seq2."""
+        for variant in faq_assistant.snapshot.variants:
+            assert variant.matcher.b == variant.text
+            assert variant.matcher.fullbcount is not None
+    
+    def test_prebuilt_matcher_not_mutated(self, faq_assistant):
+        """Test that queries leave the shared matchers untouched."""
+        faq_assistant.fuzzy_match("What is the expense ratio of SBI Bluechip Fund?")
+        
+        for variant in faq_assistant.snapshot.variants:
+            assert variant.matcher.a == ''
+
+
+class TestRankedMatches:
+    """Test top-k ranking with an ambiguity margin."""
+    
+    QUERY = "What is the expense ratio of SBI Bluechip Fund?"
+    
+    def test_first_rank_is_best_match(self, faq_assistant):
+        """Test that rank 1 equals the fuzzy_match result."""
+        for query in TestCascadedScoring().queries():
+            matches, margin = faq_assistant.rank_matches(query, top_k=3)
+            best = faq_assistant.fuzzy_match(query)
+            if best is None:
+                assert matches == [] and margin is None, query
+            else:
+                assert (matches[0][0], matches[0][2]) == (best[0], best[2]), query
+    
+    def test_ranked_entries_unique_and_sorted(self, faq_assistant):
+        """Test that each FAQ appears once and scores never increase."""
+        matches, _ = faq_assistant.rank_matches(self.QUERY, top_k=10, threshold=0.0)
+        
+        keys = [q_key for q_key, _, _ in matches]
+        scores = [score for _, _, score in matches]
+        assert len(keys) == len(set(keys))
+        assert scores == sorted(scores, reverse=True)
+        assert len(matches) <= 10
+    
+    def test_ranking_matches_exhaustive_per_entry_scores(self, faq_assistant):
+        """Test that pruning keeps the exhaustive per-entry ranking of the routed facets."""
+        from difflib import SequenceMatcher
+        
+        canonical = faq_assistant.canonicalize(self.QUERY)
+        query_lower = canonical.text
+        query_terms = set(canonical.tokens)
+        snapshot = faq_assistant.snapshot
+        shards = faq_assistant._route(canonical, snapshot)
+        categories = faq_assistant._categories(canonical, snapshot, shards)
+        best = {}
+        for variant_id in snapshot.candidate_ids(query_terms, shards=shards, categories=categories):
+            variant = faq_assistant.snapshot.variants[variant_id]
+            sequence_sim = SequenceMatcher(None, query_lower, variant.text).ratio()
+            overlap = len(query_terms & variant.terms) / len(query_terms | variant.terms)
+            score = (sequence_sim * 0.6) + (overlap * 0.4)
+            if query_lower in variant.text or variant.text in query_lower:
+                score = max(score, 0.7)
+            best[variant.entry.q_key] = max(best.get(variant.entry.q_key, 0.0), score)
+        expected = sorted(best.values(), reverse=True)[:5]
+        
+        matches, _ = faq_assistant.rank_matches(self.QUERY, top_k=5, threshold=0.0)
+        
+        assert [score for _, _, score in matches] == pytest.approx(expected)
+        assert all(best[q_key] == pytest.approx(score) for q_key, _, score in matches)
+    
+    def test_margin(self, faq_assistant):
+        """Test that the margin is the gap between ranks 1 and 2."""
+        matches, margin = faq_assistant.rank_matches(self.QUERY, top_k=2, threshold=0.0)
+        assert margin == pytest.approx(matches[0][2] - matches[1][2])
+        
+        matches, margin = faq_assistant.rank_matches(self.QUERY, top_k=1)
+        assert margin == matches[0][2]
+    
+    def test_query_with_alternatives(self, faq_assistant):
+        """Test that query(top_k=...) lists alternatives after the answer."""
+        plain = faq_assistant.query(self.QUERY)
+        result = faq_assistant.query(self.QUERY, top_k=3)
+        
+        assert result['matched_q_key'] == plain['matched_q_key']
+        assert len(result['alternatives']) <= 2
+        assert all(alt['matched_q_key'] != result['matched_q_key'] for alt in result['alternatives'])
+        assert 'alternatives' not in plain
+    
+    def test_no_match_still_suggests(self, faq_assistant):
+        """Test that weak matches are suggested without being answered."""
+        for query in TestCascadedScoring().queries():
+            match = faq_assistant.fuzzy_match(query)
+            if match is not None and match[2] < 0.5:
+                result = faq_assistant.query(query, top_k=3)
+                assert result['status'] == 'no_match'
+                assert result['alternatives'][0]['matched_q_key'] == match[0]
+                return
+        pytest.skip("no query scored between the thresholds")
+    
+    def test_tfidf_ranking(self):
+        """Test that the tfidf engine ranks unique entries by score."""
+        pytest.importorskip("numpy")
+        pytest.importorskip("scipy")
+        assistant = FAQAssistant(engine='tfidf')
+        
+        matches, margin = assistant.rank_matches(self.QUERY, top_k=5, threshold=0.0)
+        best = assistant.fuzzy_match(self.QUERY)
+        
+        assert (matches[0][0], matches[0][2]) == (best[0], best[2])
+        assert len({q_key for q_key, _, _ in matches}) == len(matches)
+        assert [s for _, _, s in matches] == sorted((s for _, _, s in matches), reverse=True)
+
+
+class TestSchemeRouting:
+    """Test routing queries to per-scheme shards."""
+    
+    GILT_QUERY = "What is the exit load of the gilt fund?"
+    
+    def test_detect_scheme_names_and_aliases(self, faq_assistant):
+        """Test that full names and config.yml aliases are detected."""
+        assert faq_assistant.detect_schemes("Expense ratio of SBI Bluechip Fund") == ['SBI Bluechip Fund']
+        assert faq_assistant.detect_schemes("ELSS lock-in?") == ['SBI Long Term Equity Fund']
+        assert faq_assistant.detect_schemes("Compare flexi cap and NIFTY") == [
+            'SBI Flexicap Fund', 'SBI Nifty Index Fund'
+        ]
+    
+    def test_detect_whole_words_only(self, faq_assistant):
+        """Test that aliases inside other words are ignored."""
+        assert faq_assistant.detect_schemes("Am I guilty of missing a SIP?") == []
+        assert faq_assistant.detect_schemes("How do I download my statement?") == []
+    
+    def test_every_variant_in_one_shard(self, faq_assistant):
+        """Test that shards partition the variants by scheme."""
+        snapshot = faq_assistant.snapshot
+        variant_ids = sorted(vid for shard in snapshot.shards.values() for vid in shard.variant_ids)
+        
+        assert variant_ids == list(range(len(snapshot.variants)))
+        for name, shard in snapshot.shards.items():
+            for variant_id in shard.variant_ids:
+                assert snapshot.variants[variant_id].entry.scheme_name == name
+        assert GENERAL_SHARD in snapshot.shards
+        assert sum(faq_assistant.snapshot_info()['shards'].values()) == len(snapshot.variants)
+    
+    def test_routed_query_stays_in_shards(self, faq_assistant):
+        """Test that a query naming a scheme only matches it and general FAQs."""
+        matches, _ = faq_assistant.rank_matches(self.GILT_QUERY, top_k=10, threshold=0.0)
+        
+        assert matches
+        assert matches[0][1]['scheme_name'] == 'SBI Magnum Gilt Fund'
+        assert {entry['scheme_name'] for _, entry, _ in matches} <= {'SBI Magnum Gilt Fund', GENERAL_SHARD}
+    
+    def test_routed_candidates_smaller(self, faq_assistant):
+        """Test that routing narrows the candidate set."""
+        snapshot = faq_assistant.snapshot
+        canonical = faq_assistant.canonicalize(self.GILT_QUERY)
+        terms = set(canonical.tokens)
+        routed = snapshot.candidate_ids(terms, shards=faq_assistant._route(canonical, snapshot))
+        
+        assert set(routed) < set(snapshot.candidate_ids(terms))
+    
+    def test_unnamed_scheme_searches_everything(self, faq_assistant):
+        """Test the full-search fallback when no scheme is named."""
+        unrouted = FAQAssistant(scheme_aliases={})
+        query = "How do I download my mutual fund statement?"
+        
+        assert faq_assistant._route(faq_assistant.canonicalize(query), faq_assistant.snapshot) is None
+        assert faq_assistant.query(query) == unrouted.query(query)
+    
+    def test_tfidf_routing(self):
+        """Test that the TF-IDF engine ranks within the routed shards too."""
+        pytest.importorskip('scipy')
+        assistant = FAQAssistant(engine='tfidf')
+        
+        matches, _ = assistant.rank_matches(self.GILT_QUERY, top_k=10, threshold=0.0)
+        best = assistant.fuzzy_match(self.GILT_QUERY)
+        batch = assistant.query_batch([self.GILT_QUERY, "How do I download my statement?"])
+        
+        assert {entry['scheme_name'] for _, entry, _ in matches} <= {'SBI Magnum Gilt Fund', GENERAL_SHARD}
+        assert best[0] == matches[0][0]
+        assert batch[0] == assistant.query(self.GILT_QUERY)
+    
+    def test_conflicting_alias_keeps_first(self, capsys):
+        """Test that an alias claimed by two schemes stays with the first."""
+        aliases = config_scheme_aliases({'schemes': [
+            {'name': 'Fund A', 'aliases': ['shared']},
+            {'name': 'Fund B', 'aliases': ['Shared', 'b']},
+        ]})
+        
+        assert aliases == {'fund a': 'Fund A', 'shared': 'Fund A', 'fund b': 'Fund B', 'b': 'Fund B'}
+        assert "'shared'" in capsys.readouterr().err
+
+
+class TestIntentFilter:
+    """Test limiting matching to the categories a query asks about."""
+    
+    TER_QUERY = "What is the TER of SBI Bluechip Fund?"
+    
+    def test_classify_keywords_and_abbreviations(self, faq_assistant):
+        """Test that phrases and abbreviations map to their categories."""
+        assert faq_assistant.classify_intent(self.TER_QUERY) == (['expense_ratio'], 1.0)
+        assert faq_assistant.classify_intent("Minimum SIP for gilt?")[0] == ['sip']
+        assert faq_assistant.classify_intent("Lock In period and exit load")[0] == ['lockin', 'exit_load']
+        assert faq_assistant.classify_intent("Terms of the fund") == ([], 0.0)
+    
+    def test_precision_measured_on_corpus(self, faq_assistant):
+        """Test that keywords used by several categories get a low precision."""
+        precision = faq_assistant.snapshot.intents.precision
+        
+        assert precision[('charges',), 'expense_ratio'] < 0.9
+        assert precision[('fees',), 'expense_ratio'] == 1.0
+        assert precision[('exit', 'load'), 'exit_load'] == 1.0
+    
+    def test_filtered_query_stays_in_categories(self, faq_assistant):
+        """Test that a clear intent only matches entries of its categories."""
+        matches, _ = faq_assistant.rank_matches(self.TER_QUERY, top_k=10, threshold=0.0)
+        
+        assert matches
+        assert {entry['category'] for _, entry, _ in matches} == {'expense_ratio'}
+        assert faq_assistant.query(self.TER_QUERY)['matched_q_key'] == 'bluechip_expense_ratio_1'
+    
+    def test_filter_narrows_candidates(self, faq_assistant):
+        """Test that facets cut the candidate set."""
+        snapshot = faq_assistant.snapshot
+        canonical = faq_assistant.canonicalize(self.TER_QUERY)
+        terms = set(canonical.tokens)
+        shards = faq_assistant._route(canonical, snapshot)
+        categories = faq_assistant._categories(canonical, snapshot, shards)
+        
+        assert categories == ['expense_ratio']
+        assert set(snapshot.candidate_ids(terms, shards=shards, categories=categories)) < \
+            set(snapshot.candidate_ids(terms, shards=shards))
+    
+    def test_low_confidence_falls_back(self, faq_assistant):
+        """Test that ambiguous keywords search every category."""
+        canonical = faq_assistant.canonicalize("What are the charges for SBI Bluechip Fund?")
+        snapshot = faq_assistant.snapshot
+        shards = faq_assistant._route(canonical, snapshot)
+        strict = FAQAssistant(intent_confidence=0.0)
+        
+        assert faq_assistant._categories(canonical, snapshot, shards) is None
+        assert strict._categories(canonical, strict.snapshot, shards) == ['expense_ratio']
+    
+    def test_no_entries_in_category_falls_back(self, faq_assistant):
+        """Test that a category missing from the routed shards is not enforced."""
+        query = "Is there a lock-in for SBI Bluechip Fund?"
+        canonical = faq_assistant.canonicalize(query)
+        shards = faq_assistant._route(canonical, faq_assistant.snapshot)
+        
+        assert faq_assistant.classify_intent(query)[0] == ['lockin']
+        assert faq_assistant._categories(canonical, faq_assistant.snapshot, shards) is None
+    
+    def test_tfidf_filter(self):
+        """Test that the TF-IDF engine ranks within the detected categories."""
+        pytest.importorskip('scipy')
+        assistant = FAQAssistant(engine='tfidf')
+        
+        matches, _ = assistant.rank_matches(self.TER_QUERY, top_k=10, threshold=0.0)
+        
+        assert {entry['category'] for _, entry, _ in matches} == {'expense_ratio'}
+        assert assistant.fuzzy_match(self.TER_QUERY)[0] == matches[0][0]
+    
+    def test_config_intent_keywords(self):
+        """Test reading keywords from the intents section of config.yml."""
+        config = {'intents': {'min_confidence': 0.5, 'categories': {'sip': ['SIP'], 'nav': None}}}
+        
+        assert config_intent_keywords(config) == {'sip': ['SIP'], 'nav': []}
+        assert config_intent_keywords({}) == {}
+        assert IntentClassifier({'sip': ['SIP']}).classify('sip amount') == (['sip'], 1.0)
+
+
+class TestQueryCanonicalizer:
+    """Test the canonical query form shared by matching and caching."""
+    
+    QUERY = "What is the expense ratio of SBI Bluechip Fund?"
+    
+    def test_trivial_variants_share_form(self, faq_assistant):
+        """Test that case, punctuation, spacing and Unicode forms fold together."""
+        variants = [
+            self.QUERY,
+            "What's the expense ratio of SBI Bluechip Fund??",
+            "  what is the EXPENSE ratio   of sbi bluechip fund ",
+            "What\u2019s the expense\u00a0ratio of \uff33\uff22\uff29 Bluechip Fund?",
+        ]
+        forms = {faq_assistant.canonicalize(query).text for query in variants}
+        
+        assert forms == {'expense ratio sbi bluechip fund'}
+    
+    def test_synonyms_and_stopwords(self, faq_assistant):
+        """Test that synonyms are expanded and stopwords dropped."""
+        canonical = faq_assistant.canonicalize("What is the TER of an SBI MF?")
+        
+        assert canonical.tokens == ('expense', 'ratio', 'sbi', 'mutual', 'fund')
+        assert canonical.folded == 'what is the ter of an sbi mf'
+    
+    def test_variants_share_cache_entry(self, faq_assistant):
+        """Test that trivial rewordings hit the response cache."""
+        first = faq_assistant.query(self.QUERY)
+        second = faq_assistant.query("Whats the expense-ratio of SBI Bluechip Fund??")
+        
+        assert second == first
+        assert faq_assistant.cache_stats()['hits'] == 1
+    
+    def test_canonicalized_once_per_query(self, faq_assistant):
+        """Test that one query fills a single memo entry and repeats hit it."""
+        faq_assistant.query(self.QUERY)
+        faq_assistant.query(self.QUERY)
+        
+        stats = faq_assistant.canonicalizer.stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+    
+    def test_memo_is_bounded(self):
+        """Test that the memo table evicts beyond memo_size."""
+        canonicalizer = QueryCanonicalizer(memo_size=2)
+        for text in ('a b', 'c d', 'e f', 'a b'):
+            canonicalizer.canonicalize(text)
+        
+        assert canonicalizer.stats()['size'] == 2
+        assert canonicalizer.stats()['hits'] == 0
+        assert QueryCanonicalizer(memo_size=0).canonicalize('A b').text == 'b'
+    
+    def test_advice_checked_before_cache(self, faq_assistant):
+        """Test that stopword-only differences cannot turn advice into a cached answer."""
+        advice = faq_assistant.query("Should I invest in SBI Bluechip Fund?")
+        factual = faq_assistant.query("Invest SBI Bluechip Fund")
+        
+        assert faq_assistant.canonicalize("Should I invest in SBI Bluechip Fund?").text == 'invest sbi bluechip fund'
+        assert advice['status'] == 'refusal'
+        assert factual['status'] != 'refusal'
+    
+    def test_config_extends_defaults(self, capsys):
+        """Test that config.yml words are added to the defaults."""
+        canonicalizer = config_canonicalizer({'canonicalization': {
+            'memo_size': 8,
+            'stopwords': ['fund'],
+            'synonyms': {'NAV': 'net asset value', 'exit load': 'exit'},
+        }})
+        
+        assert canonicalizer.canonicalize('What is the NAV of the fund?').tokens == ('net', 'asset', 'value')
+        assert canonicalizer.memo_size == 8
+        assert "'exit load'" in capsys.readouterr().err
+    
+    def test_tfidf_uses_canonical_form(self):
+        """Test that the TF-IDF engine answers rewordings identically."""
+        pytest.importorskip('scipy')
+        assistant = FAQAssistant(engine='tfidf', cache_size=0)
+        
+        assert assistant.query(self.QUERY) == assistant.query("WHAT'S the expense ratio of SBI Bluechip Fund")
+        assert assistant.query_batch([self.QUERY, "whats the expense ratio of sbi bluechip fund"]) == \
+            [assistant.query(self.QUERY)] * 2
+
+    @pytest.mark.parametrize('engine', ['sequence', 'tfidf'])
+    @pytest.mark.parametrize('query', ['hello', 'Hi there!', 'Who are you?', 'What is this?', 'Why?', '!!!'])
+    def test_stopword_only_query_not_matched(self, engine, query):
+        """Test that greetings and stopword-only queries find no FAQ."""
+        if engine == 'tfidf':
+            pytest.importorskip('scipy')
+        assistant = FAQAssistant(engine=engine)
+        
+        assert assistant.canonicalize(query).tokens == ()
+        assert assistant.query(query)['status'] == 'no_match'
+        assert assistant.query(query, top_k=3)['alternatives'] == []
+        assert assistant.query_batch([query])[0]['status'] == 'no_match'
+    
+    @pytest.mark.parametrize('query', ['nifty', 'tell me about nifty', 'ELSS?'])
+    def test_single_word_not_floored(self, faq_assistant, query):
+        """Test that a one-token query is not lifted to the substring floor."""
+        assert len(faq_assistant.canonicalize(query).tokens) == 1
+        assert faq_assistant.query(query)['status'] == 'no_match'
+    
+    def test_substring_floor_for_several_words(self, faq_assistant):
+        """Test that the floor still applies to multi-word substrings of a variant."""
+        match = faq_assistant.fuzzy_match('minimum SIP', threshold=0.5)
+        
+        assert match is not None
+        assert match[2] >= 0.7
+    
+    def test_answer_depends_only_on_canonical_text(self):
+        """Test that queries sharing a cache key get the answer each would get uncached."""
+        queries = ['ratio of sbi', 'ratio sbi', 'What is the ratio of SBI?', 'sbi ratio']
+        uncached = FAQAssistant(cache_size=0)
+        expected = {query: uncached.query(query) for query in queries}
+        
+        for order in (queries, queries[::-1]):
+            cached = FAQAssistant()
+            for query in order:
+                assert cached.query(query) == expected[query], query
+        
+        # Same canonical text, same answer
+        assert expected['ratio of sbi'] == expected['ratio sbi']
+
+
+class TestEncodedResponses:
+    """Test the pre-encoded JSON bodies behind query_json()."""
+    
+    QUERIES = [
+        "What is the expense ratio of SBI Bluechip Fund?",
+        "Should I invest in SBI Bluechip Fund?",
+        "My PAN is ABCDE1234F and Aadhaar 1234 5678 9012",
+        "Account 123456789 for PAN ABCDE1234F",
+        "What is the molecular weight of hydrogen peroxide?",
+        "Unicode caf\u00e9 question about the expense ratio",
+    ]
+    
+    def test_body_matches_response(self, faq_assistant):
+        """Test that every outcome encodes to the dict query() returns."""
+        for query in self.QUERIES:
+            for top_k in (None, 3):
+                body = faq_assistant.query_json(query, top_k)
+                assert json.loads(body) == faq_assistant.query(query, top_k), query
+                assert body.isascii()
+    
+    def test_tfidf_body_matches_response(self):
+        """Test that TF-IDF similarities are spliced in as plain floats."""
+        pytest.importorskip('scipy')
+        assistant = FAQAssistant(engine='tfidf', cache_size=0)
+        
+        for query in self.QUERIES:
+            assert json.loads(assistant.query_json(query)) == assistant.query(query), query
+    
+    def test_static_bodies_shared(self, faq_assistant):
+        """Test that refusals and PII errors reuse bodies encoded at import."""
+        assert faq_assistant.query_json("Should I buy SBI Gilt?") is REFUSAL.body
+        assert faq_assistant.query_json(self.QUERIES[3]) is PII_RESPONSES[('PAN', 'Account Number')].body
+        assert len(PII_RESPONSES) == 7
+    
+    def test_success_body_uses_entry_prefix(self, faq_assistant):
+        """Test that success bodies extend the entry's encoded prefix."""
+        body = faq_assistant.query_json(self.QUERIES[0])
+        entry = next(e for e in faq_assistant.entries if e.q_key == json.loads(body)['matched_q_key'])
+        
+        assert body.startswith(entry.response_prefix)
+        assert faq_assistant.query_json(self.QUERIES[0]) is body
+    
+    def test_shared_responses_not_exposed(self, faq_assistant):
+        """Test that query() copies shared static responses."""
+        faq_assistant.query("Should I buy SBI Gilt?")['status'] = 'changed'
+        faq_assistant.query_batch(["Should I buy SBI Gilt?"])[0]['status'] = 'changed'
+        
+        assert REFUSAL.response['status'] == 'refusal'
+
+
+class TestQueryEtag:
+    """Test the entity tags behind cacheable GET /api/query responses."""
+    
+    def test_tag_follows_canonical_query(self, faq_assistant):
+        """Test that rewordings sharing a canonical form share a tag."""
+        etag = faq_assistant.query_etag("What is the expense ratio of SBI Bluechip Fund?")
+        
+        assert etag == faq_assistant.query_etag("what's  the EXPENSE ratio of sbi bluechip fund")
+        assert etag != faq_assistant.query_etag("What is the exit load of SBI Bluechip Fund?")
+        assert etag != faq_assistant.query_etag("What is the expense ratio of SBI Bluechip Fund?", 3)
+    
+    def test_tag_does_not_run_query(self, faq_assistant):
+        """Test that computing a tag leaves the response cache untouched."""
+        faq_assistant.query_etag("What is the expense ratio of SBI Bluechip Fund?")
+        
+        assert faq_assistant.cache_stats()['size'] == 0
+    
+    def test_advice_requests_share_tag(self, faq_assistant):
+        """Test that every refusal carries the same tag."""
+        assert (faq_assistant.query_etag("Should I invest in SBI Bluechip Fund?")
+                == faq_assistant.query_etag("Should I buy SBI Gilt?"))
+    
+    def test_pii_query_has_no_tag(self, faq_assistant):
+        """Test that queries with PII are never tagged for caching."""
+        assert faq_assistant.query_etag("My PAN is ABCDE1234F, what is my NAV?") is None
+
+
+class TestQueryMetrics:
+    """Test per-stage latency histograms and response counters."""
+    
+    def test_histogram_buckets_cumulative(self):
+        """Test that values land in the first bucket whose bound they do not exceed."""
+        histogram = Histogram((1, 5, 10))
+        for value in (0, 1, 3, 10, 50):
+            histogram.observe(value)
+        
+        cumulative, total, count = histogram.snapshot()
+        
+        assert cumulative == [2, 3, 4, 5]
+        assert total == 64
+        assert count == 5
+    
+    def test_statuses_counted(self):
+        """Test that each query is counted under its response status."""
+        assistant = FAQAssistant(cache_size=0)
+        assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        assistant.query("Should I invest in SBI Bluechip Fund?")
+        assistant.query("My PAN is ABCDE1234F")
+        assistant.query("What is the molecular weight of hydrogen peroxide?")
+        
+        assert assistant.metrics.status_counts() == {
+            'success': 1, 'refusal': 1, 'error': 1, 'no_match': 1
+        }
+    
+    def test_cached_responses_counted(self, faq_assistant):
+        """Test that cache hits are counted and skip the match stage."""
+        for _ in range(3):
+            faq_assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        
+        text = faq_assistant.metrics_text()
+        
+        assert 'faq_responses_total{status="success"} 3' in text
+        assert 'faq_stage_seconds_count{stage="match"} 1' in text
+        assert 'faq_stage_seconds_count{stage="query"} 3' in text
+        assert 'faq_cache_hits_total 2' in text
+    
+    def test_candidates_observed(self, faq_assistant):
+        """Test that match work is recorded per query."""
+        faq_assistant.query("What is the expense ratio of SBI Bluechip Fund?")
+        
+        _, candidates, count = faq_assistant.metrics.candidates.snapshot()
+        _, scored, _ = faq_assistant.metrics.scored.snapshot()
+        
+        assert count == 1
+        assert 0 < scored <= candidates <= len(faq_assistant.snapshot.variants)
+    
+    def test_render_prometheus_format(self, faq_assistant):
+        """Test that every sample line follows the text exposition format."""
+        import re
+        
+        faq_assistant.query("What is NAV?")
+        sample = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? \S+$')
+        
+        for line in faq_assistant.metrics_text().splitlines():
+            assert line.startswith('# ') or sample.match(line), line
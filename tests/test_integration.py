@@ -300,3 +300,44 @@ class TestSpecialCharacters:
         result = faq_assistant.query(query)
         
         assert 'status' in result
+
+
+class TestBatchQueries:
+    """Test processing several queries at once."""
+    
+    QUERIES = [
+        "What is the expense ratio of SBI Bluechip Fund?",
+        "Should I invest in SBI Bluechip Fund?",
+        "My PAN is ABCDE1234F",
+        "What is the square root of 16?",
+        "What is the expense ratio of SBI Bluechip Fund?",
+    ]
+    
+    def test_batch_matches_single_queries(self, faq_assistant):
+        """Test that batch responses equal single query responses, in order."""
+        results = faq_assistant.query_batch(self.QUERIES)
+        
+        assert results == [faq_assistant.query(query) for query in self.QUERIES]
+    
+    def test_duplicate_responses_are_independent(self, faq_assistant):
+        """Test that duplicate queries get separate response objects."""
+        results = faq_assistant.query_batch(self.QUERIES)
+        
+        assert results[0] == results[4]
+        assert results[0] is not results[4]
+    
+    def test_empty_batch(self, faq_assistant):
+        """Test that an empty batch returns no responses."""
+        assert faq_assistant.query_batch([]) == []
+    
+    def test_tfidf_batch_scores_jointly(self):
+        """Test that the TF-IDF engine batch agrees with single queries."""
+        pytest.importorskip('numpy')
+        pytest.importorskip('scipy')
+        assistant = FAQAssistant(engine='tfidf')
+        
+        for batch_result, query in zip(assistant.query_batch(self.QUERIES), self.QUERIES):
+            single = assistant.query(query)
+            assert batch_result['status'] == single['status']
+            assert batch_result.get('matched_q_key') == single.get('matched_q_key')
+            assert batch_result.get('similarity') == single.get('similarity')
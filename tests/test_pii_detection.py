@@ -222,3 +222,60 @@ class TestPIIDetectionReliability:
         results = [faq_assistant.detect_pii(query) for _ in range(3)]
         
         assert all(r == results[0] for r in results)
+
+
+class TestPIIScanner:
+    """Test the single-pass PII scanner and redaction."""
+    
+    def test_spans_are_typed_and_ordered(self, faq_assistant):
+        """Test that spans carry their type and position."""
+        query = "PAN ABCDE1234F, Aadhaar 1234 5678 9012, account 123456789"
+        spans = faq_assistant.scan_pii(query)
+        
+        assert [span.pii_type for span in spans] == ['PAN', 'Aadhaar', 'Account Number']
+        assert [query[span.start:span.end] for span in spans] == [
+            'ABCDE1234F', '1234 5678 9012', '123456789'
+        ]
+    
+    def test_aadhaar_takes_priority_over_account(self, faq_assistant):
+        """Test that a 12-digit number is reported once, as Aadhaar."""
+        spans = faq_assistant.scan_pii("Aadhaar number: 123456789012")
+        
+        assert len(spans) == 1
+        assert spans[0].pii_type == 'Aadhaar'
+    
+    def test_spans_do_not_overlap(self, faq_assistant):
+        """Test that reported spans never overlap."""
+        spans = faq_assistant.scan_pii("123456789012 123456789012345678 ABCDE1234F")
+        
+        for previous, current in zip(spans, spans[1:]):
+            assert previous.end <= current.start
+    
+    @pytest.mark.parametrize('query, pii_type', [
+        ('my aadhaar is \uff11\uff12\uff13\uff14\uff15\uff16\uff17\uff18\uff19\uff10\uff11\uff12', 'Aadhaar'),
+        ('acct \u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669\u0660', 'Account Number'),
+    ])
+    def test_unicode_digits_detected(self, faq_assistant, query, pii_type):
+        """Test that fullwidth and Arabic-Indic digits are scanned like ASCII ones."""
+        assert faq_assistant.detect_pii(query) == (True, [pii_type])
+        assert faq_assistant.contains_pii(query) is True
+        assert faq_assistant.query(query)['error_type'] == 'pii_detected'
+    
+    def test_contains_pii(self, faq_assistant):
+        """Test the early-exit yes/no check."""
+        assert faq_assistant.contains_pii("My PAN is ABCDE1234F") is True
+        assert faq_assistant.contains_pii("What is the expense ratio?") is False
+    
+    def test_redact_pii(self, faq_assistant):
+        """Test that redaction replaces each span with its type."""
+        query = "PAN ABCDE1234F and account 123456789."
+        
+        assert faq_assistant.redact_pii(query) == "PAN [PAN] and account [Account Number]."
+    
+    def test_redact_reuses_spans(self, faq_assistant):
+        """Test that redaction can reuse spans from an earlier scan."""
+        query = "Aadhaar 1234 5678 9012"
+        spans = faq_assistant.scan_pii(query)
+        
+        assert faq_assistant.redact_pii(query, spans) == "Aadhaar [Aadhaar]"
+        assert faq_assistant.redact_pii("No PII here") == "No PII here"
@@ -0,0 +1,82 @@
+"""
+Test suite for the pre-fork launcher.
+
+Tests:
+- Workers serving requests on a shared socket
+- Replacement of exited workers
+"""
+
+import http.client
+import json
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+
+if not hasattr(os, 'fork'):
+    pytest.skip('pre-fork mode requires os.fork', allow_module_level=True)
+
+from src.api import server
+from src.api.prefork import PreforkServer
+from src.faq_logic import FAQAssistant
+
+
+@pytest.fixture
+def launcher(tmp_path, monkeypatch):
+    """Start two workers serving a TF-IDF assistant on a free port."""
+    monkeypatch.setattr(server, 'assistant', FAQAssistant(engine='tfidf'))
+    prefork = PreforkServer(server.app, server.assistant, host='127.0.0.1', port=0,
+                            workers=2, index_dir=tmp_path)
+    prefork.start()
+    yield prefork
+    prefork.stop()
+
+
+def post_query(port, query, attempts=50):
+    """POST a query, retrying while the workers start listening."""
+    for _ in range(attempts):
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('POST', '/api/query', body=json.dumps({'query': query}),
+                         headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        except ConnectionError:
+            time.sleep(0.1)
+        finally:
+            conn.close()
+    raise AssertionError('workers did not answer')
+
+
+class TestPreforkServer:
+    """Test workers forked from a parent holding the shared index."""
+    
+    def test_workers_answer_queries(self, launcher):
+        """Test that forked workers answer from the shared index."""
+        status, data = post_query(launcher.port, 'What is the expense ratio of SBI Bluechip Fund?')
+        
+        assert status == 200
+        assert data['status'] == 'success'
+        assert len(launcher.pids) == 2
+        assert server.assistant.snapshot_info()['shared_path'] is not None
+    
+    def test_exited_worker_replaced(self, launcher):
+        """Test that reap() forks a replacement for an exited worker."""
+        victim = next(iter(launcher.pids))
+        os.kill(victim, signal.SIGKILL)
+        
+        for _ in range(50):
+            launcher.reap()
+            if victim not in launcher.pids and len(launcher.pids) == 2:
+                break
+            time.sleep(0.1)
+        
+        assert victim not in launcher.pids
+        assert len(launcher.pids) == 2
+        assert post_query(launcher.port, 'What is NAV?')[0] == 200
@@ -0,0 +1,195 @@
+"""
+Test suite for the FAQ data validator.
+
+Tests:
+- Error and warning counting
+- Incremental validation against the content-hash cache
+- JSON and JSON Lines corpora
+- Parallel validation
+- Machine-readable output
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.utils import qa_validate
+from src.utils.qa_validate import (
+    count_issues, scan_faq_entries, validate_faq_file, validate_faqs_json
+)
+
+
+FAQS_PATH = Path(__file__).parent.parent / 'src' / 'data' / 'faqs.json'
+
+
+@pytest.fixture
+def faqs():
+    """Load the shipped corpus."""
+    return json.loads(FAQS_PATH.read_text(encoding='utf-8'))
+
+
+@pytest.fixture
+def faqs_file(tmp_path, faqs):
+    """Write the shipped corpus to a temporary faqs.json."""
+    path = tmp_path / 'faqs.json'
+    path.write_text(json.dumps(faqs, indent=2), encoding='utf-8')
+    return path
+
+
+def break_entry(path, q_key):
+    """Give one entry an invalid last_updated date."""
+    faqs = json.loads(path.read_text(encoding='utf-8'))
+    faqs[q_key]['last_updated'] = 'yesterday'
+    path.write_text(json.dumps(faqs, indent=2), encoding='utf-8')
+
+
+class TestCountIssues:
+    """Test counting of errors and warnings."""
+    
+    def test_errors_and_warnings_counted_once(self):
+        """Test that warnings are told apart from errors."""
+        invalid_entries = [
+            ('a', ["Missing 'answer' field", "Warning: Missing 'category' field (optional but recommended)"]),
+            ('b', ["'answer' is empty"]),
+        ]
+        
+        assert count_issues(invalid_entries) == (2, 1)
+        assert count_issues([]) == (0, 0)
+
+
+class TestValidateFaqFile:
+    """Test full and incremental validation of FAQ files."""
+    
+    def test_shipped_corpus_valid(self):
+        """Test that the shipped faqs.json passes validation."""
+        is_valid, invalid_entries, stats = validate_faq_file(FAQS_PATH)
+        
+        assert is_valid
+        assert stats['entries'] == stats['revalidated'] > 0
+        assert validate_faqs_json(FAQS_PATH) == (is_valid, invalid_entries)
+    
+    def test_errors_reported(self, faqs_file):
+        """Test that an invalid entry is reported with its errors."""
+        break_entry(faqs_file, 'bluechip_expense_ratio_1')
+        
+        is_valid, invalid_entries, stats = validate_faq_file(faqs_file)
+        
+        assert not is_valid
+        assert [q_key for q_key, _ in invalid_entries] == ['bluechip_expense_ratio_1']
+        assert stats['errors'] == 1
+    
+    def test_unchanged_file_not_revalidated(self, faqs_file, tmp_path):
+        """Test that a re-run over an unchanged file validates nothing."""
+        cache_path = tmp_path / 'cache.json'
+        first = validate_faq_file(faqs_file, cache_path)
+        second = validate_faq_file(faqs_file, cache_path)
+        
+        assert second[2]['revalidated'] == 0
+        assert second[:2] == first[:2]
+    
+    def test_only_edited_entry_revalidated(self, faqs_file, tmp_path):
+        """Test that editing one entry re-checks only that entry."""
+        cache_path = tmp_path / 'cache.json'
+        validate_faq_file(faqs_file, cache_path)
+        break_entry(faqs_file, 'bluechip_expense_ratio_1')
+        
+        is_valid, invalid_entries, stats = validate_faq_file(faqs_file, cache_path)
+        
+        assert stats['revalidated'] == 1
+        assert (is_valid, invalid_entries) == validate_faqs_json(faqs_file)
+        
+        # Fixing the entry again brings back its cached result
+        faqs_file.write_text(json.dumps(json.loads(FAQS_PATH.read_text(encoding='utf-8')), indent=2),
+                             encoding='utf-8')
+        assert validate_faq_file(faqs_file, cache_path)[0]
+    
+    def test_insertions_and_deletions(self, faqs_file, faqs, tmp_path, monkeypatch):
+        """Test that results follow entries added, removed and moved between runs."""
+        monkeypatch.setattr(qa_validate, 'ENTRIES_PER_BLOCK', 4)
+        cache_path = tmp_path / 'cache.json'
+        validate_faq_file(faqs_file, cache_path)
+        
+        items = list(faqs.items())
+        del items[10]
+        items.insert(20, ('new_entry', {'answer': 'No source.'}))
+        items.append(items.pop(0))
+        faqs_file.write_text(json.dumps(dict(items), indent=2), encoding='utf-8')
+        
+        is_valid, invalid_entries, stats = validate_faq_file(faqs_file, cache_path)
+        
+        assert stats['revalidated'] == 1
+        assert stats['entries'] == len(items)
+        assert (is_valid, invalid_entries) == validate_faqs_json(faqs_file)
+    
+    def test_scan_reuses_unchanged_blocks(self, faqs_file, monkeypatch):
+        """Test that only the block holding an edit is rebuilt."""
+        monkeypatch.setattr(qa_validate, 'ENTRIES_PER_BLOCK', 8)
+        blocks, decoded = scan_faq_entries(faqs_file.read_text(encoding='utf-8'))
+        break_entry(faqs_file, 'bluechip_expense_ratio_1')
+        
+        new_blocks, decoded = scan_faq_entries(faqs_file.read_text(encoding='utf-8'), known_blocks=blocks)
+        
+        assert len(decoded) == 1
+        assert new_blocks[1:] == blocks[1:]
+        assert new_blocks[0] != blocks[0]
+    
+    def test_jsonl_corpus(self, faqs, tmp_path):
+        """Test that a JSON Lines corpus gives the same results as faqs.json."""
+        path = tmp_path / 'faqs.jsonl'
+        faqs['bluechip_expense_ratio_1']['source'] = 'not a url'
+        path.write_text('\n'.join(json.dumps({'q_key': q_key, **entry}) for q_key, entry in faqs.items()),
+                        encoding='utf-8')
+        cache_path = tmp_path / 'cache.json'
+        
+        is_valid, invalid_entries, stats = validate_faq_file(path, cache_path)
+        
+        assert not is_valid
+        assert [q_key for q_key, _ in invalid_entries] == ['bluechip_expense_ratio_1']
+        assert validate_faq_file(path, cache_path)[2]['revalidated'] == 0
+    
+    def test_parallel_matches_serial(self, faqs_file, monkeypatch):
+        """Test that validating on a process pool gives the serial results."""
+        break_entry(faqs_file, 'bluechip_expense_ratio_1')
+        monkeypatch.setattr(qa_validate, 'PARALLEL_MIN_ENTRIES', 1)
+        
+        assert validate_faq_file(faqs_file, workers=2) == validate_faq_file(faqs_file)
+    
+    @pytest.mark.parametrize('content', ['[]', '{"a": 1}', '{"a": {}', '{"a": {}} x', '{"a" {}}'])
+    def test_malformed_file_rejected(self, tmp_path, content):
+        """Test that malformed files are reported as invalid."""
+        path = tmp_path / 'faqs.json'
+        path.write_text(content, encoding='utf-8')
+        
+        assert validate_faq_file(path) == (False, [], {})
+    
+    def test_unreadable_cache_ignored(self, faqs_file, tmp_path):
+        """Test that a corrupt cache falls back to a full validation."""
+        cache_path = tmp_path / 'cache.json'
+        cache_path.write_text('{not json', encoding='utf-8')
+        
+        is_valid, _, stats = validate_faq_file(faqs_file, cache_path)
+        
+        assert is_valid
+        assert stats['revalidated'] == stats['entries']
+
+
+class TestCommandLine:
+    """Test the qa_validate command line."""
+    
+    def test_json_report(self, faqs_file, tmp_path, monkeypatch, capsys):
+        """Test that --json prints the results as one JSON document."""
+        break_entry(faqs_file, 'bluechip_expense_ratio_1')
+        monkeypatch.setattr(sys, 'argv', ['qa_validate.py', str(faqs_file), '--json',
+                                          '--cache', str(tmp_path / 'cache.json'), '--workers', '1'])
+        
+        with pytest.raises(SystemExit) as exit_info:
+            qa_validate.main()
+        report = json.loads(capsys.readouterr().out)
+        
+        assert exit_info.value.code == 1
+        assert report['valid'] is False
+        assert report['errors'] == 1
+        assert report['entries_with_issues'][0]['q_key'] == 'bluechip_expense_ratio_1'
+        assert report['entries_with_issues'][0]['errors']
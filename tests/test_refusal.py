@@ -9,7 +9,7 @@ Tests detection and handling of:
 """
 
 import pytest
-from src.faq_logic import FAQAssistant
+from src.faq_logic import ADVICE_TRIGGERS, FAQAssistant, TriggerAutomaton
 
 
 @pytest.fixture
@@ -292,3 +292,96 @@ class TestAdviceTriggerCombinations:
         is_advice = faq_assistant.detect_advice_request(query)
         
         assert is_advice is True
+
+
+class TestTriggerAutomaton:
+    """Test the Aho-Corasick automaton behind advice detection."""
+    
+    def test_reports_trigger_and_offset(self, faq_assistant):
+        """Test that the firing trigger and its offset are returned."""
+        query = "Is SBI Bluechip Fund worth investing?"
+        
+        assert faq_assistant.find_advice_trigger(query) == ('worth investing', 21)
+    
+    def test_offset_points_into_raw_query(self, faq_assistant):
+        """Test that the offset indexes the query as given, not its folded form."""
+        query = "Hi!!  What's up -- should   I buy?"
+        trigger, offset = faq_assistant.find_advice_trigger(query)
+        
+        assert (trigger, offset) == ('should i', query.index('should'))
+        
+        query = "\u2018\uff33hould\u2019 I buy?"
+        assert faq_assistant.find_advice_trigger(query) == ('should i', 1)
+    
+    def test_folding_keeps_offsets(self, faq_assistant):
+        """Test that offset-tracking folding gives the same text as fold()."""
+        canonicalizer = faq_assistant.canonicalizer
+        texts = [
+            "  What's  the NAV?? ", "Cafe\u0301 \ufb01ne Stra\u00dfe", "\u1100\u1161 \u3131\u314f", '!!!', '',
+            # Halfwidth sound marks compose with the character before them
+            '\uff76\uff9e\u00dfa?', '\uff8a\uff9f', 'O\uff9e\u0308',
+        ]
+        
+        for text in texts:
+            folded, offsets = canonicalizer.fold_with_offsets(text)
+            assert folded == canonicalizer.fold(text), text
+            assert len(offsets) == len(folded)
+            assert offsets == sorted(offsets)
+    
+    def test_trigger_search_agrees_with_detection(self):
+        """Test that find_advice_trigger and detect_advice_request agree on composed text."""
+        assistant = FAQAssistant(advice_triggers=['\u30ac', 'should i'])
+        
+        for query in ('\uff76\uff9e\u00dfa?', '\uff76 \uff9e', 'x\uff76\uff9e', 'Should I?'):
+            found = assistant.find_advice_trigger(query)
+            assert (found is not None) is assistant.detect_advice_request(query), query
+        assert assistant.find_advice_trigger('x\uff76\uff9e') == ('\u30ac', 1)
+    
+    def test_no_trigger_returns_none(self, faq_assistant):
+        """Test that factual questions have no trigger."""
+        assert faq_assistant.find_advice_trigger("What is the exit load?") is None
+    
+    def test_same_result_as_substring_search(self, faq_assistant):
+        """Test that detection agrees with a plain substring scan."""
+        queries = [
+            "Should I buy SBI Bluechip Fund?",
+            "Who is the fund buyer?",
+            "What is the benchmark for SBI Nifty Index Fund?",
+            "Is this a bad investment for retirement?",
+            "RECOMMENDATION please",
+            "",
+        ]
+        for query in queries:
+            expected = any(trigger in query.lower() for trigger in ADVICE_TRIGGERS)
+            assert faq_assistant.detect_advice_request(query) is expected
+    
+    def test_find_all_overlapping_triggers(self):
+        """Test that overlapping phrases are all reported."""
+        automaton = TriggerAutomaton(['recommend', 'recommendation', 'commend'])
+        
+        assert automaton.find_all("A recommendation") == [
+            ('recommend', 2), ('commend', 4), ('recommendation', 2)
+        ]
+    
+    def test_longest_trigger_preferred_at_same_end(self):
+        """Test that the longest phrase wins when several end together."""
+        automaton = TriggerAutomaton(['invest in', 'should invest in'])
+        
+        assert automaton.search("Should invest in gilt?") == ('should invest in', 0)
+    
+    def test_custom_triggers(self):
+        """Test that trigger phrases can be supplied explicitly."""
+        assistant = FAQAssistant(advice_triggers=['kya main kharidu'])
+        
+        assert assistant.find_advice_trigger("Kya main kharidu SBI Gilt?") == ('kya main kharidu', 0)
+        assert assistant.detect_advice_request("Should I buy?") is False
+    
+    def test_triggers_loaded_from_config(self, tmp_path):
+        """Test that config.yml triggers are added to the built-in list."""
+        pytest.importorskip('yaml')
+        config_path = tmp_path / 'config.yml'
+        config_path.write_text("advice_triggers:\n  hi:\n    - 'kya main kharidu'\n", encoding='utf-8')
+        assistant = FAQAssistant(config_path=config_path)
+        
+        assert assistant.detect_advice_request("Kya main kharidu SBI Gilt?") is True
+        assert assistant.detect_advice_request("Should I buy?") is True
@@ -0,0 +1,154 @@
+"""
+Test suite for the source URL validator.
+
+Tests:
+- Domain whitelist lookups
+- sources.csv validation
+- Streaming CSV and JSON Lines loaders
+- Bulk validation in and across worker processes
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.utils import validate_sources
+from src.utils.validate_sources import (
+    OFFICIAL_DOMAINS, DomainWhitelist, is_valid_domain, iter_url_records, validate_sources_csv,
+    validate_url_files
+)
+
+
+SOURCES_PATH = Path(__file__).parent.parent / 'src' / 'data' / 'sources.csv'
+
+URLS = [
+    'https://www.sbmf.com/schemes/bluechip/factsheet.pdf',
+    'https://evil.example.com/sbmf.com',
+    'https://www.amfiindia.com/nav',
+    'https://notsebi.gov.in/circular',
+    'https://mf.sebi.gov.in/circular',
+]
+
+
+@pytest.fixture
+def url_files(tmp_path):
+    """Write URLS as a CSV file and a JSON Lines file."""
+    csv_path = tmp_path / 'urls.csv'
+    csv_path.write_text('url,domain\n' + ''.join(f'{url},\n' for url in URLS), encoding='utf-8')
+    jsonl_path = tmp_path / 'urls.jsonl'
+    jsonl_path.write_text(''.join(json.dumps({'url': url}) + '\n' for url in URLS) + 'not json\n',
+                          encoding='utf-8')
+    return csv_path, jsonl_path
+
+
+class TestDomainWhitelist:
+    """Test the reversed-label domain trie."""
+    
+    def test_domains_and_subdomains_match(self):
+        """Test that base domains and their subdomains are covered."""
+        whitelist = DomainWhitelist(OFFICIAL_DOMAINS)
+        
+        assert whitelist.match('sbmf.com') == 'sbmf.com'
+        assert whitelist.match('www.sbmf.com') == 'sbmf.com'
+        assert whitelist.match('a.b.sebi.gov.in') == 'sebi.gov.in'
+        assert whitelist.match('WWW.AMFIINDIA.COM.') == 'amfiindia.com'
+    
+    def test_lookalikes_rejected(self):
+        """Test that suffixes not on a label boundary do not match."""
+        whitelist = DomainWhitelist(OFFICIAL_DOMAINS)
+        
+        for domain in ('evilsbmf.com', 'sbmf.com.evil.net', 'gov.in', 'com', '', None):
+            assert domain not in whitelist
+    
+    def test_added_domains(self):
+        """Test that domains can be added and are only listed once."""
+        whitelist = DomainWhitelist(['sbmf.com'])
+        whitelist.add('Example-AMC.co.in')
+        whitelist.add('example-amc.co.in')
+        
+        assert 'funds.example-amc.co.in' in whitelist
+        assert len(whitelist) == 2
+    
+    def test_matches_linear_scan(self):
+        """Test that the trie agrees with is_valid_domain's previous suffix scan."""
+        domains = ['sbmf.com', 'www.sbmf.com', 'xsbmf.com', 'sebi.gov.in', 'gov.in', 'amfiindia.com.au']
+        
+        for domain in domains:
+            expected = domain in OFFICIAL_DOMAINS or any(domain.endswith('.' + d) for d in OFFICIAL_DOMAINS)
+            assert is_valid_domain(domain) == expected, domain
+
+
+class TestSourcesCsv:
+    """Test validation of sources.csv."""
+    
+    def test_shipped_sources_valid(self):
+        """Test that the shipped sources.csv only lists official domains."""
+        assert validate_sources_csv(SOURCES_PATH) == (True, [])
+    
+    def test_custom_whitelist(self):
+        """Test that a narrower whitelist reports the other domains."""
+        is_valid, invalid_entries = validate_sources_csv(SOURCES_PATH, DomainWhitelist(['sbmf.com']))
+        
+        assert not is_valid
+        assert all(domain != 'sbmf.com' for _, _, domain in invalid_entries)
+
+
+class TestUrlRecords:
+    """Test the streaming URL loaders."""
+    
+    def test_csv_records(self, url_files):
+        """Test that CSV rows are numbered from 2, after the header."""
+        records = list(iter_url_records(url_files[0]))
+        
+        assert records[0] == (2, URLS[0], '')
+        assert [url for _, url, _ in records] == URLS
+    
+    def test_jsonl_records(self, url_files):
+        """Test that malformed JSON Lines are yielded without a URL."""
+        records = list(iter_url_records(url_files[1]))
+        
+        assert [url for _, url, _ in records] == URLS + [None]
+        assert records[-1][0] == len(URLS) + 1
+
+
+class TestBulkValidation:
+    """Test streaming bulk validation of URL files."""
+    
+    def run(self, paths, **kwargs):
+        """Validate files and collect the reported records."""
+        reported = []
+        counts = validate_url_files(paths, report=lambda *record: reported.append(record), **kwargs)
+        return counts, reported
+    
+    def test_invalid_urls_reported_in_order(self, url_files):
+        """Test that invalid URLs of every file are reported in input order."""
+        counts, reported = self.run(url_files, batch_size=2)
+        
+        assert counts == (2 * len(URLS) + 1, 5)
+        assert [(Path(path).suffix, url) for path, _, url, _ in reported] == [
+            ('.csv', URLS[1]), ('.csv', URLS[3]),
+            ('.jsonl', URLS[1]), ('.jsonl', URLS[3]), ('.jsonl', None),
+        ]
+    
+    def test_workers_match_serial(self, url_files):
+        """Test that checking on a process pool gives the serial results."""
+        whitelist = DomainWhitelist(['sbmf.com', 'example.com'])
+        
+        assert self.run(url_files, whitelist=whitelist, workers=2, batch_size=2) == \
+            self.run(url_files, whitelist=whitelist, batch_size=2)
+    
+    def test_bulk_command(self, url_files, tmp_path, monkeypatch, capsys):
+        """Test that --bulk prints one line per invalid URL and honours --domains."""
+        domains_path = tmp_path / 'domains.txt'
+        domains_path.write_text('# extra AMC domains\nexample.com\n', encoding='utf-8')
+        monkeypatch.setattr(sys, 'argv', ['validate_sources.py', '--bulk', str(url_files[0]),
+                                          '--domains', str(domains_path), '--workers', '1'])
+        
+        with pytest.raises(SystemExit) as exit_info:
+            validate_sources.main()
+        lines = capsys.readouterr().out.splitlines()
+        
+        assert exit_info.value.code == 1
+        assert lines == [f'{url_files[0]}:5\t{URLS[3]}\tnotsebi.gov.in']